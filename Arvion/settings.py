@@ -1,66 +1,130 @@
-import os
-from pathlib import Path
-import dj_database_url
-from dotenv import load_dotenv
-
-# --- CORE SETTINGS & ENVIRONMENT LOADING ---
-BASE_DIR = Path(__file__).resolve().parent.parent
-load_dotenv(os.path.join(BASE_DIR, '.env'))
-SECRET_KEY = os.environ.get('SECRET_KEY', 'default-safe-secret-key-for-local-use-only')
-DEBUG = os.environ.get('DEBUG', '0') == '1'
-ROOT_URLCONF = "Arvion.urls"
-WSGI_APPLICATION = "Arvion.wsgi.application"
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
-AUTH_USER_MODEL = "main.CustomUser"
-
-# --- SECURITY & HOSTS ---
-ALLOWED_HOSTS = ['localhost', '127.0.0.1']
-RENDER_EXTERNAL_HOSTNAME = os.environ.get('RENDER_EXTERNAL_HOSTNAME')
-if RENDER_EXTERNAL_HOSTNAME:
-    ALLOWED_HOSTS.append(RENDER_EXTERNAL_HOSTNAME)
-if not DEBUG:
-    CSRF_COOKIE_SECURE = True
-    SESSION_COOKIE_SECURE = True
-    SECURE_SSL_REDIRECT = True
-
-# --- INSTALLED APPS & MIDDLEWARE ---
-INSTALLED_APPS = [
-    "django.contrib.admin", "django.contrib.auth", "django.contrib.contenttypes",
-    "django.contrib.sessions", "django.contrib.messages",
-    "whitenoise.runserver_nostatic", "django.contrib.staticfiles",
-    'cloudinary_storage', 'cloudinary', "main.apps.MainConfig",
-]
-MIDDLEWARE = [
-    "django.middleware.security.SecurityMiddleware", "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware", "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware", "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware", "django.middleware.clickjacking.XFrameOptionsMiddleware",
-]
-
-# --- TEMPLATES & INTERNATIONALIZATION ---
-TEMPLATES = [{"BACKEND": "django.template.backends.django.DjangoTemplates", "DIRS": [os.path.join(BASE_DIR, "templates")], "APP_DIRS": True,
-    "OPTIONS": {"context_processors": ["django.template.context_processors.debug", "django.template.context_processors.request", "django.contrib.auth.context_processors.auth", "django.contrib.messages.context_processors.messages",],},},]
-LANGUAGE_CODE = "en-us"; TIME_ZONE = "UTC"; USE_I18N = True; USE_TZ = True
-
-# --- DATABASES ---
-if 'DATABASE_URL' in os.environ:
-    DATABASES = {'default': dj_database_url.config(conn_max_age=600, ssl_require=True)}
-else:
-    DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'}}
-
-# --- STATIC & MEDIA FILES ---
-STATIC_URL = "/static/"
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")] # <-- Ավելացված կարևոր տողը
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
-MEDIA_URL = '/media/'
-if 'CLOUDINARY_URL' in os.environ:
-    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
-    CLOUDINARY_STORAGE = {'CLOUDINARY_URL': os.environ.get('CLOUDINARY_URL')}
-else:
-    MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-# --- PASSWORDS & API KEYS ---
-AUTH_PASSWORD_VALIDATORS = [{"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},{"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},{"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},{"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},]
+import os
+from pathlib import Path
+import dj_database_url
+from dotenv import load_dotenv
+
+# --- CORE SETTINGS & ENVIRONMENT LOADING ---
+BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+SECRET_KEY = os.environ.get('SECRET_KEY', 'default-safe-secret-key-for-local-use-only')
+DEBUG = os.environ.get('DEBUG', '0') == '1'
+ROOT_URLCONF = "Arvion.urls"
+WSGI_APPLICATION = "Arvion.wsgi.application"
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+AUTH_USER_MODEL = "main.CustomUser"
+
+# --- SECURITY & HOSTS ---
+ALLOWED_HOSTS = ['localhost', '127.0.0.1']
+RENDER_EXTERNAL_HOSTNAME = os.environ.get('RENDER_EXTERNAL_HOSTNAME')
+if RENDER_EXTERNAL_HOSTNAME:
+    ALLOWED_HOSTS.append(RENDER_EXTERNAL_HOSTNAME)
+if not DEBUG:
+    CSRF_COOKIE_SECURE = True
+    SESSION_COOKIE_SECURE = True
+    SECURE_SSL_REDIRECT = True
+
+# --- INSTALLED APPS & MIDDLEWARE ---
+INSTALLED_APPS = [
+    "django.contrib.admin", "django.contrib.auth", "django.contrib.contenttypes",
+    "django.contrib.sessions", "django.contrib.messages",
+    "whitenoise.runserver_nostatic", "django.contrib.staticfiles",
+    'cloudinary_storage', 'cloudinary', "main.apps.MainConfig",
+]
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware", "whitenoise.middleware.WhiteNoiseMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware", "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware", "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware", "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+# --- CACHING ---
+# Redis-ի դեպքում cache-ը ընդհանուր է բոլոր worker-ների համար, և signal-ներով մաքրումը հասնում է բոլորին։
+# Առանց դրա օգտագործվում է պրոցեսի LocMemCache-ը, ուստի փոփոխվող տվյալների ժամկետները կարճացվում են։
+SHARED_CACHE = 'REDIS_URL' in os.environ
+if SHARED_CACHE:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['REDIS_URL']}}
+# Կենդանի որոնման track-երը cache-ում են. առանց REDIS_URL-ի այն թույլատրվում է միայն մեկ process-ով սերվերում։
+LIVE_SEARCH_ALLOW_LOCAL_STATE = os.environ.get('LIVE_SEARCH_ALLOW_LOCAL_STATE', '1' if DEBUG else '0') == '1'
+
+# --- SESSIONS & AUTHENTICATION CACHING ---
+# Ընդհանուր cache-ի դեպքում session-ները և օգտատերերը կարդացվում են cache-ից, բազան՝ միայն miss-ի դեպքում։
+# Պրոցեսի LocMemCache-ով logout-ը կամ գաղտնաբառի փոփոխությունը չէր հասնի մյուս worker-ներին,
+# ուստի առանց REDIS_URL-ի session-ները մնում են բազայում, իսկ օգտատերը չի cache-վում։
+if SHARED_CACHE:
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+AUTHENTICATION_BACKENDS = ["main.auth_backends.CachedModelBackend"]
+
+# --- TEMPLATES & INTERNATIONALIZATION ---
+TEMPLATES = [{"BACKEND": "django.template.backends.django.DjangoTemplates", "DIRS": [os.path.join(BASE_DIR, "templates")], "APP_DIRS": True,
+    "OPTIONS": {"context_processors": ["django.template.context_processors.debug", "django.template.context_processors.request", "django.contrib.auth.context_processors.auth", "django.contrib.messages.context_processors.messages",],},},]
+LANGUAGE_CODE = "en-us"; TIME_ZONE = "UTC"; USE_I18N = True; USE_TZ = True
+
+# --- DATABASES ---
+if 'DATABASE_URL' in os.environ:
+    DATABASES = {'default': dj_database_url.config(conn_max_age=600, ssl_require=True)}
+else:
+    DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'}}
+
+# --- STATIC & MEDIA FILES ---
+STATIC_URL = "/static/"
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")] # <-- Ավելացված կարևոր տողը
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+MEDIA_URL = '/media/'
+if 'CLOUDINARY_URL' in os.environ:
+    # Cloudinary-ն մնում է հիմնական պահոցը, իսկ կրկնվող ընթերցումները գալիս են տեղական քեշից։
+    DEFAULT_FILE_STORAGE = 'main.cached_storage.CachedMediaStorage'
+    MEDIA_CACHE_BACKEND = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+    CLOUDINARY_STORAGE = {'CLOUDINARY_URL': os.environ.get('CLOUDINARY_URL')}
+else:
+    MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', os.path.join(BASE_DIR, 'media_cache'))
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_BYTES', 1024 ** 3))
+
+# --- PAGE CACHING ---
+# Render-ը յուրաքանչյուր deploy-ի ժամանակ փոխում է RENDER_GIT_COMMIT-ը, որով անվավեր են դառնում cache-ված էջերը։
+PAGE_CACHE_VERSION = os.environ.get('PAGE_CACHE_VERSION', os.environ.get('RENDER_GIT_COMMIT', ''))
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 600))
+PRERENDERED_PAGES_ROOT = os.path.join(BASE_DIR, 'prerendered')
+# Նախապես render արված էջերը սպասարկվում են միայն առանց session cookie-ի հարցումներին։
+if os.environ.get('SERVE_PRERENDERED_PAGES') == '1':
+    MIDDLEWARE.insert(MIDDLEWARE.index("whitenoise.middleware.WhiteNoiseMiddleware") + 1, "main.page_cache.PrerenderedPageMiddleware")
+
+# --- FACE RECOGNITION ---
+# Միաժամանակյա inference-ների քանակը մեկ պրոցեսում և TF/BLAS thread-երը (ըստ լռելյայն՝ CPU / WEB_CONCURRENCY)։
+FACE_INFERENCE_CONCURRENCY = int(os.environ.get('FACE_INFERENCE_CONCURRENCY', 1))
+FACE_INFERENCE_THREADS = os.environ.get('FACE_INFERENCE_THREADS')
+FACE_SEARCH_WAIT_TIMEOUT = float(os.environ.get('FACE_SEARCH_WAIT_TIMEOUT', 3))
+
+# --- PROFILING ---
+# Միացված է միայն PROFILING_ENABLED=1-ի դեպքում։ cProfile-ը աշխատում է հարցումների SAMPLE_RATE մասում,
+# իսկ .prof ֆայլը պահվում է միայն PROFILING_SLOW_MS-ից դանդաղ հարցումների համար (/admin/profiling/)։
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', 1000))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, "main.profiling.ProfilingMiddleware")
+
+# --- BACKGROUND JOBS ---
+# '1'-ի դեպքում առաջադրանքները կատարվում են հենց հարցման մեջ (առանց `manage.py run_jobs` worker-ի)։
+# build.sh-ը worker չի գործարկում, ուստի լռելյայն '1' է. առանձին worker ունեցող deploy-ը դնում է '0'։
+JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER', '1') == '1'
+
+# --- PASSWORDS & API KEYS ---
+# Նախընտրելի hasher-ը առաջինն է, մյուսները մնում են հին hash-երը ստուգելու համար.
+# մուտքի ժամանակ Django-ն ինքնաբերաբար վերա-hash է անում գաղտնաբառը նախընտրելի hasher-ով։
+_PASSWORD_HASHER_POLICIES = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+_preferred_hasher = _PASSWORD_HASHER_POLICIES[os.environ.get('PASSWORD_HASHER_POLICY', 'pbkdf2')]
+PASSWORD_HASHERS = [_preferred_hasher] + [h for h in _PASSWORD_HASHER_POLICIES.values() if h != _preferred_hasher] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+LOGIN_TRUSTED_PROXY_COUNT = int(os.environ.get('LOGIN_TRUSTED_PROXY_COUNT', 1 if RENDER_EXTERNAL_HOSTNAME else 0))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.environ.get('LOGIN_MAX_FAILURES_PER_ACCOUNT', 5))
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', 30))
+AUTH_PASSWORD_VALIDATORS = [{"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},{"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},{"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},{"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},]
 GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
\ No newline at end of file
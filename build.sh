@@ -1,8 +1,11 @@
-#!/usr/bin/env bash
-# exit on error
-set -o errexit
-
-pip install -r requirements.txt
-
-python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+#!/usr/bin/env bash
+# exit on error
+set -o errexit
+
+pip install -r requirements.txt
+
+python manage.py collectstatic --no-input
+python manage.py migrate
+if [ "$SERVE_PRERENDERED_PAGES" = "1" ]; then
+    python manage.py prerender_pages
+fi
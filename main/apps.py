@@ -1,6 +1,9 @@
-from django.apps import AppConfig
-
-
-class MainConfig(AppConfig):
-    default_auto_field = "django.db.models.BigAutoField"
-    name = "main"
+from django.apps import AppConfig
+
+
+class MainConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "main"
+
+    def ready(self):
+        from . import signals  # noqa: F401
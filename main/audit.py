@@ -0,0 +1,163 @@
+import atexit
+import ipaddress
+import os
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .login_throttle import client_ip
+
+AUDIT_BATCH_SIZE = getattr(settings, "AUDIT_BATCH_SIZE", 200)
+AUDIT_FLUSH_INTERVAL = getattr(settings, "AUDIT_FLUSH_INTERVAL", 5.0)
+# Եթե բազան անհասանելի է, բուֆերը չի աճում այս սահմանից ավելի։
+AUDIT_MAX_BUFFER = getattr(settings, "AUDIT_MAX_BUFFER", 10000)
+HISTORY_MAX_LIMIT = 500
+
+
+class AuditBuffer:
+    """
+    Worker-ի հիշողության բուֆեր։ record()-ը միայն ավելացնում է ցուցակին, իսկ
+    ֆոնային thread-ը գրում է խմբաքանակը մեկ bulk_create-ով, երբ կուտակվում է
+    AUDIT_BATCH_SIZE գրառում կամ անցնում է AUDIT_FLUSH_INTERVAL վայրկյան։
+    """
+
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, interval=AUDIT_FLUSH_INTERVAL):
+        self.batch_size, self.interval = batch_size, interval
+        self._events, self._lock = [], threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread, self._pid = None, None
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # gunicorn-ի fork-ից հետո ծնողի thread-ը գոյություն չունի, ուստի ստուգում ենք pid-ը։
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-flush", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        """Գրում է կուտակված գրառումները։ Վերադարձնում է գրված գրառումների քանակը։"""
+        from .models import AccessEvent
+
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return 0
+        try:
+            AccessEvent.objects.bulk_create(events, batch_size=self.batch_size)
+        except DatabaseError as e:
+            with self._lock:
+                self._events[:0] = events
+                dropped = len(self._events) - AUDIT_MAX_BUFFER
+                if dropped > 0:
+                    del self._events[:dropped]
+            print(f"ERROR: Could not write {len(events)} audit event(s): {e}")
+            return 0
+        return len(events)
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+
+_buffer = AuditBuffer()
+atexit.register(_buffer.flush)
+
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return None
+
+
+def record(request, patient_id, action):
+    """Գրանցում է դիտումը բուֆերում։ Բազային դիմում չի կատարվում։"""
+    from .models import AccessEvent
+
+    actor = request.user if request.user.is_authenticated else None
+    _buffer.add(
+        AccessEvent(
+            patient_id=patient_id,
+            actor_id=actor.pk if actor else None,
+            action=action,
+            ip_address=_valid_ip(client_ip(request)),
+            user_agent=request.META.get("HTTP_USER_AGENT", "")[:255],
+            accessed_at=timezone.now(),
+        )
+    )
+
+
+def audited(action, patient_id_from):
+    """
+    View-ի decorator։ Հաջող պատասխանից (200 կամ 304) հետո գրանցում է դիտումը։
+    patient_id_from(request, *args, **kwargs)-ը վերադարձնում է պացիենտի user id-ն կամ None։
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patient_id = patient_id_from(request, *args, **kwargs)
+                if patient_id is not None:
+                    record(request, patient_id, action)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def flush():
+    return _buffer.flush()
+
+
+def access_history(patient_id, limit=100, before=None, include_ip=False):
+    """
+    Պացիենտի դիտումների պատմությունը՝ նորից հին, access_patient_recent_idx ինդեքսով։
+    Հաջորդ էջի համար փոխանցեք վերջին գրառման accessed_at-ը որպես before։
+    Դիտողների IP հասցեները ներառվում են միայն include_ip-ի դեպքում (staff)։
+    """
+    from .models import AccessEvent
+
+    flush()
+    events = AccessEvent.objects.filter(patient_id=patient_id)
+    if before is not None:
+        events = events.filter(accessed_at__lt=before)
+    fields = [
+        "accessed_at",
+        "action",
+        "actor_id",
+        "actor__first_name",
+        "actor__last_name",
+    ]
+    if include_ip:
+        fields.append("ip_address")
+    return list(
+        events.order_by("-accessed_at").values(*fields)[
+            : max(1, min(limit, HISTORY_MAX_LIMIT))
+        ]
+    )
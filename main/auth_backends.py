@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_KEY = "auth_user:{user_id}"
+USER_CACHE_TIMEOUT = 60 * 15
+# Process-local cache-ի դեպքում մյուս worker-ները չեն տեսնում մաքրումը (գաղտնաբառի փոփոխություն,
+# ապաակտիվացում), ուստի օգտատերը cache-վում է միայն ընդհանուր cache-ի դեպքում։
+USER_CACHE_ENABLED = getattr(settings, "SHARED_CACHE", False)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, որը յուրաքանչյուր հարցման ժամանակ օգտատիրոջը վերցնում է cache-ից։
+    Cache-ը մաքրվում է CustomUser-ի պահպանման/ջնջման ժամանակ (main/signals.py)։
+    Առանց SHARED_CACHE-ի աշխատում է ինչպես սովորական ModelBackend-ը։
+    """
+
+    def get_user(self, user_id):
+        if not USER_CACHE_ENABLED:
+            return super().get_user(user_id)
+        key = USER_CACHE_KEY.format(user_id=user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_user(user_id):
+    cache.delete(USER_CACHE_KEY.format(user_id=user_id))
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+HASH_CHUNK_SIZE = 64 * 1024
+# Քեշի չափը հաշվվում է գրառումներով, իսկ թղթապանակն ամբողջությամբ նորից հաշվվում է
+# սահմանը գերազանցելիս կամ այսքան վայրկյանը մեկ (այլ process-ների գրառումների համար)։
+RESCAN_INTERVAL = 5 * 60
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class CachedMediaStorage(Storage):
+    """
+    Read-through տեղական քեշ հեռավոր storage-ի (օր.՝ Cloudinary) շուրջ։
+
+    Ֆայլերը պահվում են ըստ բովանդակության SHA-256-ի (objects/ab/abcd...), իսկ
+    ֆայլի անունից hash կապը՝ index/ թղթապանակում։ Կարդալիս բովանդակությունը
+    ստուգվում է hash-ով, գրելիս ֆայլը միանգամից քեշավորվում է, իսկ քեշի չափը
+    սահմանափակվում է՝ հեռացնելով ամենավաղուց չօգտագործվածները (LRU)։
+    """
+
+    is_read_through_cache = True
+
+    def __init__(self, backend=None, cache_dir=None, max_bytes=None):
+        backend = backend or settings.MEDIA_CACHE_BACKEND
+        self.backend = import_string(backend)() if isinstance(backend, str) else backend
+        self.cache_dir = cache_dir or settings.MEDIA_CACHE_DIR
+        self.max_bytes = max_bytes or settings.MEDIA_CACHE_MAX_BYTES
+        self._size = None
+        self._scanned_at = 0.0
+        self._size_lock = threading.Lock()
+
+    # --- Քեշի ներքին կառուցվածքը ---
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def _index_path(self, name):
+        key = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "index", key[:2], key)
+
+    def _write_atomic(self, path, chunks):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def cached_path(self, name):
+        """Վերադարձնում է ստուգված տեղական պատճենի ճանապարհը կամ None։"""
+        try:
+            with open(self._index_path(name)) as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            return None
+        if _sha256_file(path) != digest:
+            os.remove(path)
+            return None
+        os.utime(path)  # LRU-ի համար նշում ենք վերջին օգտագործման պահը։
+        return path
+
+    def _store(self, name, chunks):
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        os.makedirs(objects_dir, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            path = self._object_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._write_atomic(self._index_path(name), [digest.hexdigest().encode()])
+        self._note_stored(size)
+        return path
+
+    def _note_stored(self, size):
+        """Ավելացնում է չափը հաշվարկին և մաքրում քեշը միայն սահմանը գերազանցելիս։"""
+        with self._size_lock:
+            if (
+                self._size is not None
+                and time.monotonic() - self._scanned_at < RESCAN_INTERVAL
+            ):
+                self._size += size
+                if self._size <= self.max_bytes:
+                    return
+        self._evict()
+
+    def _evict(self):
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        entries, total = [], 0
+        for root, _, files in os.walk(objects_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            # Ազատում ենք մինչև սահմանի 90%-ը, որպեսզի ամեն գրառման ժամանակ չմաքրենք։
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        with self._size_lock:
+            self._size, self._scanned_at = total, time.monotonic()
+
+    def _ensure_cached(self, name):
+        path = self.cached_path(name)
+        if path is None:
+            with self.backend.open(name, "rb") as remote:
+                path = self._store(name, remote.chunks())
+        return path
+
+    # --- Storage API ---
+
+    def _open(self, name, mode="rb"):
+        if "w" in mode or "a" in mode or "+" in mode:
+            raise ValueError("CachedMediaStorage files can only be opened for reading.")
+        return File(open(self._ensure_cached(name), mode), name=name)
+
+    def _save(self, name, content):
+        name = self.backend._save(name, content)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        self._store(name, content.chunks())
+        return name
+
+    def path(self, name):
+        """Տեղական պատճենի ճանապարհը (միայն կարդալու համար)։"""
+        return self._ensure_cached(name)
+
+    def delete(self, name):
+        self.backend.delete(name)
+        try:
+            os.remove(self._index_path(name))
+        except OSError:
+            pass
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def size(self, name):
+        path = self.cached_path(name)
+        return os.path.getsize(path) if path else self.backend.size(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def get_available_name(self, name, max_length=None):
+        return self.backend.get_available_name(name, max_length=max_length)
+
+    def generate_filename(self, filename):
+        return self.backend.generate_filename(filename)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Քարտը պահվում է user_id-ով, իսկ public_profile_id → user_id կապը անփոփոխ է,
+# ուստի այն cache-ում պահվում է առանց ժամկետի։
+CARD_KEY = "emergency_card:{user_id}"
+PROFILE_KEY = "emergency_card_user:{profile_id}"
+# Անանուն այցելուների համար render արված /profile/<uuid>/ էջը՝ էջի etag-ով։
+PAGE_KEY = "emergency_card_page:{user_id}"
+# Առանց ընդհանուր cache-ի այլ worker-ներում փոփոխությունը երևում է առավելագույնը մեկ րոպեում։
+CARD_CACHE_TIMEOUT = 60 * 60 * 24 if getattr(settings, "SHARED_CACHE", False) else 60
+
+
+def build_card(user_id):
+    """Հավաքում է շտապ օգնության քարտը բազայից և պահում cache-ում։"""
+    from .models import CustomUser, PatientCondition, PatientMedication, PatientSurgery
+
+    user = (
+        CustomUser.objects.select_related("gender", "patient_profile__blood_group")
+        .filter(id=user_id, patient_profile__isnull=False)
+        .first()
+    )
+    if user is None:
+        return None
+    patient = user.patient_profile
+    conditions = list(
+        PatientCondition.objects.filter(patient=patient).values_list(
+            "condition__name", "diagnosis_date"
+        )
+    )
+    medications = list(
+        PatientMedication.objects.filter(patient=patient).values_list(
+            "medication__name", "dosage", "start_date", "notes"
+        )
+    )
+    card = {
+        "profile_id": str(user.public_profile_id),
+        "full_name": user.get_full_name() or user.username,
+        "date_of_birth": user.date_of_birth.isoformat() if user.date_of_birth else None,
+        "gender": user.gender.name if user.gender else None,
+        "blood_group": patient.blood_group.group_name if patient.blood_group else None,
+        "allergies": list(patient.allergies.values_list("name", flat=True)),
+        "conditions": [name for name, _ in conditions],
+        "medications": [
+            {"name": name, "dosage": dosage} for name, dosage, _, _ in medications
+        ],
+        "emergency_contact_phone": user.emergency_contact_phone or None,
+    }
+    payload = json.dumps(card, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    # /profile/<uuid>/ էջը ցույց է տալիս նաև քարտից դուրս դաշտեր, ուստի դրա etag-ը
+    # հաշվվում է էջի բոլոր տվյալներից, որպեսզի դրանց փոփոխությունը 304 չտա։
+    page_data = {
+        "card": card,
+        "conditions": conditions,
+        "medications": medications,
+        "surgeries": list(
+            PatientSurgery.objects.filter(patient=patient).values_list(
+                "surgery__name", "surgery_date", "notes"
+            )
+        ),
+        "user": [
+            user.email,
+            user.phone_number,
+            user.address,
+            user.profile_picture.name,
+            user.profile_thumbnail.name,
+        ],
+        "patient": [patient.weight_kg, patient.height_cm, patient.other_notes],
+    }
+    page_payload = json.dumps(page_data, sort_keys=True, default=str).encode("utf-8")
+    entry = {
+        "user_id": user_id,
+        "card": card,
+        "json": payload,
+        "etag": hashlib.sha1(payload).hexdigest(),
+        "page_etag": hashlib.sha1(page_payload).hexdigest(),
+    }
+    cache.set(CARD_KEY.format(user_id=user_id), entry, CARD_CACHE_TIMEOUT)
+    return entry
+
+
+def profile_user_id(profile_id):
+    """public_profile_id-ի օգտատիրոջ id-ն կամ None, եթե այդպիսի պրոֆիլ չկա։"""
+    profile_key = PROFILE_KEY.format(profile_id=profile_id)
+    user_id = cache.get(profile_key)
+    if user_id is None:
+        from .models import CustomUser
+
+        user_id = (
+            CustomUser.objects.filter(public_profile_id=profile_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if user_id is None:
+            return None
+        cache.set(profile_key, user_id, None)
+    return user_id
+
+
+def forget_profile(profile_id):
+    cache.delete(PROFILE_KEY.format(profile_id=profile_id))
+
+
+def get_card(profile_id):
+    """
+    Վերադարձնում է {"card", "json", "etag", "page_etag"} կամ None, եթե պացիենտ չկա։
+    Cache hit-ի դեպքում բազային դիմում չի կատարվում։
+    """
+    user_id = profile_user_id(profile_id)
+    if user_id is None:
+        return None
+    return cache.get(CARD_KEY.format(user_id=user_id)) or build_card(user_id)
+
+
+def get_page(entry):
+    """Էջի ընթացիկ տարբերակի համար պահված HTML-ը կամ None։"""
+    page = cache.get(PAGE_KEY.format(user_id=entry["user_id"]))
+    if page is None or page["etag"] != entry["page_etag"]:
+        return None
+    return page["html"]
+
+
+def set_page(entry, html):
+    cache.set(
+        PAGE_KEY.format(user_id=entry["user_id"]),
+        {"etag": entry["page_etag"], "html": html},
+        CARD_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_card(user_id):
+    invalidate_cards([user_id])
+
+
+def invalidate_cards(user_ids):
+    cache.delete_many(
+        [
+            key.format(user_id=user_id)
+            for user_id in user_ids
+            for key in (CARD_KEY, PAGE_KEY)
+        ]
+    )
+
+
+def warm_card(user_id):
+    """Վերակառուցում է քարտը, եթե այն արդեն չի վերակառուցվել նույն transaction-ից։"""
+    if cache.get(CARD_KEY.format(user_id=user_id)) is None:
+        build_card(user_id)
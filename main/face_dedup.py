@@ -0,0 +1,80 @@
+import hashlib
+
+from django.conf import settings
+
+# dHash-ի տարբեր բիթերի առավելագույն քանակը (64-ից), որի դեպքում նկարները համարվում են գրեթե նույնը։
+PERCEPTUAL_MAX_DISTANCE = getattr(settings, "FACE_DUPLICATE_PHASH_DISTANCE", 5)
+# Embedding-ների cosine հեռավորությունը, որից փոքրը նույն լուսանկարի կրկնօրինակ է
+# (նույն մարդու տարբեր լուսանկարները սովորաբար 0.15-ից հեռու են)։
+EMBEDDING_MAX_DISTANCE = getattr(settings, "FACE_DUPLICATE_EMBEDDING_DISTANCE", 0.05)
+DUPLICATE_MESSAGE = "Այս նկարն արդեն վերբեռնված է։"
+NEAR_DUPLICATE_MESSAGE = (
+    "Այս նկարը գրեթե նույնն է արդեն վերբեռնված նկարներից մեկին։ Խնդրում ենք ավելացնել "
+    "այլ դիրքով կամ լուսավորությամբ նկար։"
+)
+
+
+def content_hash(buffer):
+    return hashlib.sha256(buffer).hexdigest()
+
+
+def perceptual_hash(image_bgr):
+    """64-բիթանոց dHash (hex)՝ 9×8 մոխրագույն նկարի հարևան պիքսելների համեմատությամբ։"""
+    import cv2
+
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return f"{sum(1 << i for i, bit in enumerate(bits) if bit):016x}"
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def find_duplicate(user_id, digest, phash):
+    """
+    Համեմատում է նոր նկարը օգտատիրոջ եղած նկարների հետ։ Վերադարձնում է
+    (image_id, DUPLICATE_MESSAGE կամ NEAR_DUPLICATE_MESSAGE) կամ None։
+    """
+    from .models import UserFaceImage
+
+    near = None
+    for image_id, other_digest, other_phash in UserFaceImage.objects.filter(
+        user_id=user_id
+    ).values_list("id", "content_hash", "perceptual_hash"):
+        if other_digest and other_digest == digest:
+            return image_id, DUPLICATE_MESSAGE
+        if near is None and other_phash and hamming(phash, other_phash) <= PERCEPTUAL_MAX_DISTANCE:
+            near = image_id, NEAR_DUPLICATE_MESSAGE
+    return near
+
+
+def find_embedding_duplicate(face_image, embedding):
+    """
+    Օգտատիրոջ այլ նկարներից այն, որի embedding-ը EMBEDDING_MAX_DISTANCE-ից մոտ է
+    (օր.՝ նույն լուսանկարը կտրված կամ այլ ձևաչափով), կամ None։
+    """
+    import numpy as np
+
+    from .face_index import embedding_from_bytes
+    from .models import UserFaceImage
+
+    rows = (
+        UserFaceImage.objects.filter(
+            user_id=face_image.user_id,
+            embedding__isnull=False,
+            duplicate_of__isnull=True,
+        )
+        .exclude(pk=face_image.pk)
+        .values_list("id", "embedding")
+    )
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector = vector / (np.linalg.norm(vector) or 1.0)
+    best_id, best_distance = None, EMBEDDING_MAX_DISTANCE
+    for image_id, data in rows:
+        other = embedding_from_bytes(data)
+        distance = 1.0 - float(vector @ other) / (float(np.linalg.norm(other)) or 1.0)
+        if distance <= best_distance:
+            best_id, best_distance = image_id, distance
+    return best_id
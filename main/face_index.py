@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+
+from .hospital_index import normalize
+
+MODEL_DIR = os.path.join(settings.BASE_DIR, "face_models")
+MODEL_PATH = os.path.join(MODEL_DIR, "facenet_model.pkl")
+PARTITION_DIR = os.path.join(MODEL_DIR, "partitions")
+PARTITION_MANIFEST = "manifest.json"
+# Պացիենտը պատկանում է հաստատությանը, եթե այնտեղի բժիշկը դիտել է նրա տվյալները այս ժամկետում։
+AFFILIATION_DAYS = getattr(settings, "FACE_PARTITION_AFFILIATION_DAYS", 365)
+
+
+def embedding_to_bytes(embedding):
+    import numpy as np
+
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def embedding_from_bytes(data):
+    import numpy as np
+
+    return np.frombuffer(bytes(data), dtype=np.float32)
+
+
+def train_classifier(embeddings, user_ids, weights=None):
+    """
+    2 և ավելի օգտատիրոջ դեպքում մարզում է SVM, հակառակ դեպքում՝ պարզ k-NN։
+    weights-ը (նկարների որակը) SVM-ում նվազեցնում է վատ նկարների ազդեցությունը։
+    Վերադարձնում է նույն dict-ը, որը պահվում է facenet_model.pkl-ում։
+    """
+    if len(set(user_ids)) >= 2:
+        from sklearn.preprocessing import LabelEncoder
+        from sklearn.svm import SVC
+
+        label_encoder = LabelEncoder()
+        labels = label_encoder.fit_transform(user_ids)
+        svm_clf = SVC(kernel="linear", probability=True, class_weight="balanced")
+        svm_clf.fit(embeddings, labels, sample_weight=weights)
+        return {"type": "svm", "classifier": svm_clf, "label_encoder": label_encoder}
+
+    return train_knn(embeddings, user_ids)
+
+
+def train_knn(embeddings, user_ids):
+    from sklearn.neighbors import KNeighborsClassifier
+
+    knn_clf = KNeighborsClassifier(n_neighbors=1)
+    knn_clf.fit(embeddings, user_ids)
+    return {"type": "knn", "classifier": knn_clf}
+
+
+def save_model(model_data, model_path=MODEL_PATH):
+    """
+    Գրում է մոդելը ժամանակավոր ֆայլի մեջ և ատոմար փոխարինում հինը, որպեսզի
+    վեբ պրոցեսները երբեք կիսատ ֆայլ չկարդան (տես face_recognition_service._load_model)։
+    """
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(model_path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(model_data, f)
+        os.replace(tmp_path, model_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def quality_weight(quality):
+    """Որակի գնահատականը՝ որպես մարզման կշիռ։ Հին նկարները (առանց գնահատականի) ունեն 1 կշիռ։"""
+    return 1.0 if quality is None else max(quality, 0.05)
+
+
+def stored_embeddings():
+    """
+    Վերադարձնում է (embeddings, user_ids, weights) արդեն հաշված UserFaceImage.embedding-ներից
+    և պրոֆիլի նկարների CustomUser.profile_embedding-ներից (ինչպես train_face_model-ում)։
+    MIN_ENROLL_QUALITY-ից ցածր գնահատական ունեցող նկարները բաց են թողնվում։
+    """
+    from django.db.models import Q
+
+    from .face_quality import MIN_ENROLL_QUALITY
+    from .models import CustomUser, UserFaceImage
+
+    images = (
+        UserFaceImage.objects.filter(embedding__isnull=False)
+        .filter(Q(quality__isnull=True) | Q(quality__gte=MIN_ENROLL_QUALITY))
+        .order_by()
+        .values_list("user_id", "embedding", "quality")
+    )
+    pictures = (
+        CustomUser.objects.filter(profile_embedding__isnull=False)
+        .filter(Q(profile_quality__isnull=True) | Q(profile_quality__gte=MIN_ENROLL_QUALITY))
+        .order_by()
+        .values_list("id", "profile_embedding", "profile_quality")
+    )
+    embeddings, user_ids, weights = [], [], []
+    for rows in (images, pictures):
+        for user_id, data, quality in rows.iterator():
+            embeddings.append(embedding_from_bytes(data))
+            user_ids.append(user_id)
+            weights.append(quality_weight(quality))
+    return embeddings, user_ids, weights
+
+
+def model_user_ids(model_data):
+    import numpy as np
+
+    if model_data.get("type") == "svm":
+        return set(model_data["label_encoder"].classes_.tolist())
+    return set(np.asarray(model_data["classifier"].classes_).tolist())
+
+
+def rebuild_index(model_path=MODEL_PATH, partition_dir=PARTITION_DIR):
+    """
+    Մարզում է ընդհանուր մոդելը և հաստատությունների partition-ները պահված
+    embedding-ներից՝ առանց նկարները նորից ներբեռնելու։
+    """
+    stored = stored_embeddings()
+    embeddings, user_ids, weights = stored
+    if not embeddings:
+        return None
+    model_data = train_classifier(embeddings, user_ids, weights)
+    save_model(model_data, model_path)
+    rebuild_partitions(stored, partition_dir)
+    return model_data
+
+
+def facility_key(name):
+    """Հաստատության բանալին՝ նույն նորմալացմամբ, ինչ hospital_index-ում։"""
+    return normalize(name)
+
+
+def partition_path(facility, partition_dir=PARTITION_DIR):
+    digest = hashlib.sha1(facility_key(facility).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(partition_dir, f"{digest}.pkl")
+
+
+def partition_members():
+    """
+    Վերադարձնում է {facility_key: set(user_id)}։ Հաստատությանը պատկանում են այնտեղ
+    աշխատող բժիշկները (DoctorProfile.workplace) և այն պացիենտները, որոնց տվյալները
+    այդ բժիշկները դիտել են վերջին AFFILIATION_DAYS օրում (AccessEvent)։
+    """
+    from django.utils import timezone
+
+    from .models import AccessEvent, DoctorProfile
+
+    members = defaultdict(set)
+    for user_id, workplace in DoctorProfile.objects.exclude(
+        workplace__isnull=True
+    ).values_list("user_id", "workplace"):
+        if facility_key(workplace):
+            members[facility_key(workplace)].add(user_id)
+    visits = (
+        AccessEvent.objects.filter(
+            action=AccessEvent.DETAILS,
+            accessed_at__gte=timezone.now() - timedelta(days=AFFILIATION_DAYS),
+            actor__doctor_profile__workplace__gt="",
+        )
+        .order_by()
+        .values_list("actor__doctor_profile__workplace", "patient_id")
+        .distinct()
+    )
+    for workplace, patient_id in visits.iterator():
+        if facility_key(workplace):
+            members[facility_key(workplace)].add(patient_id)
+    return members
+
+
+def _read_manifest(partition_dir):
+    try:
+        with open(os.path.join(partition_dir, PARTITION_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest, partition_dir):
+    fd, tmp_path = tempfile.mkstemp(dir=partition_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, os.path.join(partition_dir, PARTITION_MANIFEST))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def rebuild_partitions(stored=None, partition_dir=PARTITION_DIR):
+    """
+    Մարզում է առանձին k-NN մոդել յուրաքանչյուր հաստատության համար։ Partition-ը
+    վերամարզվում և ատոմար փոխարինվում է միայն այն դեպքում, երբ փոխվել են նրա
+    անդամների embedding-ները (fingerprint-ը manifest.json-ում), իսկ անհետացած
+    հաստատությունների ֆայլերը ջնջվում են։ k-NN-ը, ի տարբերություն SVM-ի, մերժում է
+    partition-ից դուրս գտնվող դեմքերը հեռավորության շեմով։
+    Վերադարձնում է {"built", "unchanged", "removed"} քանակները։
+    """
+    embeddings, user_ids, _ = stored or stored_embeddings()
+    by_user = defaultdict(list)
+    for embedding, user_id in zip(embeddings, user_ids):
+        by_user[user_id].append(embedding)
+
+    os.makedirs(partition_dir, exist_ok=True)
+    old_manifest, manifest = _read_manifest(partition_dir), {}
+    stats = {"built": 0, "unchanged": 0, "removed": 0}
+    for facility, members in partition_members().items():
+        enrolled = sorted(user_id for user_id in members if user_id in by_user)
+        if not enrolled:
+            continue
+        digest = hashlib.sha1()
+        part_embeddings, part_user_ids = [], []
+        for user_id in enrolled:
+            for data in sorted(embedding_to_bytes(e) for e in by_user[user_id]):
+                digest.update(str(user_id).encode() + b":" + data)
+                part_embeddings.append(embedding_from_bytes(data))
+                part_user_ids.append(user_id)
+        path = partition_path(facility, partition_dir)
+        entry = {
+            "file": os.path.basename(path),
+            "users": len(enrolled),
+            "fingerprint": digest.hexdigest(),
+        }
+        manifest[facility] = entry
+        if old_manifest.get(facility) == entry and os.path.exists(path):
+            stats["unchanged"] += 1
+            continue
+        save_model(
+            {**train_knn(part_embeddings, part_user_ids), "facility": facility},
+            path,
+        )
+        stats["built"] += 1
+    _write_manifest(manifest, partition_dir)
+
+    keep = {entry["file"] for entry in manifest.values()}
+    for name in os.listdir(partition_dir):
+        if name.endswith(".pkl") and name not in keep:
+            os.remove(os.path.join(partition_dir, name))
+            stats["removed"] += 1
+    return stats
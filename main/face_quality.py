@@ -0,0 +1,89 @@
+import math
+
+from django.conf import settings
+
+# Նվազագույն ընդհանուր գնահատականը, որից ցածր embedding չի հաշվվում։
+MIN_ENROLL_QUALITY = getattr(settings, "FACE_QUALITY_MIN_ENROLL", 0.35)
+MIN_SEARCH_QUALITY = getattr(settings, "FACE_QUALITY_MIN_SEARCH", 0.2)
+LOW_QUALITY_MESSAGE = (
+    "Դեմքը շատ փոքր է, պղտոր, թեք կամ վատ լուսավորված։ Խնդրում ենք փորձել այլ նկարով։"
+)
+
+# Դեմքի կարճ կողմը (px), որից փոքրը անօգտագործելի է, և որից մեծը՝ լիարժեք։
+FACE_SIDE_MIN, FACE_SIDE_FULL = 40, 112
+# Laplacian-ի դիսպերսիա 112px-ի բերված դեմքի վրա՝ պղտոր / սուր։
+SHARPNESS_MIN, SHARPNESS_FULL = 20.0, 200.0
+# Քթի շեղումը աչքերի միջնակետից՝ աչքերի հեռավորության հարաբերությամբ (yaw)։
+MAX_YAW_RATIO = 0.45
+# Քիթը աչքերի և բերանի միջև՝ մոտ 0.55 ուղիղ նայելիս (pitch)։
+FRONTAL_PITCH_RATIO, MAX_PITCH_DEVIATION = 0.55, 0.35
+
+
+def _ramp(value, low, high):
+    return min(1.0, max(0.0, (value - low) / (high - low)))
+
+
+def _face_region(image, box):
+    x, y, w, h = (int(v) for v in box)
+    x, y = max(0, x), max(0, y)
+    return image[y : y + max(1, h), x : x + max(1, w)]
+
+
+def size_score(box):
+    return _ramp(min(box[2], box[3]), FACE_SIDE_MIN, FACE_SIDE_FULL)
+
+
+def sharpness_score(gray_face):
+    import cv2
+
+    normalized = cv2.resize(gray_face, (FACE_SIDE_FULL, FACE_SIDE_FULL))
+    variance = cv2.Laplacian(normalized, cv2.CV_64F).var()
+    return _ramp(variance, SHARPNESS_MIN, SHARPNESS_FULL)
+
+
+def pose_score(keypoints):
+    """Գնահատում է yaw-ը և pitch-ը MTCNN-ի 5 կետերով։ Առանց կետերի՝ 1։"""
+    try:
+        (lx, ly), (rx, ry) = keypoints["left_eye"], keypoints["right_eye"]
+        nose = keypoints["nose"]
+        mouth_y = (keypoints["mouth_left"][1] + keypoints["mouth_right"][1]) / 2
+    except (KeyError, TypeError, ValueError):
+        return 1.0
+    eyes = ((lx + rx) / 2, (ly + ry) / 2)
+    eye_distance = math.hypot(rx - lx, ry - ly)
+    eye_to_mouth = mouth_y - eyes[1]
+    if eye_distance < 1 or eye_to_mouth < 1:
+        return 0.0
+    yaw = abs(nose[0] - eyes[0]) / eye_distance
+    pitch = abs((nose[1] - eyes[1]) / eye_to_mouth - FRONTAL_PITCH_RATIO)
+    return (1 - _ramp(yaw, 0, MAX_YAW_RATIO)) * (1 - _ramp(pitch, 0, MAX_PITCH_DEVIATION))
+
+
+def exposure_score(gray_face):
+    """Միջին պայծառությունը մոտ՝ միջինին, և քիչ «այրված»/«խեղդված» պիքսելներ։"""
+    mean = float(gray_face.mean())
+    clipped = float(((gray_face < 10) | (gray_face > 245)).mean())
+    return (1 - _ramp(abs(mean - 128), 40, 118)) * (1 - _ramp(clipped, 0.05, 0.5))
+
+
+def assess(image_bgr, detection):
+    """
+    Վերադարձնում է {"size", "sharpness", "pose", "exposure", "score"}՝ 0..1 միջակայքում։
+    score-ը բաղադրիչների երկրաչափական միջինն է, ուստի ցանկացած զրոյական
+    բաղադրիչ (օր.՝ պրոֆիլով դեմք) զրոյացնում է ընդհանուր գնահատականը։
+    """
+    import cv2
+
+    box = detection["box"]
+    face = _face_region(image_bgr, box)
+    if face.size == 0:
+        return {"size": 0.0, "sharpness": 0.0, "pose": 0.0, "exposure": 0.0, "score": 0.0}
+    gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    parts = {
+        "size": size_score(box),
+        "sharpness": sharpness_score(gray),
+        "pose": pose_score(detection.get("keypoints")),
+        "exposure": exposure_score(gray),
+    }
+    parts["score"] = float(math.prod(parts.values()) ** 0.25)
+    return parts
@@ -1,84 +1,183 @@
-import os, pickle, numpy as np
-from django.conf import settings
-
-_model_data, _facenet_embedder = None, None
-_model_path = os.path.join(settings.BASE_DIR, "face_models", "facenet_model.pkl")
-SVM_CONFIDENCE_THRESHOLD, KNN_DISTANCE_THRESHOLD = 0.75, 0.7
-
-def _get_embedder():
-    """Lazy-loads the FaceNet embedder model."""
-    global _facenet_embedder
-    if _facenet_embedder is None:
-        from keras_facenet import FaceNet
-        try:
-            _facenet_embedder = FaceNet(); print("INFO: FaceNet embedder loaded into memory.")
-        except Exception as e: print(f"ERROR: Could not initialize FaceNet embedder: {e}")
-    return _facenet_embedder
-
-def extract_embedding(image_cv2):
-    """Հանրային ֆունկցիա՝ FaceNet embedding ստանալու համար։"""
-    embedder = _get_embedder()
-    if embedder is None or image_cv2 is None: return None
-    import cv2
-    try:
-        image_rgb = cv2.cvtColor(image_cv2, cv2.COLOR_BGR2RGB)
-        detections = embedder.extract(image_rgb, threshold=0.95)
-        return detections[0]['embedding'] if detections else None
-    except: return None
-
-def detect_face_in_image_data(image_data):
-    """Ստուգում է, թե արդյոք տրված նկարի bytes-երում դեմք կա։"""
-    import cv2
-    try:
-        image_cv2 = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
-        return extract_embedding(image_cv2) is not None
-    except: return False
-
-def _load_model():
-    """Բեռնում է մարզված մոդելը հիշողության մեջ։"""
-    global _model_data
-    if _model_data is None and os.path.exists(_model_path):
-        try:
-            with open(_model_path, "rb") as f: _model_data = pickle.load(f)
-            model_type = _model_data.get("type", "unknown").upper()
-            print(f"INFO: Custom recognition model (TYPE: {model_type}) loaded.")
-        except Exception as e: print(f"ERROR: Could not load custom model: {e}")
-
-def recognize_face(image_file):
-    _load_model()
-    if _model_data is None: return None, "Ճանաչման մոդելը բեռնված չէ։"
-    
-    import cv2
-    try: image = cv2.imdecode(np.frombuffer(image_file.read(), np.uint8), cv2.IMREAD_COLOR)
-    except Exception: return None, "Նկարի ֆորմատը սխալ է։"
-
-    embedding = extract_embedding(image)
-    if embedding is None: return None, "Նկարում դեմք չի հայտնաբերվել։"
-    
-    model_type = _model_data.get("type")
-
-    if model_type == "svm":
-        from sklearn.preprocessing import LabelEncoder
-        from sklearn.svm import SVC
-        svm_clf, label_encoder = _model_data["classifier"], _model_data["label_encoder"]
-        probabilities = svm_clf.predict_proba([embedding])[0]
-        best_class_index = np.argmax(probabilities)
-        confidence = probabilities[best_class_index]
-        if confidence >= SVM_CONFIDENCE_THRESHOLD:
-            predicted_label = svm_clf.classes_[best_class_index]
-            predicted_user_id = label_encoder.inverse_transform([predicted_label])[0]
-            return predicted_user_id, f"Ճանաչումը հաջողվեց (վստահություն՝ {confidence:.0%})։"
-        else:
-            return None, f"Համընկնումը բավարար չէ (վստահություն՝ {confidence:.0%})։"
-
-    elif model_type == "knn":
-        from sklearn.neighbors import KNeighborsClassifier
-        knn_clf = _model_data["classifier"]
-        distances, _ = knn_clf.kneighbors([embedding], n_neighbors=1)
-        if distances[0][0] <= KNN_DISTANCE_THRESHOLD:
-            predicted_user_id = knn_clf.predict([embedding])[0]
-            return predicted_user_id, "Ճանաչումը հաջողվեց (պարզ մոդել)։"
-        else:
-            return None, "Դեմքը չի ճանաչվել (պարզ մոդել)։"
-            
+import os, pickle, threading
+from django.conf import settings
+from . import face_index, face_quality, inference_gate, profiling
+from .inference_gate import PRIORITY_ENROLL, PRIORITY_SEARCH, InferenceBusy
+
+_model_data, _facenet_embedder, _model_mtime = None, None, None
+_embedder_lock = threading.Lock()
+_model_path = os.path.join(settings.BASE_DIR, "face_models", "facenet_model.pkl")
+# Հաստատությունների partition-ները՝ {ֆայլի ճանապարհ: (mtime, model_data)}։
+_partition_dir, _partitions = face_index.PARTITION_DIR, {}
+SVM_CONFIDENCE_THRESHOLD, KNN_DISTANCE_THRESHOLD = 0.75, 0.7
+# Միաժամանակյա TF կանչերի սահմանափակում՝ որոնումները սպասում են կարճ, գրանցումները՝ երկար։
+INFERENCE_CONCURRENCY = getattr(settings, "FACE_INFERENCE_CONCURRENCY", 1)
+SEARCH_WAIT_TIMEOUT = getattr(settings, "FACE_SEARCH_WAIT_TIMEOUT", 3.0)
+ENROLL_WAIT_TIMEOUT = getattr(settings, "FACE_ENROLL_WAIT_TIMEOUT", 60.0)
+BUSY_MESSAGE = "Համակարգը այս պահին ծանրաբեռնված է։ Խնդրում ենք փորձել մի քանի վայրկյանից։"
+_gate = inference_gate.InferenceGate(INFERENCE_CONCURRENCY)
+# Պրոֆայլինգի middleware-ում այս մոդուլի հանրային կանչերի ժամանակը (ներառյալ slot-ի սպասումը)։
+_timed = profiling.section("face_recognition")
+
+def _get_embedder():
+    """
+    Lazy-loads the FaceNet embedder model. Կանչվում է inference slot-ը վերցնելուց առաջ,
+    որպեսզի մոդելի սառը բեռնումը չզբաղեցնի slot-ը և որոնումները չստանան InferenceBusy։
+    """
+    global _facenet_embedder
+    if _facenet_embedder is None:
+        with _embedder_lock:
+            if _facenet_embedder is None:
+                # Thread-երի քանակը հաշվվում է բեռնման պահին, երբ run_jobs-ն արդեն սահմանել է JOB_WORKER_PROCESSES-ը։
+                inference_gate.configure_threads(inference_gate.threads_per_worker(getattr(settings, "FACE_INFERENCE_THREADS", None)))
+                from keras_facenet import FaceNet
+                try:
+                    _facenet_embedder = FaceNet(); print("INFO: FaceNet embedder loaded into memory.")
+                except Exception as e: print(f"ERROR: Could not initialize FaceNet embedder: {e}")
+    return _facenet_embedder
+
+@_timed
+def extract_face(image_cv2, priority=PRIORITY_ENROLL, min_quality=None):
+    """
+    Վերադարձնում է առաջին դեմքի detection-ը (box, keypoints, quality, embedding) կամ None։
+    Որակը (face_quality.assess) գնահատվում է detection-ից հետո, FaceNet-ից առաջ. եթե
+    score-ը min_quality-ից ցածր է, embedding-ը չի հաշվվում և detection["embedding"]-ը None է։
+    Եթե inference slot չի ազատվում սպասման ժամկետում, բարձրացնում է InferenceBusy։
+    """
+    if image_cv2 is None: return None
+    timeout = SEARCH_WAIT_TIMEOUT if priority == PRIORITY_SEARCH else ENROLL_WAIT_TIMEOUT
+    embedder = _get_embedder()
+    if embedder is None: return None
+    with _gate.slot(priority, timeout):
+        import cv2
+        try:
+            detections, crops = embedder.crop(cv2.cvtColor(image_cv2, cv2.COLOR_BGR2RGB), threshold=0.95)
+            if not detections: return None
+            detection = {**detections[0], "quality": face_quality.assess(image_cv2, detections[0])}
+            if min_quality is not None and detection["quality"]["score"] < min_quality: return {**detection, "embedding": None}
+            return {**detection, "embedding": embedder.embeddings(images=crops[:1])[0]}
+        except: return None
+
+@_timed
+def detect_faces(image_cv2, priority=PRIORITY_SEARCH):
+    """Միայն MTCNN detection՝ առանց FaceNet-ի։ Վերադարձնում է (detections, RGB crops)։"""
+    if image_cv2 is None: return [], []
+    timeout = SEARCH_WAIT_TIMEOUT if priority == PRIORITY_SEARCH else ENROLL_WAIT_TIMEOUT
+    embedder = _get_embedder()
+    if embedder is None: return [], []
+    with _gate.slot(priority, timeout):
+        import cv2
+        try: return embedder.crop(cv2.cvtColor(image_cv2, cv2.COLOR_BGR2RGB), threshold=0.95)
+        except: return [], []
+
+@_timed
+def embed_crops(crops, priority=PRIORITY_SEARCH):
+    """FaceNet embedding-ներ detect_faces()-ի crop-երի համար՝ մեկ batch-ով։"""
+    if not crops: return []
+    timeout = SEARCH_WAIT_TIMEOUT if priority == PRIORITY_SEARCH else ENROLL_WAIT_TIMEOUT
+    embedder = _get_embedder()
+    if embedder is None: return []
+    with _gate.slot(priority, timeout):
+        return list(embedder.embeddings(images=crops))
+
+def extract_embedding(image_cv2, priority=PRIORITY_ENROLL, min_quality=None):
+    """Հանրային ֆունկցիա՝ FaceNet embedding ստանալու համար։"""
+    detection = extract_face(image_cv2, priority, min_quality)
+    return detection['embedding'] if detection else None
+
+def detect_face_in_image(image_cv2):
+    """Ստուգում է, թե արդյոք արդեն decode արված նկարում դեմք կա (միայն detection, առանց FaceNet-ի)։"""
+    return bool(detect_faces(image_cv2, PRIORITY_ENROLL)[0])
+
+def detect_face_in_image_data(image_data):
+    """Ստուգում է, թե արդյոք տրված նկարի bytes-երում դեմք կա։"""
+    from .image_intake import decode_image
+    try: image = decode_image(image_data)
+    except: return False
+    return detect_face_in_image(image)
+
+def _load_model():
+    """Բեռնում է մարզված մոդելը հիշողության մեջ և վերաբեռնում այն, երբ ֆայլը փոխվում է (hot-swap)։"""
+    global _model_data, _model_mtime
+    try: mtime = os.stat(_model_path).st_mtime_ns
+    except OSError: return
+    if _model_data is None or mtime != _model_mtime:
+        try:
+            with open(_model_path, "rb") as f: _model_data = pickle.load(f)
+            _model_mtime = mtime
+            model_type = _model_data.get("type", "unknown").upper()
+            print(f"INFO: Custom recognition model (TYPE: {model_type}) loaded.")
+        except Exception as e: print(f"ERROR: Could not load custom model: {e}")
+
+def _load_partition(facility):
+    """Հաստատության partition-ը (hot-swap՝ ինչպես _load_model-ում) կամ None, եթե այն չկա։"""
+    path = face_index.partition_path(facility, _partition_dir)
+    try: mtime = os.stat(path).st_mtime_ns
+    except OSError: _partitions.pop(path, None); return None
+    cached = _partitions.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path, "rb") as f: cached = _partitions[path] = (mtime, pickle.load(f))
+        except Exception as e: print(f"ERROR: Could not load partition model {path}: {e}"); return None
+    return cached[1]
+
+@_timed
+def recognize_face(image_file, facility=None):
+    """
+    Ճանաչում է պացիենտին։ facility-ի (բժշկի աշխատավայրի) դեպքում նախ որոնում է այդ
+    հաստատության partition-ում։ Ծանրաբեռնվածության դեպքում բարձրացնում է InferenceBusy։
+    """
+    _load_model()
+    if _model_data is None: return None, "Ճանաչման մոդելը բեռնված չէ։"
+    
+    from .image_intake import ImageIntakeError, load_image
+    try: _, image = load_image(image_file)
+    except ImageIntakeError as e: return None, str(e)
+    except Exception: return None, "Նկարի ֆորմատը սխալ է։"
+
+    detection = extract_face(image, PRIORITY_SEARCH, face_quality.MIN_SEARCH_QUALITY)
+    if detection is None: return None, "Նկարում դեմք չի հայտնաբերվել։"
+    if detection["embedding"] is None: return None, face_quality.LOW_QUALITY_MESSAGE
+    return classify_embedding(detection["embedding"], facility)
+
+@_timed
+def classify_embedding(embedding, facility=None):
+    """
+    Համեմատում է embedding-ը մարզված մոդելի հետ։ Եթե facility-ի partition-ը կա, նախ
+    փորձում է այն և ընդհանուր մոդելին դիմում միայն չգտնելու դեպքում։
+    Վերադարձնում է (user_id կամ None, հաղորդագրություն)։
+    """
+    if facility and face_index.facility_key(facility):
+        partition = _load_partition(facility)
+        if partition is not None:
+            user_id, _ = _classify(partition, embedding)
+            if user_id is not None: return user_id, "Ճանաչումը հաջողվեց (հաստատության ինդեքս)։"
+    _load_model()
+    if _model_data is None: return None, "Ճանաչման մոդելը բեռնված չէ։"
+    return _classify(_model_data, embedding)
+
+def _classify(model_data, embedding):
+    model_type = model_data.get("type")
+
+    if model_type == "svm":
+        import numpy as np
+        svm_clf, label_encoder = model_data["classifier"], model_data["label_encoder"]
+        probabilities = svm_clf.predict_proba([embedding])[0]
+        best_class_index = np.argmax(probabilities)
+        confidence = probabilities[best_class_index]
+        if confidence >= SVM_CONFIDENCE_THRESHOLD:
+            predicted_label = svm_clf.classes_[best_class_index]
+            predicted_user_id = label_encoder.inverse_transform([predicted_label])[0]
+            return predicted_user_id, f"Ճանաչումը հաջողվեց (վստահություն՝ {confidence:.0%})։"
+        else:
+            return None, f"Համընկնումը բավարար չէ (վստահություն՝ {confidence:.0%})։"
+
+    elif model_type == "knn":
+        knn_clf = model_data["classifier"]
+        distances, _ = knn_clf.kneighbors([embedding], n_neighbors=1)
+        if distances[0][0] <= KNN_DISTANCE_THRESHOLD:
+            predicted_user_id = knn_clf.predict([embedding])[0]
+            return predicted_user_id, "Ճանաչումը հաջողվեց (պարզ մոդել)։"
+        else:
+            return None, "Դեմքը չի ճանաչվել (պարզ մոդել)։"
+            
     else: return None, "Մոդելի տեսակն անհայտ է։"
\ No newline at end of file
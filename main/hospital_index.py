@@ -0,0 +1,183 @@
+import heapq
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+CELL_DEGREES = getattr(settings, "HOSPITAL_INDEX_CELL_DEGREES", 0.1)
+MAX_RESULTS = 50
+VERSION_KEY = "hospital_index:version"
+# Առանց ընդհանուր cache-ի այլ worker-ի փոփոխությունը չի երևա, ուստի ինդեքսը պարբերաբար վերակառուցվում է։
+INDEX_MAX_AGE = None if getattr(settings, "SHARED_CACHE", False) else 60
+
+_index, _index_version, _index_built_at = None, None, 0.0
+_lock = threading.Lock()
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize(value):
+    return " ".join((value or "").split()).casefold()
+
+
+class HospitalIndex:
+    """
+    Հիվանդանոցների grid ինդեքս՝ CELL_DEGREES չափի բջիջներով։ Որոնումը սկսվում է
+    հարցման բջջից և ընդլայնվում է օղակներով, մինչև k-րդ արդյունքը ավելի մոտ լինի,
+    քան դեռ չդիտարկված ցանկացած բջիջ։
+    """
+
+    def __init__(self, hospitals, cell_degrees=CELL_DEGREES):
+        self.cell = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)
+        self.hospitals = list(hospitals)
+        self.cells = defaultdict(list)
+        for position, hospital in enumerate(self.hospitals):
+            self.cells[self._cell(hospital["latitude"], hospital["longitude"])].append(
+                position
+            )
+
+    def __len__(self):
+        return len(self.hospitals)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell), math.floor(lon / self.cell) % self.columns
+
+    def _ring(self, row, column, n):
+        if n == 0:
+            yield row, column
+            return
+        for dc in range(-n, n + 1):
+            yield row - n, (column + dc) % self.columns
+            yield row + n, (column + dc) % self.columns
+        for dr in range(-n + 1, n):
+            yield row + dr, (column - n) % self.columns
+            yield row + dr, (column + n) % self.columns
+
+    def _unvisited_bound_km(self, lat, lon, row, column, n):
+        """Ամենափոքր հնարավոր հեռավորությունը 0..n օղակներից դուրս գտնվող կետերի համար։"""
+        lat_low, lat_high = (row - n) * self.cell, (row + n + 1) * self.cell
+        bound = math.inf
+        if lat_low > -90:
+            bound = min(bound, (lat - lat_low) * KM_PER_DEGREE)
+        if lat_high < 90:
+            bound = min(bound, (lat_high - lat) * KM_PER_DEGREE)
+        if (2 * n + 1) * self.cell < 360:
+            # Հեռավորությունը մինչև սահմանային միջօրեականի մեծ շրջանը։
+            lon_offset = lon - math.floor(lon / self.cell) * self.cell
+            delta = min(lon_offset + n * self.cell, (n + 1) * self.cell - lon_offset)
+            reach = math.cos(math.radians(lat)) * abs(math.sin(math.radians(delta)))
+            bound = min(bound, EARTH_RADIUS_KM * math.asin(min(1.0, reach)))
+        return bound
+
+    def _matches(self, hospital, specialty):
+        return not specialty or any(specialty in s for s in hospital["specialties"])
+
+    def nearest(self, lat, lon, k=5, specialty=""):
+        """Վերադարձնում է [(distance_km, hospital), ...]՝ ամենամոտից սկսած։"""
+        specialty = normalize(specialty)
+        found = []  # max-heap (-distance, position)
+
+        def consider(position):
+            hospital = self.hospitals[position]
+            if not self._matches(hospital, specialty):
+                return
+            distance = haversine_km(lat, lon, hospital["latitude"], hospital["longitude"])
+            if len(found) < k:
+                heapq.heappush(found, (-distance, position))
+            elif distance < -found[0][0]:
+                heapq.heapreplace(found, (-distance, position))
+
+        row, column = self._cell(lat, lon)
+        n = 0
+        while True:
+            # Երբ դիտարկվող բջիջները շատ են լցված բջիջներից, ավելի արագ է ամբողջական անցումը։
+            if (2 * n + 1) ** 2 > 4 * len(self.cells) + 8:
+                found.clear()
+                for position in range(len(self.hospitals)):
+                    consider(position)
+                break
+            for key in self._ring(row, column, n):
+                for position in self.cells.get(key, ()):
+                    consider(position)
+            if len(found) == k and -found[0][0] <= self._unvisited_bound_km(
+                lat, lon, row, column, n
+            ):
+                break
+            n += 1
+        return [
+            (-negative, self.hospitals[position])
+            for negative, position in sorted(found, reverse=True)
+        ]
+
+
+def load_hospitals():
+    """Հիվանդանոցները՝ իրենց և այնտեղ աշխատող բժիշկների (DoctorProfile.workplace) մասնագիտություններով։"""
+    from .models import DoctorProfile, Hospital
+
+    by_workplace = defaultdict(set)
+    for workplace, specialty in DoctorProfile.objects.exclude(workplace__isnull=True).values_list(
+        "workplace", "specialty"
+    ):
+        if normalize(specialty):
+            by_workplace[normalize(workplace)].add(normalize(specialty))
+    hospitals = []
+    for row in Hospital.objects.order_by().values(
+        "id", "name", "address", "city", "phone", "latitude", "longitude", "specialties"
+    ):
+        own = {normalize(s) for s in row["specialties"] or () if normalize(s)}
+        row["specialties"] = sorted(own | by_workplace.get(normalize(row["name"]), set()))
+        hospitals.append(row)
+    return hospitals
+
+
+def get_index():
+    """Ընթացիկ ինդեքսը։ Վերակառուցվում է, երբ invalidate()-ը փոխել է տարբերակը cache-ում։"""
+    global _index, _index_version, _index_built_at
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    expired = INDEX_MAX_AGE is not None and time.monotonic() - _index_built_at > INDEX_MAX_AGE
+    if _index is not None and version == _index_version and not expired:
+        return _index
+    with _lock:
+        if _index is None or version != _index_version or expired:
+            _index = HospitalIndex(load_hospitals())
+            _index_version, _index_built_at = version, time.monotonic()
+    return _index
+
+
+def invalidate():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def nearest_hospitals(lat, lon, k=5, specialty=""):
+    k = max(1, min(int(k), MAX_RESULTS))
+    return [
+        {
+            "id": hospital["id"],
+            "name": hospital["name"],
+            "address": hospital["address"],
+            "city": hospital["city"],
+            "phone": hospital["phone"],
+            "latitude": hospital["latitude"],
+            "longitude": hospital["longitude"],
+            "specialties": hospital["specialties"],
+            "distance_km": round(distance, 3),
+        }
+        for distance, hospital in get_index().nearest(lat, lon, k, specialty)
+    ]
@@ -0,0 +1,128 @@
+import os
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+# Սահմանաչափերը կարելի է փոխել settings.py-ում՝ նույնանուն փոփոխականներով։
+MAX_UPLOAD_BYTES = getattr(settings, "FACE_IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+MAX_IMAGE_DIMENSION = getattr(settings, "FACE_IMAGE_MAX_DIMENSION", 8000)
+CANONICAL_MAX_SIDE = getattr(settings, "FACE_IMAGE_CANONICAL_MAX_SIDE", 1600)
+CANONICAL_JPEG_QUALITY = 90
+
+
+class ImageIntakeError(ValueError):
+    """Նկարը չի անցել ընդունման ստուգումները (չափ, ձևաչափ, լուծաչափ)։"""
+
+
+def read_chunks(chunks, max_bytes=MAX_UPLOAD_BYTES, size_hint=None):
+    """
+    Կարդում է chunk-երը մեկ bytearray-ի մեջ՝ կտրելով սահմանաչափը գերազանցելուն պես
+    (max_bytes=None՝ առանց սահմանաչափի)։ size_hint-ի դեպքում բուֆերը նախապես հատկացվում է, որպեսզի լրացուցիչ պատճեններ չլինեն։
+    """
+    if max_bytes is None:
+        max_bytes = float("inf")
+    if size_hint is not None and size_hint > max_bytes:
+        raise ImageIntakeError("Նկարի ֆայլը չափազանց մեծ է։")
+    buffer = bytearray(size_hint or 0)
+    view, offset = memoryview(buffer), 0
+    for chunk in chunks:
+        end = offset + len(chunk)
+        if end > max_bytes:
+            raise ImageIntakeError("Նկարի ֆայլը չափազանց մեծ է։")
+        if end <= len(buffer):
+            view[offset:end] = chunk
+        else:
+            view.release()
+            buffer[offset:] = chunk
+            view = memoryview(buffer)
+        offset = end
+    view.release()
+    del buffer[offset:]
+    return buffer
+
+
+def read_upload(uploaded_file, max_bytes=MAX_UPLOAD_BYTES):
+    """Django-ի UploadedFile/File-ը կարդում է chunk-երով՝ առանց ամբողջական read()-ի։"""
+    size = getattr(uploaded_file, "size", None)
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    chunks = (
+        uploaded_file.chunks()
+        if hasattr(uploaded_file, "chunks")
+        else iter(lambda: uploaded_file.read(64 * 1024), b"")
+    )
+    return read_chunks(chunks, max_bytes=max_bytes, size_hint=size)
+
+
+def read_stored(stored_file):
+    """
+    Կարդում է արդեն պահված ֆայլը (մոդելի մարզում, job-եր)։ Վերբեռնման սահմանաչափը
+    կիրառվում է միայն ընդունման ժամանակ, իսկ պրոֆիլի նկարները կարող են այն չանցած լինել։
+    """
+    return read_upload(stored_file, max_bytes=None)
+
+
+def check_dimensions(buffer, max_dimension=MAX_IMAGE_DIMENSION):
+    """Ստուգում է լուծաչափը միայն ֆայլի header-ից՝ մինչև պիքսելների decode-ը։"""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        # Pillow-ի decompression bomb նախազգուշացումը նույնպես սխալ է համարվում։
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(BytesIO(buffer)) as probe:
+                width, height = probe.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageIntakeError("Նկարի լուծաչափը չափազանց մեծ է։")
+    except (UnidentifiedImageError, OSError):
+        raise ImageIntakeError("Նկարի ֆորմատը սխալ է։")
+    if width > max_dimension or height > max_dimension:
+        raise ImageIntakeError("Նկարի լուծաչափը չափազանց մեծ է։")
+    return width, height
+
+
+def decode_image(buffer):
+    """Decode է անում BGR նկար՝ np.frombuffer-ով, առանց բուֆերի պատճենման։"""
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ImageIntakeError("Նկարի ֆորմատը սխալ է։")
+    return image
+
+
+def load_image(uploaded_file):
+    """Ամբողջական ընդունում՝ chunk-երով կարդալ, ստուգել չափերը, decode անել։"""
+    buffer = read_upload(uploaded_file)
+    check_dimensions(buffer)
+    return buffer, decode_image(buffer)
+
+
+def normalize_for_storage(buffer, image, filename):
+    """
+    Վերադարձնում է ContentFile պահպանման համար։ Եթե նկարը մեծ է CANONICAL_MAX_SIDE-ից,
+    այն փոքրացվում և վերակոդավորվում է JPEG-ով, հակառակ դեպքում պահվում է բնօրինակը։
+    """
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if longest <= CANONICAL_MAX_SIDE:
+        return ContentFile(bytes(buffer), name=filename), image
+
+    import cv2
+
+    scale = CANONICAL_MAX_SIDE / float(longest)
+    resized = cv2.resize(
+        image,
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+    ok, encoded = cv2.imencode(
+        ".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, CANONICAL_JPEG_QUALITY]
+    )
+    if not ok:
+        raise ImageIntakeError("Նկարը հնարավոր չեղավ մշակել։")
+    stem = os.path.splitext(os.path.basename(filename))[0] or "photo"
+    return ContentFile(encoded.tobytes(), name=f"{stem}.jpg"), resized
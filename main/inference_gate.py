@@ -0,0 +1,119 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Ավելի փոքր թիվ՝ ավելի բարձր առաջնահերթություն։
+PRIORITY_SEARCH, PRIORITY_ENROLL = 0, 1
+
+
+class InferenceBusy(Exception):
+    """Բոլոր inference slot-երը զբաղված են, և սպասման ժամանակը սպառվել է։"""
+
+
+class InferenceGate:
+    """
+    Սահմանափակում է միաժամանակյա TensorFlow կանչերի քանակը մեկ պրոցեսում։
+    Սպասողները սպասարկվում են ըստ առաջնահերթության (որոնումը՝ գրանցումից առաջ),
+    իսկ նույն առաջնահերթության դեպքում՝ ըստ ժամանման հերթականության։
+
+    Gate-ը չի համակարգում տարբեր պրոցեսները. run_jobs-ի worker-ները գրանցումները
+    կատարում են իրենց gate-ով, ուստի նրանք աշխատում են ավելի ցածր OS առաջնահերթությամբ
+    (lower_process_priority), իսկ thread-երի բաժինը հաշվում է threads_per_worker-ը։
+    """
+
+    def __init__(self, slots, max_waiting=32):
+        self.slots, self.max_waiting = slots, max_waiting
+        self._active = 0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if len(self._waiting) >= self.max_waiting:
+                raise InferenceBusy()
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while self._active >= self.slots or self._waiting[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise InferenceBusy()
+                    self._cond.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority, timeout):
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._cond:
+            return {"active": self._active, "waiting": len(self._waiting)}
+
+
+def threads_per_worker(configured=None):
+    """
+    Քանի thread կարող է օգտագործել մեկ պրոցեսի inference-ը, որպեսզի բոլոր
+    worker-ների ընդհանուր thread-երը չգերազանցեն CPU միջուկների քանակը։ Հաշվվում են
+    web worker-ները (WEB_CONCURRENCY) և նույն մեքենայի run_jobs պրոցեսները
+    (JOB_WORKER_PROCESSES, որը run_jobs-ը սահմանում է իր պրոցեսների համար)։
+    """
+    if configured:
+        return int(configured)
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1") or 1) + int(
+        os.environ.get("JOB_WORKER_PROCESSES", "0") or 0
+    )
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def lower_process_priority(niceness):
+    """Ֆոնային worker-ի CPU առաջնահերթությունն իջեցնում է web որոնումների օգտին (POSIX nice)։"""
+    try:
+        os.nice(niceness)
+    except (AttributeError, OSError):
+        pass
+
+
+def configure_threads(threads):
+    """Սահմանում է BLAS/OpenMP և TensorFlow intra-op thread-երի քանակը։ Կանչվում է TF-ի բեռնումից առաջ։"""
+    for name in (
+        "OMP_NUM_THREADS",
+        "OPENBLAS_NUM_THREADS",
+        "MKL_NUM_THREADS",
+        "TF_NUM_INTRAOP_THREADS",
+    ):
+        os.environ.setdefault(name, str(threads))
+    os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        threadpool_limits(threads)
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        # TF-ն արդեն ինիցիալիզացված է, thread-երի քանակն այլևս չի կարող փոխվել։
+        pass
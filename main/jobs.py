@@ -0,0 +1,294 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW = 10, 100, 200
+RETRY_BACKOFF_SECONDS = 30
+STALE_JOB_TIMEOUT = timedelta(minutes=30)
+# Առանց առանձին worker-ի (օր.՝ տեղական մշակման ժամանակ) առաջադրանքները կարելի է կատարել անմիջապես։
+JOB_QUEUE_EAGER = getattr(settings, "JOB_QUEUE_EAGER", False)
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """Գրանցում է ֆունկցիան որպես տվյալ տեսակի առաջադրանքի կատարող։"""
+
+    def register(func):
+        _handlers[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, payload=None, priority=PRIORITY_NORMAL, dedup_key="", delay=None):
+    """
+    Ավելացնում է առաջադրանք հերթում։ Եթե նույն dedup_key-ով առաջադրանք արդեն
+    սպասում է, նորը չի ստեղծվում, իսկ եղածի առաջնահերթությունը բարձրացվում է։
+    """
+    run_after = timezone.now() + (delay or timedelta())
+    if dedup_key:
+        existing = Job.objects.filter(dedup_key=dedup_key, status=Job.PENDING).first()
+        if existing is not None:
+            if priority < existing.priority:
+                Job.objects.filter(pk=existing.pk).update(priority=priority)
+            return existing
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                kind=kind,
+                payload=payload or {},
+                priority=priority,
+                dedup_key=dedup_key,
+                run_after=run_after,
+            )
+    except IntegrityError:
+        return Job.objects.filter(dedup_key=dedup_key, status=Job.PENDING).first()
+    if JOB_QUEUE_EAGER:
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def _requeue_stale_jobs():
+    """Վերադարձնում է հերթ այն առաջադրանքները, որոնց worker-ը, հավանաբար, ընկել է։"""
+    stale = Job.objects.filter(
+        status=Job.RUNNING, started_at__lt=timezone.now() - STALE_JOB_TIMEOUT
+    )
+    for job in stale:
+        try:
+            with transaction.atomic():
+                Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                    status=Job.PENDING
+                )
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, finished_at=timezone.now(), last_error="stale"
+            )
+
+
+def claim_next():
+    """Վերցնում է հաջորդ առաջադրանքը՝ ապահովելով, որ այն չվերցնի մեկ այլ worker։"""
+    _requeue_stale_jobs()
+    now = timezone.now()
+    with transaction.atomic():
+        queue = Job.objects.filter(status=Job.PENDING, run_after__lte=now).order_by(
+            "priority", "run_after", "id"
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            queue = queue.select_for_update(skip_locked=True)
+        job = queue.first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+            status=Job.RUNNING, started_at=now, attempts=F("attempts") + 1
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def execute(job):
+    handler = _handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"Unknown job kind: {job.kind}")
+        handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status, job.finished_at = Job.FAILED, timezone.now()
+    else:
+        job.status, job.finished_at = Job.DONE, timezone.now()
+    try:
+        job.save(update_fields=["status", "run_after", "finished_at", "last_error"])
+    except IntegrityError:
+        # Կրկնվող առաջադրանքն արդեն հերթում է, ուստի այս փորձը կարելի է փակել։
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, finished_at=timezone.now()
+        )
+    return job
+
+
+def run_job(job_id):
+    """Անմիջապես կատարում է կոնկրետ առաջադրանքը (JOB_QUEUE_EAGER ռեժիմ)։"""
+    claimed = Job.objects.filter(pk=job_id, status=Job.PENDING).update(
+        status=Job.RUNNING, started_at=timezone.now(), attempts=F("attempts") + 1
+    )
+    if claimed:
+        execute(Job.objects.get(pk=job_id))
+
+
+def queue_stats(window=timedelta(hours=1)):
+    """Հերթի խորությունը և վերջին ժամվա առաջադրանքների ուշացումը (վայրկյաններով)։"""
+    since = timezone.now() - window
+    depth = dict(
+        Job.objects.filter(status=Job.PENDING)
+        .order_by()
+        .values("kind")
+        .annotate(count=Count("id"))
+        .values_list("kind", "count")
+    )
+    finished = Job.objects.filter(
+        status=Job.DONE, finished_at__gte=since
+    ).values_list("kind", "created_at", "started_at", "finished_at")[:1000]
+    latency = {}
+    for kind, created_at, started_at, finished_at in finished:
+        stats = latency.setdefault(kind, {"wait": [], "run": []})
+        stats["wait"].append((started_at - created_at).total_seconds())
+        stats["run"].append((finished_at - started_at).total_seconds())
+    summary = {}
+    for kind, stats in latency.items():
+        waits, runs = sorted(stats["wait"]), sorted(stats["run"])
+        summary[kind] = {
+            "count": len(waits),
+            "wait_avg": sum(waits) / len(waits),
+            "wait_p95": waits[int(0.95 * (len(waits) - 1))],
+            "run_avg": sum(runs) / len(runs),
+            "run_p95": runs[int(0.95 * (len(runs) - 1))],
+        }
+    return {
+        "pending": depth,
+        "running": Job.objects.filter(status=Job.RUNNING).count(),
+        "failed_last_window": Job.objects.filter(
+            status=Job.FAILED, finished_at__gte=since
+        ).count(),
+        "latency": summary,
+    }
+
+
+# --- Առաջադրանքների կատարողներ ---
+
+
+@job_handler("embed_image")
+def embed_image(image_id):
+    """
+    Հայտնաբերում է դեմքը, պահում embedding-ը և հավասարեցված դեմքը, ապա թարմացնում ինդեքսը։
+    Եթե embedding-ը գրեթե նույնն է օգտատիրոջ այլ նկարինը, նկարը միավորվում է
+    դրան (duplicate_of) և չի մասնակցում մարզմանը։
+    """
+    from . import face_dedup, face_quality, face_recognition_service, renditions
+    from .image_intake import decode_image, read_stored
+    from .models import CustomUser, UserFaceImage
+
+    face_image = UserFaceImage.objects.filter(pk=image_id).first()
+    if face_image is None or not face_image.image:
+        return
+    with face_image.image.open("rb") as f:
+        image = decode_image(read_stored(f))
+    detection = face_recognition_service.extract_face(
+        image, min_quality=face_quality.MIN_ENROLL_QUALITY
+    )
+    face_image.face_detected = detection is not None
+    face_image.quality = detection["quality"]["score"] if detection else None
+    update_fields = ["face_detected", "quality", "embedding", "duplicate_of"]
+    with transaction.atomic():
+        # Օգտատիրոջ տողի lock-ը հերթականացնում է նույն օգտատիրոջ նկարների համեմատումն ու
+        # պահպանումը, որպեսզի տարբեր worker-ներում միաժամանակ մշակվող երկու կրկնօրինակները
+        # չդառնան երկուսն էլ հիմնական։
+        list(
+            CustomUser.objects.select_for_update()
+            .filter(pk=face_image.user_id)
+            .values_list("pk", flat=True)
+        )
+        face_image.duplicate_of_id = None
+        if detection is not None and detection["embedding"] is not None:
+            face_image.duplicate_of_id = face_dedup.find_embedding_duplicate(
+                face_image, detection["embedding"]
+            )
+        if (
+            detection is None
+            or detection["embedding"] is None
+            or face_image.duplicate_of_id is not None
+        ):
+            # Ցածր որակի նկարը և կրկնօրինակը մնում են պատկերասրահում, բայց չեն մասնակցում մարզմանը։
+            face_image.embedding = None
+        else:
+            from .face_index import embedding_to_bytes
+
+            face_image.embedding = embedding_to_bytes(detection["embedding"])
+            face_crop = renditions.make_face_crop(
+                image, detection, face_image.image.name
+            )
+            if face_crop is not None:
+                if face_image.face_crop:
+                    face_image.face_crop.delete(save=False)
+                face_image.face_crop.save(face_crop.name, face_crop, save=False)
+                update_fields.append("face_crop")
+        face_image.save(update_fields=update_fields)
+    if face_image.embedding is not None:
+        enqueue("rebuild_index", priority=PRIORITY_NORMAL, dedup_key="rebuild_index")
+
+
+@job_handler("embed_profile_picture")
+def embed_profile_picture(user_id):
+    """Պրոֆիլի նկարի embedding-ը՝ ինչպես train_face_model-ում, որպեսզի rebuild_index-ը այն ներառի։"""
+    from . import face_quality, face_recognition_service
+    from .face_index import embedding_to_bytes
+    from .image_intake import decode_image, read_stored
+    from .models import CustomUser
+
+    user = CustomUser.objects.filter(pk=user_id).only("profile_picture").first()
+    if user is None or not user.profile_picture:
+        return
+    with user.profile_picture.open("rb") as f:
+        image = decode_image(read_stored(f))
+    detection = face_recognition_service.extract_face(
+        image, min_quality=face_quality.MIN_ENROLL_QUALITY
+    )
+    embedding = detection["embedding"] if detection else None
+    # update()՝ save()-ի փոխարեն, որպեսզի չաշխատեն CustomUser-ի signal-ները (քարտ, auth cache)։
+    CustomUser.objects.filter(pk=user_id).update(
+        profile_quality=detection["quality"]["score"] if detection else None,
+        profile_embedding=None if embedding is None else embedding_to_bytes(embedding),
+    )
+    enqueue("rebuild_index", priority=PRIORITY_NORMAL, dedup_key="rebuild_index")
+
+
+@job_handler("rebuild_index")
+def rebuild_index():
+    from . import face_index
+
+    face_index.rebuild_index()
+
+
+@job_handler("compact_index")
+def compact_index(keep_days=7):
+    """
+    Մոդելից հեռացնում է այն օգտատերերին, որոնց embedding-ներն այլևս չկան
+    (ջնջված նկարներ/հաշիվներ), թարմացնում հաստատությունների partition-ները և
+    մաքրում ավարտված առաջադրանքների պատմությունը։
+    """
+    import os
+    import pickle
+
+    from . import face_index
+
+    stored = face_index.stored_embeddings()
+    current = set(stored[1])
+    model_data = None
+    if os.path.exists(face_index.MODEL_PATH):
+        with open(face_index.MODEL_PATH, "rb") as f:
+            model_data = pickle.load(f)
+    if current and (model_data is None or face_index.model_user_ids(model_data) - current):
+        face_index.rebuild_index()
+    else:
+        if not current and model_data is not None:
+            os.remove(face_index.MODEL_PATH)
+        # Հաստատությունների կազմը փոխվում է նաև առանց նոր նկարների (նոր դիտումներ,
+        # աշխատավայր), իսկ չփոխված partition-ները չեն վերամարզվում։
+        face_index.rebuild_partitions(stored)
+    Job.objects.filter(
+        status=Job.DONE, finished_at__lt=timezone.now() - timedelta(days=keep_days)
+    ).delete()
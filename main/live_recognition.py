@@ -0,0 +1,178 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from . import face_quality, face_recognition_service
+from .inference_gate import PRIORITY_SEARCH
+
+STATE_KEY = "live_search:{user_id}:{stream_id}"
+STATE_TIMEOUT = getattr(settings, "LIVE_SEARCH_STATE_TIMEOUT", 60)
+# Նույն track-ին պատկանելու համար պահանջվող box-երի համընկնումը (IoU)։
+TRACK_IOU = 0.3
+# Քանի կադր կարող է track-ը բացակայել, մինչև այն մոռացվի։
+TRACK_MAX_MISSED = 5
+# Նորից embedding է հաշվվում, երբ որակը լավանում է այսքան անգամ...
+QUALITY_GAIN = 1.2
+# ...կամ երբ track-ը դեռ կայուն չէ և վերջին embedding-ից անցել է այսքան կադր։
+REEMBED_EVERY = 3
+# Քանի անընդմեջ նույն արդյունքն է պետք՝ ճանաչումը կայուն համարելու համար։
+STABLE_MATCHES = getattr(settings, "LIVE_SEARCH_STABLE_MATCHES", 2)
+MAX_TRACKS = 4
+# Track-երի վիճակը cache-ում է, իսկ հաջորդական կադրերը կարող են հասնել տարբեր worker-ների։
+# Առանց ընդհանուր cache-ի (REDIS_URL) կենդանի որոնումն անջատված է, բացի այն դեպքից, երբ
+# LIVE_SEARCH_ALLOW_LOCAL_STATE-ը հաստատում է, որ սերվերը աշխատում է մեկ process-ով։
+AVAILABLE = getattr(settings, "SHARED_CACHE", False) or getattr(
+    settings, "LIVE_SEARCH_ALLOW_LOCAL_STATE", False
+)
+UNAVAILABLE_MESSAGE = (
+    "Կենդանի որոնումը պահանջում է ընդհանուր cache (REDIS_URL)։ Օգտագործեք նկարով որոնումը։"
+)
+
+
+def new_stream_id():
+    return uuid.uuid4().hex
+
+
+def _state_key(user_id, stream_id):
+    return STATE_KEY.format(user_id=user_id, stream_id=stream_id)
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    overlap_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    overlap = overlap_w * overlap_h
+    union = aw * ah + bw * bh - overlap
+    return overlap / union if union else 0.0
+
+
+def _match_tracks(tracks, detections):
+    """Greedy IoU համադրում։ Վերադարձնում է detection-ի ինդեքս -> track։"""
+    pairs = sorted(
+        (
+            (_iou(track["box"], detection["box"]), t, d)
+            for t, track in enumerate(tracks)
+            for d, detection in enumerate(detections)
+        ),
+        reverse=True,
+    )
+    matched, used = {}, set()
+    for iou, t, d in pairs:
+        if iou < TRACK_IOU or t in used or d in matched:
+            continue
+        matched[d] = tracks[t]
+        used.add(t)
+    return matched
+
+
+def _needs_embedding(track, quality, frame):
+    if quality < face_quality.MIN_SEARCH_QUALITY:
+        return False
+    if track["embedded_frame"] is None:
+        return True
+    if quality > track["quality"] * QUALITY_GAIN:
+        return True
+    return track["user_id"] is None and frame - track["embedded_frame"] >= REEMBED_EVERY
+
+
+def _is_stable(track):
+    recent = track["matches"][-STABLE_MATCHES:]
+    return (
+        len(recent) == STABLE_MATCHES
+        and recent[0] is not None
+        and all(user_id == recent[0] for user_id in recent)
+    )
+
+
+def process_frame(state, image, facility=None):
+    """
+    Մշակում է մեկ կադր։ Դեմքերը հայտնաբերվում են ամեն կադրում (MTCNN), բայց FaceNet
+    embedding-ը հաշվվում է միայն նոր track-երի, որակի զգալի լավացման կամ դեռ
+    չճանաչված track-ի պարբերական ստուգման դեպքում։ facility-ն բժշկի հաստատության
+    partition-ն է (տես face_recognition_service.classify_embedding)։ Փոխում է state-ը տեղում։
+    """
+    frame = state["frame"] = state["frame"] + 1
+    detections, crops = face_recognition_service.detect_faces(image, PRIORITY_SEARCH)
+    detections, crops = detections[:MAX_TRACKS], crops[:MAX_TRACKS]
+    matched = _match_tracks(state["tracks"], detections)
+
+    pending = []
+    for index, (detection, crop) in enumerate(zip(detections, crops)):
+        track = matched.get(index)
+        if track is None:
+            state["next_track"] += 1
+            track = {
+                "id": state["next_track"],
+                "quality": 0.0,
+                "embedded_frame": None,
+                "matches": [],
+                "user_id": None,
+                "message": "",
+            }
+            state["tracks"].append(track)
+        track["box"], track["last_seen"] = list(detection["box"]), frame
+        quality = face_quality.assess(image, detection)["score"]
+        if _needs_embedding(track, quality, frame):
+            pending.append((track, crop, quality))
+
+    state["tracks"] = [
+        track
+        for track in state["tracks"]
+        if frame - track["last_seen"] <= TRACK_MAX_MISSED
+    ]
+
+    embeddings = face_recognition_service.embed_crops(
+        [crop for _, crop, _ in pending], PRIORITY_SEARCH
+    )
+    for (track, _, quality), embedding in zip(pending, embeddings):
+        user_id, message = face_recognition_service.classify_embedding(embedding, facility)
+        user_id = int(user_id) if user_id is not None else None
+        track["matches"] = (track["matches"] + [user_id])[-STABLE_MATCHES:]
+        track["quality"] = max(track["quality"], quality)
+        track["embedded_frame"], track["message"] = frame, message
+        # Հակասող արդյունքը չեղարկում է ճանաչումը, մինչև նորից կայունանա։
+        track["user_id"] = user_id if _is_stable(track) else None
+    state["embeddings"] += len(embeddings)
+    return len(embeddings)
+
+
+def summarize(state, embedded):
+    identified = next((t for t in state["tracks"] if t["user_id"] is not None), None)
+    visible = [t for t in state["tracks"] if t["last_seen"] == state["frame"]]
+    if identified is not None:
+        status = "identified"
+    elif visible:
+        status = "tracking"
+    else:
+        status = "no_face"
+    return {
+        "status": status,
+        "frame": state["frame"],
+        "embedded": embedded,
+        "embeddings_total": state["embeddings"],
+        "user_id": identified["user_id"] if identified else None,
+        # Դատարկ հաղորդագրությամբ տեսանելի track-ը դեռ չի անցել որակի շեմը։
+        "message": (identified or (visible[0] if visible else {})).get("message")
+        or (face_quality.LOW_QUALITY_MESSAGE if visible else ""),
+        "tracks": [
+            {"id": t["id"], "box": t["box"], "user_id": t["user_id"]} for t in visible
+        ],
+    }
+
+
+def handle_frame(user_id, stream_id, image, facility=None):
+    """Բեռնում է stream-ի վիճակը cache-ից, մշակում կադրը և պահպանում վիճակը։"""
+    if not AVAILABLE:
+        raise ImproperlyConfigured(UNAVAILABLE_MESSAGE)
+    key = _state_key(user_id, stream_id)
+    state = cache.get(key) or {"frame": 0, "next_track": 0, "embeddings": 0, "tracks": []}
+    embedded = process_frame(state, image, facility)
+    cache.set(key, state, STATE_TIMEOUT)
+    return summarize(state, embedded)
+
+
+def end_stream(user_id, stream_id):
+    cache.delete(_state_key(user_id, stream_id))
@@ -0,0 +1,366 @@
+"""
+Բեռնվածության թեստի գործիքներ (load_test հրամանի համար)՝ սինթետիկ բնակչություն,
+FaceNet-ի stub և սցենարներ, որոնք աշխատում են Django-ի test Client-ով նույն պրոցեսում։
+Հարցումները չեն անցնում HTTP սերվերով և WSGI worker-ներով, ուստի արդյունքները ցույց են
+տալիս view-ների, middleware-ի և բազայի արժեքը, ոչ թե սերվերի թողունակությունը։
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+PASSWORD = "load-test-password"
+EMAIL_DOMAIN = "loadtest.invalid"
+EMBEDDING_SIZE = 512
+IMAGE_SIDE = 160
+MARKER_SIDE = 16
+DEFAULT_MIX = {"login": 1, "profile": 3, "settings": 1, "qr": 4, "search": 1}
+FACILITIES = 3
+
+
+def _user_email(kind, index):
+    return f"{kind}{index}@{EMAIL_DOMAIN}"
+
+
+def seed_population(patients, doctors, enrolled, images_per_user=3, seed=0):
+    """
+    Ստեղծում է բժիշկներ FACILITIES հաստատություններում, պացիենտներ՝ բժշկական
+    տերմիններով, և enrolled պացիենտի համար UserFaceImage embedding-ներ ու բժշկի
+    դիտում (հաստատության partition-ի համար)։ Վերադարձնում է population dict-ը։
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from .face_index import embedding_to_bytes
+    from .models import (
+        AccessEvent,
+        Allergy,
+        BloodGroup,
+        Condition,
+        CustomUser,
+        DoctorProfile,
+        Gender,
+        Medication,
+        PatientCondition,
+        PatientMedication,
+        PatientProfile,
+        UserFaceImage,
+    )
+
+    rng = np.random.default_rng(seed)
+    genders = [Gender.objects.get_or_create(name=name)[0] for name in ("Արական", "Իգական")]
+    blood_groups = [
+        BloodGroup.objects.get_or_create(group_name=name)[0]
+        for name in ("O+", "O-", "A+", "A-", "B+", "B-", "AB+", "AB-")
+    ]
+    conditions = [Condition.objects.get_or_create(name=f"Condition {i}")[0] for i in range(50)]
+    medications = [Medication.objects.get_or_create(name=f"Medication {i}")[0] for i in range(50)]
+    allergies = [Allergy.objects.get_or_create(name=f"Allergy {i}")[0] for i in range(20)]
+
+    password = make_password(PASSWORD)
+    users = CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                username=_user_email(kind, i),
+                email=_user_email(kind, i),
+                password=password,
+                first_name=kind.capitalize(),
+                last_name=str(i),
+                gender=genders[i % 2],
+            )
+            for kind, count in (("doctor", doctors), ("patient", patients))
+            for i in range(count)
+        ]
+    )
+    if not all(user.pk for user in users):
+        users = list(CustomUser.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").order_by("id"))
+    doctor_users, patient_users = users[:doctors], users[doctors:]
+    DoctorProfile.objects.bulk_create(
+        [
+            DoctorProfile(
+                user=user,
+                specialty="Therapy",
+                license_number=f"LT-{user.pk}",
+                workplace=f"Loadtest Hospital {i % FACILITIES}",
+            )
+            for i, user in enumerate(doctor_users)
+        ]
+    )
+    profiles = PatientProfile.objects.bulk_create(
+        [
+            PatientProfile(user=user, blood_group=blood_groups[i % len(blood_groups)])
+            for i, user in enumerate(patient_users)
+        ]
+    )
+    pick = random.Random(seed)
+    PatientCondition.objects.bulk_create(
+        [
+            PatientCondition(patient=profile, condition=condition)
+            for profile in profiles
+            for condition in pick.sample(conditions, 3)
+        ]
+    )
+    PatientMedication.objects.bulk_create(
+        [
+            PatientMedication(patient=profile, medication=medication, dosage="10 mg")
+            for profile in profiles
+            for medication in pick.sample(medications, 2)
+        ]
+    )
+    through = PatientProfile.allergies.through
+    through.objects.bulk_create(
+        [
+            through(patientprofile_id=profile.pk, allergy_id=allergy.pk)
+            for profile in profiles
+            for allergy in pick.sample(allergies, 2)
+        ]
+    )
+
+    centroids = {}
+    face_images = []
+    for user in patient_users[:enrolled]:
+        centroid = rng.normal(size=EMBEDDING_SIZE)
+        centroids[user.pk] = centroid / np.linalg.norm(centroid)
+        for _ in range(images_per_user):
+            sample = centroids[user.pk] + rng.normal(scale=0.02, size=EMBEDDING_SIZE)
+            face_images.append(
+                UserFaceImage(
+                    user=user,
+                    image=f"loadtest/{user.pk}.png",
+                    face_detected=True,
+                    quality=0.9,
+                    embedding=embedding_to_bytes(sample),
+                )
+            )
+    UserFaceImage.objects.bulk_create(face_images)
+    AccessEvent.objects.bulk_create(
+        [
+            AccessEvent(
+                patient_id=user.pk,
+                actor_id=doctor_users[i % len(doctor_users)].pk,
+                action=AccessEvent.DETAILS,
+                accessed_at=timezone.now(),
+            )
+            for i, user in enumerate(patient_users[:enrolled])
+            if doctor_users
+        ]
+    )
+    return {
+        "doctors": [(user.pk, user.email) for user in doctor_users],
+        "patients": [
+            (user.pk, user.email, str(user.public_profile_id)) for user in patient_users
+        ],
+        "centroids": centroids,
+        "genders": [gender.pk for gender in genders],
+    }
+
+
+def search_image(user_id):
+    """
+    PNG, որի վերին-ձախ բլոկը կոդավորում է user_id-ն (StubEmbedder-ի համար), իսկ
+    մնացածը աղմուկ է, որպեսզի նկարը անցնի որակի ստուգումը։
+    """
+    import cv2
+
+    rng = np.random.default_rng(user_id)
+    image = rng.integers(30, 226, size=(IMAGE_SIDE, IMAGE_SIDE, 3), dtype=np.uint8)
+    image[:MARKER_SIDE, :MARKER_SIDE] = (user_id % 256, user_id // 256 % 256, user_id // 65536)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+class StubEmbedder:
+    """
+    keras_facenet.FaceNet-ի փոխարինող՝ crop() և embeddings() մեթոդներով։ Վերադարձնում է
+    նկարի marker-ով որոշված պացիենտի embedding-ը, ուստի search-ը անցնում է ամբողջ
+    ճանապարհը (intake, որակ, դասակարգիչ)՝ առանց TensorFlow-ի։
+    """
+
+    def __init__(self, centroids, latency=0.0, seed=0):
+        self.centroids, self.latency = centroids, latency
+        self.rng = np.random.default_rng(seed)
+        self.fallback = self.rng.normal(size=EMBEDDING_SIZE)
+
+    def crop(self, image_rgb, threshold=0.95):
+        height, width = image_rgb.shape[:2]
+        cx, cy = width // 2, height // 2
+        detection = {
+            "box": [0, 0, width, height],
+            "confidence": 0.999,
+            "keypoints": {
+                "left_eye": (cx - 20, cy - 20),
+                "right_eye": (cx + 20, cy - 20),
+                "nose": (cx, cy + 2),
+                "mouth_left": (cx - 15, cy + 20),
+                "mouth_right": (cx + 15, cy + 20),
+            },
+        }
+        return [detection], [image_rgb]
+
+    def embeddings(self, images):
+        if self.latency:
+            time.sleep(self.latency)
+        result = []
+        for image in images:
+            # search_image()-ը գրում է marker-ը BGR-ով, իսկ այստեղ նկարը արդեն RGB է։
+            high, middle, low = (int(v) for v in image[0, 0])
+            centroid = self.centroids.get(low + middle * 256 + high * 65536, self.fallback)
+            result.append(centroid + self.rng.normal(scale=0.02, size=EMBEDDING_SIZE))
+        return np.asarray(result, dtype=np.float32)
+
+
+def is_database_lock(error):
+    """SQLite-ը միաժամանակ մեկ գրող է թույլ տալիս. զուգահեռ գրառումները ստանում են այս սխալը։"""
+    from django.db import OperationalError
+
+    return isinstance(error, OperationalError) and "locked" in str(error).lower()
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, name, seconds, queries, ok, locked=False):
+        with self._lock:
+            self.samples[name].append((seconds, queries, ok, locked))
+
+    def report(self, elapsed):
+        rows = {}
+        for name, samples in sorted(self.samples.items()):
+            latencies = np.array([s[0] for s in samples]) * 1000
+            queries = np.array([s[1] for s in samples])
+            rows[name] = {
+                "requests": len(samples),
+                "rps": len(samples) / elapsed,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+                "queries_mean": float(queries.mean()),
+                "queries_max": int(queries.max()),
+                "errors": sum(1 for s in samples if not s[2]),
+                # Սխալներից այն մասը, որը SQLite-ի «database is locked»-ն է, այլ ոչ թե կոդի սխալ։
+                "db_locked": sum(1 for s in samples if s[3]),
+            }
+        return rows
+
+
+class VirtualUser:
+    """Մեկ thread-ի սցենարներ՝ սեփական Client-ներով (բժիշկ, պացիենտ, անանուն)։"""
+
+    def __init__(self, population, recorder, seed):
+        self.population, self.recorder = population, recorder
+        self.random = random.Random(seed)
+        self.patient = self.random.choice(population["patients"])
+        self.doctor = self.random.choice(population["doctors"])
+        self.patient_client, self.doctor_client = Client(), Client()
+        self.anonymous_client = Client()
+        self.patient_client.login(username=self.patient[1], password=PASSWORD)
+        self.doctor_client.login(username=self.doctor[1], password=PASSWORD)
+        self.enrolled = list(population["centroids"])
+
+    def _measure(self, name, request, ok=lambda response: response.status_code < 400):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            try:
+                response = request()
+            except Exception as e:
+                response, locked = None, is_database_lock(e)
+            else:
+                locked = False
+            elapsed = time.perf_counter() - started
+        success = response is not None and ok(response)
+        self.recorder.add(name, elapsed, len(queries.captured_queries), success, locked)
+
+    def login(self):
+        self._measure(
+            "login",
+            lambda: Client().post(
+                "/api/login/",
+                {"email": self.patient[1], "password": PASSWORD},
+                content_type="application/json",
+                secure=True,
+            ),
+        )
+
+    def profile(self):
+        self._measure("profile", lambda: self.patient_client.get("/profile/", secure=True))
+
+    def settings(self):
+        data = {
+            "first_name": "Patient",
+            "last_name": str(self.random.randint(1, 10**6)),
+            "gender": self.random.choice(self.population["genders"]),
+            "weight_kg": "70",
+            "height_cm": "175",
+            "allergies_text": "Allergy 1, Allergy 2",
+            "conditions_text": "Condition 1, Condition 2, Condition 3",
+            "medications_text": "Medication 1, Medication 2",
+        }
+        self._measure(
+            "settings", lambda: self.patient_client.post("/settings/", data, secure=True)
+        )
+
+    def qr(self):
+        _, _, profile_id = self.random.choice(self.population["patients"])
+        self._measure(
+            "qr", lambda: self.anonymous_client.get(f"/profile/{profile_id}/", secure=True)
+        )
+
+    def search(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        target = self.random.choice(self.enrolled)
+        upload = SimpleUploadedFile("search.png", search_image(target), "image/png")
+        self._measure(
+            "search",
+            lambda: self.doctor_client.post(
+                "/search/photo/", {"patient_photo": upload}, secure=True
+            ),
+        )
+
+
+def run_scenarios(population, mix, duration, concurrency, seed=0):
+    """
+    Աշխատեցնում է concurrency thread՝ duration վայրկյան։ Ժամանակը հաշվվում է բոլոր
+    վիրտուալ օգտատերերի մուտքից հետո։ Վերադարձնում է (report, elapsed)։
+    """
+    recorder = Recorder()
+    names, weights = zip(*[(name, weight) for name, weight in mix.items() if weight > 0])
+    window = {}
+    errors = []
+
+    def start_clock():
+        window["started"] = time.perf_counter()
+        window["deadline"] = window["started"] + duration
+
+    ready = threading.Barrier(concurrency, action=start_clock)
+
+    def worker(index):
+        try:
+            user = VirtualUser(population, recorder, seed + index)
+            ready.wait()
+            while time.perf_counter() < window["deadline"]:
+                getattr(user, user.random.choices(names, weights)[0])()
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            errors.append(e)
+            ready.abort()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    elapsed = time.perf_counter() - window["started"]
+    return recorder.report(elapsed), elapsed
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOGIN_WINDOW_SECONDS = getattr(settings, "LOGIN_THROTTLE_WINDOW", 15 * 60)
+MAX_FAILURES_PER_ACCOUNT = getattr(settings, "LOGIN_MAX_FAILURES_PER_ACCOUNT", 5)
+MAX_FAILURES_PER_IP = getattr(settings, "LOGIN_MAX_FAILURES_PER_IP", 30)
+# Մեր առջև կանգնած վստահելի proxy-ների քանակը (Render-ում՝ 1)։ 0-ի դեպքում X-Forwarded-For-ը անտեսվում է։
+TRUSTED_PROXY_COUNT = getattr(settings, "LOGIN_TRUSTED_PROXY_COUNT", 0)
+
+
+def client_ip(request, trusted_proxies=None):
+    """
+    Հաճախորդի IP-ն։ X-Forwarded-For-ի ձախ արժեքները գրում է հաճախորդը, ուստի վերցնում
+    ենք աջից N-րդ արժեքը՝ այն, որը ավելացրել է մեզնից ամենահեռու վստահելի proxy-ն։
+    """
+    trusted = TRUSTED_PROXY_COUNT if trusted_proxies is None else trusted_proxies
+    if trusted > 0:
+        hops = [
+            hop.strip()
+            for hop in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")
+            if hop.strip()
+        ]
+        if len(hops) >= trusted:
+            return hops[-trusted]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _keys(email, ip):
+    account = hashlib.sha1((email or "").strip().lower().encode("utf-8")).hexdigest()
+    return f"login_fail:acct:{account}", f"login_fail:ip:{ip}"
+
+
+def is_blocked(email, ip):
+    """
+    True, եթե հաշվի կամ IP-ի ձախողված փորձերի սահմանը սպառված է։ Ստուգումը
+    կատարվում է մինչև authenticate-ը, որպեսզի hashing-ի ծանր աշխատանք չկատարվի։
+    """
+    account_key, ip_key = _keys(email, ip)
+    counts = cache.get_many([account_key, ip_key])
+    return (
+        counts.get(account_key, 0) >= MAX_FAILURES_PER_ACCOUNT
+        or counts.get(ip_key, 0) >= MAX_FAILURES_PER_IP
+    )
+
+
+def _increment(key):
+    # add()-ը սահմանում է պատուհանի սկիզբը, incr()-ը չի երկարացնում ժամկետը։
+    if not cache.add(key, 1, LOGIN_WINDOW_SECONDS):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, LOGIN_WINDOW_SECONDS)
+
+
+def register_failure(email, ip):
+    for key in _keys(email, ip):
+        _increment(key)
+
+
+def register_success(email, ip):
+    account_key, _ = _keys(email, ip)
+    cache.delete(account_key)
@@ -0,0 +1,22 @@
+import time
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = "Benchmarks password verification for each configured hasher and reports logins/sec per core."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=2.0, help="Time budget per hasher.")
+
+    def handle(self, *args, **options):
+        password = "correct horse battery staple"
+        self.stdout.write(self.style.SUCCESS(f"{'hasher':<16} {'logins/sec/core':>16} {'ms/login':>10}"))
+        for hasher in get_hashers():
+            try: encoded = hasher.encode(password, hasher.salt())
+            except (ValueError, ImportError) as e:
+                self.stdout.write(self.style.WARNING(f"{hasher.algorithm:<16} {'skipped':>16}  ({e})")); continue
+            count, started = 0, time.perf_counter()
+            while time.perf_counter() - started < options["seconds"]:
+                hasher.verify(password, encoded); count += 1
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{hasher.algorithm:<16} {count / elapsed:>16.1f} {1000 * elapsed / count:>10.2f}")
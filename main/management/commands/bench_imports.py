@@ -0,0 +1,49 @@
+import os, statistics, subprocess, sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Այս փաթեթները պետք է բեռնվեն միայն դեմքի ճանաչման/նկարների/QR-ի ճանապարհներին։
+HEAVY_MODULES = ("numpy", "cv2", "sklearn", "scipy", "tensorflow", "keras", "keras_facenet", "mtcnn", "qrcode", "requests")
+SCENARIOS = {
+    "worker": ["-c", "import django; django.setup(); from Arvion.wsgi import application; from django.urls import get_resolver; get_resolver().url_patterns"],
+    "cli": ["manage.py", "check"],
+}
+
+def parse_importtime(stderr):
+    """Վերադարձնում է {module: (self_us, cumulative_us, depth)} `-X importtime`-ի ելքից։"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2)
+    return modules
+
+class Command(BaseCommand):
+    help = "Measures startup import time with `python -X importtime` for worker boot and CLI, and fails over budget or when heavy ML/imaging modules load at startup."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", 500)), help="Max total import time per scenario (median of runs).")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--top", type=int, default=10, help="Show the N slowest top-level imports.")
+        parser.add_argument("--allow", action="append", default=[], help="Heavy module allowed at startup (repeatable).")
+
+    def measure(self, args):
+        result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode != 0: raise CommandError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        return parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        failures = []
+        for scenario, scenario_args in SCENARIOS.items():
+            runs = [self.measure(scenario_args) for _ in range(max(1, options["runs"]))]
+            totals = [sum(self_us for self_us, _, _ in modules.values()) / 1000 for modules in runs]
+            total, modules = statistics.median(totals), runs[-1]
+            heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES and name.split(".")[0] not in options["allow"] and "." not in name)
+            status = self.style.SUCCESS("OK") if total <= options["budget_ms"] and not heavy else self.style.ERROR("FAIL")
+            self.stdout.write(f"\n[{status}] {scenario}: {total:.0f} ms (budget {options['budget_ms']:.0f} ms, runs {', '.join(f'{t:.0f}' for t in totals)})")
+            top = sorted(((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth == 0), reverse=True)[: options["top"]]
+            for cumulative, name in top: self.stdout.write(f"  {cumulative / 1000:>8.1f} ms  {name}")
+            if heavy: self.stdout.write(self.style.ERROR(f"  heavy modules at startup: {', '.join(heavy)}"))
+            if total > options["budget_ms"] or heavy: failures.append(scenario)
+        if failures: raise CommandError(f"Import-time budget check failed for: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("\nImport-time budget check passed."))
@@ -0,0 +1,45 @@
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from main.face_quality import MIN_ENROLL_QUALITY
+from main.models import AccessEvent, CustomUser, Job, PatientCondition, PatientMedication, PatientSurgery, UserFaceImage
+
+def hot_queries(user_id, profile_id):
+    """Հավելվածի ամենահաճախ կատարվող հարցումները՝ (անվանում, queryset)։"""
+    return [
+        ("register_view: email exists", CustomUser.objects.filter(email__lower="patient@example.com").exclude(email="")),
+        ("login_api_view: authenticate", CustomUser.objects.filter(username="patient@example.com")),
+        ("public_profile_view: by public id", CustomUser.objects.filter(public_profile_id=profile_id)),
+        ("patient_details_view: patient user", CustomUser.objects.filter(id=user_id, patient_profile__isnull=False)),
+        ("add_photo_view: duplicate check", UserFaceImage.objects.filter(user_id=user_id).values_list("id", "content_hash", "perceptual_hash")),
+        ("add_photo_view: gallery", UserFaceImage.objects.filter(user_id=user_id).order_by("-uploaded_at")),
+        ("profile_view: conditions", PatientCondition.objects.filter(patient_id=user_id).select_related("condition")),
+        ("profile_view: medications", PatientMedication.objects.filter(patient_id=user_id).select_related("medication")),
+        ("profile_view: surgeries", PatientSurgery.objects.filter(patient_id=user_id).select_related("surgery")),
+        ("train_face_model: users with picture", CustomUser.objects.filter(profile_picture__gt="")),
+        ("rebuild_index: stored embeddings", UserFaceImage.objects.filter(embedding__isnull=False).filter(Q(quality__isnull=True) | Q(quality__gte=MIN_ENROLL_QUALITY)).order_by().values_list("user_id", "embedding", "quality")),
+        ("rebuild_index: profile embeddings", CustomUser.objects.filter(profile_embedding__isnull=False).filter(Q(profile_quality__isnull=True) | Q(profile_quality__gte=MIN_ENROLL_QUALITY)).order_by().values_list("id", "profile_embedding", "profile_quality")),
+        ("rebuild_partitions: facility visits", AccessEvent.objects.filter(action=AccessEvent.DETAILS, accessed_at__gte=timezone.now() - timedelta(days=365), actor__doctor_profile__workplace__gt="").order_by().values_list("actor__doctor_profile__workplace", "patient_id").distinct()),
+        ("run_jobs: claim next", Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now()).order_by("priority", "run_after", "id")),
+    ]
+
+class Command(BaseCommand):
+    help = "Prints EXPLAIN plans for the hot lookup queries so index regressions are visible (SQLite and PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE (PostgreSQL only).")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        vendor = connections[alias].vendor
+        sample = CustomUser.objects.using(alias).filter(patient_profile__isnull=False).values_list("id", "public_profile_id").first()
+        user_id, profile_id = sample or (0, uuid.uuid4())
+        explain_options = {"analyze": True} if options["analyze"] and vendor == "postgresql" else {}
+        self.stdout.write(self.style.SUCCESS(f"EXPLAIN plans on '{alias}' ({vendor})"))
+        for label, queryset in hot_queries(user_id, profile_id):
+            self.stdout.write(self.style.NOTICE(f"\n== {label}"))
+            self.stdout.write(queryset.using(alias).explain(**explain_options))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from main import renditions
+from main.face_recognition_service import extract_face
+from main.image_intake import decode_image, read_stored
+from main.models import CustomUser, UserFaceImage
+
+class Command(BaseCommand):
+    help = "Generates missing thumbnails and aligned face crops for already uploaded images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate renditions even if they already exist.")
+
+    def load(self, image_field):
+        with image_field.open("rb") as f: return decode_image(read_stored(f))
+
+    def discard(self, field_file):
+        # --force-ի դեպքում հին ֆայլը ջնջվում է, որպեսզի storage-ում որբ ֆայլեր չմնան։
+        if field_file: field_file.delete(save=False)
+
+    def handle(self, *args, **options):
+        force, created = options["force"], 0
+        face_images = UserFaceImage.objects.select_related("user").exclude(image="")
+        # face_detected=False նկարներում դեմք արդեն չի գտնվել, ուստի դրանց համար FaceNet-ը նորից չի աշխատում։
+        if not force: face_images = face_images.filter(Q(thumbnail="") | Q(thumbnail__isnull=True) | ((Q(face_crop="") | Q(face_crop__isnull=True)) & ~Q(face_detected=False)))
+        for face_image in face_images:
+            try:
+                image = self.load(face_image.image)
+                detection = extract_face(image)
+                for field in ("thumbnail", "face_crop"): self.discard(getattr(face_image, field))
+                for field, content in renditions.face_image_renditions(image, detection, face_image.image.name).items():
+                    getattr(face_image, field).save(content.name, content, save=False)
+                face_image.face_detected = detection is not None
+                face_image.save(update_fields=["thumbnail", "face_crop", "face_detected"]); created += 1
+                self.stdout.write(self.style.SUCCESS(f"  - Renditions saved for {face_image.image.name}"))
+            except Exception as e: self.stdout.write(self.style.ERROR(f"  - Error processing {face_image.image.name}: {e}"))
+
+        users = CustomUser.objects.filter(profile_picture__gt="")
+        if not force: users = users.filter(Q(profile_thumbnail="") | Q(profile_thumbnail__isnull=True))
+        for user in users:
+            try:
+                thumbnail = renditions.make_thumbnail(self.load(user.profile_picture), user.profile_picture.name)
+                self.discard(user.profile_thumbnail)
+                user.profile_thumbnail.save(thumbnail.name, thumbnail, save=False)
+                user.save(update_fields=["profile_thumbnail"]); created += 1
+            except Exception as e: self.stdout.write(self.style.ERROR(f"  - Error processing {user.profile_picture.name}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Updated {created} record(s)."))
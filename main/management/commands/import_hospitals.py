@@ -0,0 +1,57 @@
+import csv, json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main import hospital_index
+from main.models import Hospital
+
+FIELDS = ["address", "city", "phone", "specialties", "updated_at"]
+
+def split_specialties(value):
+    if isinstance(value, (list, tuple)): return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in (value or "").replace(",", ";").split(";") if v.strip()]
+
+def from_record(record):
+    """CSV տողից կամ JSON օբյեկտից (նաև GeoJSON Feature-ից) ստեղծում է Hospital օբյեկտ։"""
+    if record.get("type") == "Feature":
+        props, (lon, lat) = record.get("properties") or {}, record["geometry"]["coordinates"][:2]
+        record = {**props, "latitude": lat, "longitude": lon, "address": props.get("address") or props.get("addr:street", ""),
+                  "city": props.get("city") or props.get("addr:city", ""), "specialties": props.get("specialties") or props.get("healthcare:speciality", "")}
+    lat, lon = float(record["latitude"]), float(record["longitude"])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180): raise ValueError(f"coordinates out of range: {lat}, {lon}")
+    name = (record.get("name") or "").strip()
+    if not name: raise ValueError("missing name")
+    return Hospital(name=name, latitude=lat, longitude=lon, address=(record.get("address") or "").strip(), city=(record.get("city") or "").strip(),
+                    phone=(record.get("phone") or "").strip(), specialties=split_specialties(record.get("specialties")))
+
+class Command(BaseCommand):
+    help = "Imports hospitals from a CSV (name,latitude,longitude,address,city,phone,specialties) or JSON/GeoJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--replace", action="store_true", help="Delete hospitals that are not in the file.")
+
+    def read(self, path):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            if not path.lower().endswith((".json", ".geojson")): return list(csv.DictReader(f))
+            data = json.load(f)
+        return data.get("features", []) if isinstance(data, dict) else data
+
+    def handle(self, *args, **options):
+        try: records = self.read(options["path"])
+        except (OSError, ValueError) as e: raise CommandError(f"Cannot read {options['path']}: {e}")
+        hospitals, skipped = {}, 0
+        for number, record in enumerate(records, 1):
+            try: hospital = from_record(record)
+            except (KeyError, TypeError, ValueError) as e:
+                skipped += 1; self.stdout.write(self.style.WARNING(f"  - Record {number} skipped: {e}")); continue
+            hospitals[(hospital.name, hospital.latitude, hospital.longitude)] = hospital
+        with transaction.atomic():
+            Hospital.objects.bulk_create(hospitals.values(), batch_size=500, update_conflicts=True,
+                                         unique_fields=["name", "latitude", "longitude"], update_fields=FIELDS)
+            removed = 0
+            if options["replace"]:
+                stale = [pk for pk, *key in Hospital.objects.values_list("pk", "name", "latitude", "longitude") if tuple(key) not in hospitals]
+                removed, _ = Hospital.objects.filter(pk__in=stale).delete()
+            # bulk_create-ը signal-ներ չի ուղարկում։
+            transaction.on_commit(hospital_index.invalidate)
+        self.stdout.write(self.style.SUCCESS(f"Done. Imported {len(hospitals)} hospital(s), skipped {skipped}, removed {removed}."))
@@ -0,0 +1,98 @@
+import json, os, shutil, tempfile, time
+from unittest import mock
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from main import loadtest
+
+def parse_mix(value):
+    mix = {name: 0 for name in loadtest.DEFAULT_MIX} if value else dict(loadtest.DEFAULT_MIX)
+    for part in filter(None, (value or "").split(",")):
+        name, _, weight = part.partition("=")
+        if name not in loadtest.DEFAULT_MIX: raise CommandError(f"Unknown scenario '{name}'. Choose from: {', '.join(loadtest.DEFAULT_MIX)}")
+        try: mix[name] = float(weight or 1)
+        except ValueError: raise CommandError(f"Invalid weight in '{part}'.")
+    if not any(mix.values()): raise CommandError("At least one scenario needs a positive weight.")
+    return mix
+
+class Command(BaseCommand):
+    help = ("Seeds a synthetic population into a throwaway test database and drives a doctor/patient traffic mix "
+            "(login, profile, settings, QR scans, photo search with a stubbed embedder), reporting throughput, "
+            "tail latency and query counts per endpoint. Requests run in-process through the Django test Client, "
+            "not through an HTTP server.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patients", type=int, default=200)
+        parser.add_argument("--doctors", type=int, default=10)
+        parser.add_argument("--enrolled", type=int, default=50, help="Patients with face embeddings (searchable).")
+        parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel virtual users (threads).")
+        parser.add_argument("--mix", default="", help="Scenario weights, e.g. 'qr=4,profile=3,search=1'. Unlisted scenarios are off.")
+        parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds the stub embedder sleeps per batch.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the report as JSON.")
+        parser.add_argument("--baseline", help="Previous JSON report; fail if any p95 regresses beyond --tolerance.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 regression ratio (default 0.25).")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        if options["enrolled"] > options["patients"]: raise CommandError("--enrolled cannot exceed --patients.")
+        if mix["search"] and options["enrolled"] < 1: raise CommandError("search needs --enrolled >= 1.")
+        if connection.vendor == "sqlite" and options["concurrency"] > 1:
+            self.stdout.write(self.style.WARNING("SQLite allows one writer at a time: with --concurrency > 1, login/settings writes may fail with 'database is locked' (counted under 'locked'). Use PostgreSQL (DATABASE_URL) for concurrent runs."))
+        workdir = tempfile.mkdtemp(prefix="arvion-loadtest-")
+        # SQLite-ի դեպքում ֆայլային բազա՝ in-memory-ի փոխարեն, որպեսզի thread-ները աշխատեն զուգահեռ։
+        if connection.vendor == "sqlite": connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(workdir, "loadtest.sqlite3")
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Առանձին cache և մոդելի ֆայլ, որպեսզի թեստը չխառնվի իրական տվյալների հետ։
+            with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "loadtest"}}):
+                report, elapsed = self.run(options, mix, workdir)
+        finally:
+            from main import audit
+            audit.flush()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+        self.print_report(report, elapsed)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f: json.dump({"elapsed": elapsed, "mix": mix, "endpoints": report}, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+        if options["baseline"]: self.compare(report, options["baseline"], options["tolerance"])
+
+    def run(self, options, mix, workdir):
+        from main import face_index, face_recognition_service
+        started = time.perf_counter()
+        population = loadtest.seed_population(options["patients"], options["doctors"], options["enrolled"], seed=options["seed"])
+        model_path = os.path.join(workdir, "facenet_model.pkl")
+        partition_dir = os.path.join(workdir, "partitions")
+        if population["centroids"]: face_index.rebuild_index(model_path, partition_dir)
+        self.stdout.write(f"Seeded {options['patients']} patients, {options['doctors']} doctors, {options['enrolled']} enrolled in {time.perf_counter() - started:.1f}s")
+        stub = loadtest.StubEmbedder(population["centroids"], options["embed_latency"], options["seed"])
+        with mock.patch.object(face_recognition_service, "_get_embedder", lambda: stub), \
+             mock.patch.object(face_recognition_service, "_model_path", model_path), \
+             mock.patch.object(face_recognition_service, "_partition_dir", partition_dir), \
+             mock.patch.object(face_recognition_service, "_model_data", None):
+            self.stdout.write(f"Running {options['concurrency']} virtual users for {options['duration']:.0f}s...")
+            return loadtest.run_scenarios(population, mix, options["duration"], options["concurrency"], options["seed"])
+
+    def print_report(self, report, elapsed):
+        total = sum(row["requests"] for row in report.values())
+        self.stdout.write(self.style.SUCCESS(f"\n{'endpoint':<10} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queries':>8} {'q max':>6} {'errors':>6} {'locked':>6}"))
+        for name, row in report.items():
+            self.stdout.write(f"{name:<10} {row['requests']:>6} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                              f"{row['max_ms']:>8.1f} {row['queries_mean']:>8.1f} {row['queries_max']:>6} {row['errors']:>6} {row['db_locked']:>6}")
+        self.stdout.write(self.style.SUCCESS(f"Total: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)"))
+
+    def compare(self, report, baseline_path, tolerance):
+        with open(baseline_path, encoding="utf-8") as f: baseline = json.load(f)["endpoints"]
+        regressions = []
+        for name, row in report.items():
+            if name not in baseline: continue
+            before, after = baseline[name]["p95_ms"], row["p95_ms"]
+            change = (after - before) / before if before else 0.0
+            self.stdout.write(f"{name:<10} p95 {before:.1f} -> {after:.1f} ms ({change:+.0%}), queries {baseline[name]['queries_mean']:.1f} -> {row['queries_mean']:.1f}")
+            if change > tolerance or row["queries_mean"] > baseline[name]["queries_mean"] + 0.5: regressions.append(name)
+        if regressions: raise CommandError(f"Regression beyond tolerance in: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("No regressions beyond tolerance."))
@@ -0,0 +1,36 @@
+import gzip, os
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from main.page_cache import STATIC_PAGES, uses_per_visitor_state
+
+class Command(BaseCommand):
+    help = "Pre-renders the static informational pages to HTML (plus .gz/.br) so anonymous requests are served without running views."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.PRERENDERED_PAGES_ROOT, help="Directory served by PrerenderedPageMiddleware.")
+        parser.add_argument("--host", default=(settings.ALLOWED_HOSTS or ["localhost"])[-1])
+
+    def write_compressed(self, file_path, content):
+        with open(file_path, "wb") as f: f.write(content)
+        with open(f"{file_path}.gz", "wb") as f: f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        try: import brotli
+        except ImportError: return
+        with open(f"{file_path}.br", "wb") as f: f.write(brotli.compress(content))
+
+    def handle(self, *args, **options):
+        factory, rendered = RequestFactory(HTTP_HOST=options["host"]), 0
+        for name in STATIC_PAGES:
+            path = reverse(name)
+            request = factory.get(path); request.user = AnonymousUser()
+            response = resolve(path).func(request)
+            if response.status_code != 200 or uses_per_visitor_state(request, response):
+                self.stdout.write(self.style.WARNING(f"  - Skipping {path}: page is not static (status {response.status_code} or per-visitor state)."))
+                continue
+            page_dir = os.path.join(options["output"], path.strip("/"))
+            os.makedirs(page_dir, exist_ok=True)
+            self.write_compressed(os.path.join(page_dir, "index.html"), response.content); rendered += 1
+            self.stdout.write(self.style.SUCCESS(f"  - Rendered {path}"))
+        self.stdout.write(self.style.SUCCESS(f"Pre-rendered {rendered} page(s) into {options['output']}."))
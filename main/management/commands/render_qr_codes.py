@@ -0,0 +1,31 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from main import face_index, qr_codes
+from main.models import CustomUser
+
+class Command(BaseCommand):
+    help = "Pre-renders public profile QR codes (e.g. for printing a ward's wristbands) and warms the QR cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", required=True, help="Public site URL encoded into the QR codes, e.g. https://arvion.example.org")
+        parser.add_argument("--output", default="qr_codes", help="Directory for the rendered files.")
+        parser.add_argument("--format", choices=sorted(qr_codes.QR_FORMATS), default="png")
+        parser.add_argument("--user-ids", nargs="*", type=int, help="Render only these patients (default: every patient).")
+        parser.add_argument("--workplace", help="Render only patients of this facility (DoctorProfile.workplace), i.e. patients whose details its doctors opened recently.")
+
+    def handle(self, *args, **options):
+        fmt, output_dir = options["format"], options["output"]
+        patients = CustomUser.objects.filter(patient_profile__isnull=False).only("id", "username", "public_profile_id")
+        if options["user_ids"]: patients = patients.filter(id__in=options["user_ids"])
+        # Պացիենտի և հաստատության կապը նույնն է, ինչ դեմքի ինդեքսի partition-ներում (AccessEvent)։
+        if options["workplace"]: patients = patients.filter(id__in=face_index.partition_members().get(face_index.facility_key(options["workplace"]), ()))
+        if not patients.exists(): raise CommandError("No matching patients found.")
+
+        os.makedirs(output_dir, exist_ok=True)
+        rendered = 0
+        for patient in patients.iterator():
+            data = qr_codes.get_qr(qr_codes.public_profile_url(patient.public_profile_id, options["base_url"]), fmt)
+            file_path = os.path.join(output_dir, f"{patient.id}_{patient.public_profile_id}.{fmt}")
+            with open(file_path, "wb") as f: f.write(data)
+            rendered += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} QR code(s) into {output_dir}."))
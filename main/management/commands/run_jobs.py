@@ -0,0 +1,42 @@
+import multiprocessing, os, time
+from django.core.management.base import BaseCommand
+from django.db import connections
+from main import inference_gate, jobs
+
+class Command(BaseCommand):
+    help = "Runs background job workers (embed_image, rebuild_index, compact_index)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--compact-every", type=int, default=3600, help="Seconds between scheduled compact_index jobs (0 disables).")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit instead of polling forever.")
+        parser.add_argument("--nice", type=int, default=10, help="CPU niceness of the workers, so web searches get the CPU first (0 disables).")
+
+    def work(self, options):
+        # Inference gate-ը մեկ պրոցեսի համար է. որոնումների առաջնահերթությունը web պրոցեսների
+        # նկատմամբ ապահովվում է OS-ի մակարդակում, իսկ TF thread-երը՝ JOB_WORKER_PROCESSES-ով։
+        if options["nice"]: inference_gate.lower_process_priority(options["nice"])
+        next_compact = time.monotonic()
+        while True:
+            if options["compact_every"] and time.monotonic() >= next_compact:
+                jobs.enqueue("compact_index", priority=jobs.PRIORITY_LOW, dedup_key="compact_index")
+                next_compact = time.monotonic() + options["compact_every"]
+            job = jobs.claim_next()
+            if job is None:
+                if options["once"]: return
+                time.sleep(options["poll_interval"]); continue
+            started = time.monotonic()
+            job = jobs.execute(job)
+            style = self.style.SUCCESS if job.status == job.DONE else self.style.WARNING
+            self.stdout.write(style(f"  - {job.kind} #{job.pk}: {job.status} in {time.monotonic() - started:.2f}s"))
+
+    def handle(self, *args, **options):
+        os.environ.setdefault("JOB_WORKER_PROCESSES", str(max(1, options["processes"])))
+        jobs.JOB_QUEUE_EAGER = False  # Worker-ի ավելացրած առաջադրանքները նույնպես գնում են հերթ։
+        if options["processes"] <= 1: return self.work(options)
+        connections.close_all()  # Յուրաքանչյուր պրոցես պետք է բացի իր սեփական DB կապը։
+        workers = [multiprocessing.Process(target=self.work, args=(options,)) for _ in range(options["processes"])]
+        for worker in workers: worker.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(workers)} worker process(es)."))
+        for worker in workers: worker.join()
@@ -1,233 +1,448 @@
-import os, uuid
-from django.db import models
-from django.contrib.auth.models import AbstractUser
-
-
-def get_face_image_path(instance, filename):
-    """Ֆայլերը պահպանում է media/face/<user_email>/<filename> ճանապարհով։"""
-    user_email, user_id_fallback = "unknown", "unknown"
-    if isinstance(instance, AbstractUser):
-        user_email, user_id_fallback = instance.email, str(instance.id)
-    elif hasattr(instance, "user") and instance.user:
-        user_email, user_id_fallback = instance.user.email, str(instance.user.id)
-    folder_name = user_email if user_email else user_id_fallback
-    return os.path.join("face", folder_name, filename)
-
-
-class Gender(models.Model):
-    name = models.CharField(max_length=20, unique=True, verbose_name="Անվանում")
-
-    def __str__(self):
-        return self.name
-
-
-class BloodGroup(models.Model):
-    group_name = models.CharField(
-        max_length=11, unique=True, verbose_name="Խմբի անվանում"
-    )
-
-    def __str__(self):
-        return self.group_name
-
-
-class BaseMedicalTerm(models.Model):
-    """
-    Ընդհանուր բազային կլաս բժշկական տերմինների համար՝ կրկնությունից խուսափելու նպատակով։
-    """
-
-    name = models.CharField(max_length=100, unique=True, verbose_name="Անվանում")
-
-    class Meta:
-        abstract = True  # Այս մոդելի համար բազայում աղյուսակ չի ստեղծվի։
-        ordering = ["name"]
-
-    def __str__(self):
-        return self.name
-
-
-class Condition(BaseMedicalTerm):
-    class Meta(BaseMedicalTerm.Meta):
-        verbose_name = "Հիվանդություն"
-        verbose_name_plural = "Հիվանդություններ"
-
-
-class Medication(BaseMedicalTerm):
-    class Meta(BaseMedicalTerm.Meta):
-        verbose_name = "Դեղամիջոց"
-        verbose_name_plural = "Դեղամիջոցներ"
-
-
-class Surgery(BaseMedicalTerm):
-    class Meta(BaseMedicalTerm.Meta):
-        verbose_name = "Վիրահատություն"
-        verbose_name_plural = "Վիրահատություններ"
-
-
-class Allergy(BaseMedicalTerm):
-    class Meta(BaseMedicalTerm.Meta):
-        verbose_name = "Ալերգիա"
-        verbose_name_plural = "Ալերգիաներ"
-
-
-class CustomUser(AbstractUser):
-    date_of_birth = models.DateField(
-        null=True, blank=True, verbose_name="Ծննդյան ամսաթիվ"
-    )
-    gender = models.ForeignKey(
-        Gender, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Սեռ"
-    )
-    phone_number = models.CharField(
-        max_length=25, blank=True, verbose_name="Հեռախոսահամար"
-    )
-    address = models.TextField(blank=True, verbose_name="Բնակության հասցե")
-    emergency_contact_phone = models.CharField(
-        max_length=25, blank=True, verbose_name="Վստահված հեռախոսահամար"
-    )
-    profile_picture = models.ImageField(
-        upload_to=get_face_image_path,
-        null=True,
-        blank=True,
-        verbose_name="Պրոֆիլի նկար",
-    )
-    public_profile_id = models.UUIDField(
-        default=uuid.uuid4, editable=False, unique=True, verbose_name="Հանրային ID (QR)"
-    )
-
-    def __str__(self):
-        return self.get_full_name() or self.username
-
-
-class UserFaceImage(models.Model):
-    user = models.ForeignKey(
-        CustomUser,
-        on_delete=models.CASCADE,
-        related_name="face_images",
-        verbose_name="Օգտատեր",
-    )
-    image = models.ImageField(
-        upload_to=get_face_image_path, verbose_name="Ճանաչման նկար"
-    )
-    uploaded_at = models.DateTimeField(
-        auto_now_add=True, verbose_name="Վերբեռնման ամսաթիվ"
-    )
-
-    class Meta:
-        verbose_name = "Դեմքի ճանաչման նկար"
-        verbose_name_plural = "Դեմքի ճանաչման նկարներ"
-        ordering = ["-uploaded_at"]
-
-    def __str__(self):
-        return f"Նկար {self.user.username}-ի համար"
-
-
-class DoctorProfile(models.Model):
-    user = models.OneToOneField(
-        CustomUser,
-        on_delete=models.CASCADE,
-        primary_key=True,
-        related_name="doctor_profile",
-        verbose_name="Օգտատեր",
-    )
-    specialty = models.CharField(max_length=100, verbose_name="Մասնագիտություն")
-    license_number = models.CharField(
-        max_length=50, unique=True, verbose_name="Լիցենզիայի համար"
-    )
-    workplace = models.CharField(
-        max_length=255, blank=True, null=True, verbose_name="Աշխատավայր"
-    )
-    biography = models.TextField(blank=True, null=True, verbose_name="Իմ մասին")
-
-    def __str__(self):
-        return f"Բժիշկ՝ {self.user}"
-
-
-class PatientProfile(models.Model):
-    user = models.OneToOneField(
-        CustomUser,
-        on_delete=models.CASCADE,
-        primary_key=True,
-        related_name="patient_profile",
-        verbose_name="Օգտատեր",
-    )
-    blood_group = models.ForeignKey(
-        BloodGroup,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        verbose_name="Արյան խումբ",
-    )
-    weight_kg = models.DecimalField(
-        max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Քաշ (կգ)"
-    )
-    height_cm = models.DecimalField(
-        max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Հասակ (սմ)"
-    )
-    other_notes = models.TextField(blank=True, verbose_name="Այլ նշումներ")
-    conditions = models.ManyToManyField(
-        Condition, through="PatientCondition", verbose_name="Հիվանդություններ"
-    )
-    medications = models.ManyToManyField(
-        Medication, through="PatientMedication", verbose_name="Դեղամիջոցներ"
-    )
-    surgeries = models.ManyToManyField(
-        Surgery, through="PatientSurgery", verbose_name="Վիրահատություններ"
-    )
-    allergies = models.ManyToManyField(Allergy, blank=True, verbose_name="Ալերգիաներ")
-
-    def __str__(self):
-        return f"Պացիենտ՝ {self.user}"
-
-
-class PatientCondition(models.Model):
-    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
-    condition = models.ForeignKey(
-        Condition, on_delete=models.CASCADE, verbose_name="Հիվանդություն"
-    )
-    diagnosis_date = models.DateField(
-        null=True, blank=True, verbose_name="Ախտորոշման ամսաթիվ"
-    )
-
-    class Meta:
-        unique_together = ("patient", "condition")
-        verbose_name = "Պացիենտի հիվանդություն"
-        verbose_name_plural = "Պացիենտների հիվանդություններ"
-
-    def __str__(self):
-        return f"{self.patient} - {self.condition}"
-
-
-class PatientMedication(models.Model):
-    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
-    medication = models.ForeignKey(
-        Medication, on_delete=models.CASCADE, verbose_name="Դեղամիջոց"
-    )
-    dosage = models.CharField(max_length=100, blank=True, verbose_name="Դեղաչափ")
-    start_date = models.DateField(null=True, blank=True, verbose_name="Ընդունման սկիզբ")
-    notes = models.TextField(blank=True, verbose_name="Նշումներ")
-
-    class Meta:
-        unique_together = ("patient", "medication")
-        verbose_name = "Պացիենտի դեղամիջոց"
-        verbose_name_plural = "Պացիենտների դեղամիջոցներ"
-
-    def __str__(self):
-        return f"{self.patient} - {self.medication.name}"
-
-
-class PatientSurgery(models.Model):
-    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
-    surgery = models.ForeignKey(
-        Surgery, on_delete=models.CASCADE, verbose_name="Վիրահատություն"
-    )
-    surgery_date = models.DateField(
-        null=True, blank=True, verbose_name="Վիրահատության ամսաթիվ"
-    )
-    notes = models.TextField(blank=True, verbose_name="Նշումներ")
-
-    class Meta:
-        unique_together = ("patient", "surgery")
-        verbose_name = "Պացիենտի վիրահատություն"
-        verbose_name_plural = "Պացիենտների վիրահատություններ"
-
-    def __str__(self):
-        return f"{self.patient} - {self.surgery.name}"
+import os, uuid
+from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.contrib.auth.models import AbstractUser
+
+
+def get_face_image_path(instance, filename):
+    """Ֆայլերը պահպանում է media/face/<user_email>/<filename> ճանապարհով։"""
+    user_email, user_id_fallback = "unknown", "unknown"
+    if isinstance(instance, AbstractUser):
+        user_email, user_id_fallback = instance.email, str(instance.id)
+    elif hasattr(instance, "user") and instance.user:
+        user_email, user_id_fallback = instance.user.email, str(instance.user.id)
+    folder_name = user_email if user_email else user_id_fallback
+    return os.path.join("face", folder_name, filename)
+
+
+# Թույլ է տալիս գրել filter(email__lower=...), որն օգտագործում է unique_user_email_ci ինդեքսը։
+models.EmailField.register_lookup(Lower)
+
+
+class Gender(models.Model):
+    name = models.CharField(max_length=20, unique=True, verbose_name="Անվանում")
+
+    def __str__(self):
+        return self.name
+
+
+class BloodGroup(models.Model):
+    group_name = models.CharField(
+        max_length=11, unique=True, verbose_name="Խմբի անվանում"
+    )
+
+    def __str__(self):
+        return self.group_name
+
+
+class BaseMedicalTerm(models.Model):
+    """
+    Ընդհանուր բազային կլաս բժշկական տերմինների համար՝ կրկնությունից խուսափելու նպատակով։
+    """
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="Անվանում")
+
+    class Meta:
+        abstract = True  # Այս մոդելի համար բազայում աղյուսակ չի ստեղծվի։
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Condition(BaseMedicalTerm):
+    class Meta(BaseMedicalTerm.Meta):
+        verbose_name = "Հիվանդություն"
+        verbose_name_plural = "Հիվանդություններ"
+
+
+class Medication(BaseMedicalTerm):
+    class Meta(BaseMedicalTerm.Meta):
+        verbose_name = "Դեղամիջոց"
+        verbose_name_plural = "Դեղամիջոցներ"
+
+
+class Surgery(BaseMedicalTerm):
+    class Meta(BaseMedicalTerm.Meta):
+        verbose_name = "Վիրահատություն"
+        verbose_name_plural = "Վիրահատություններ"
+
+
+class Allergy(BaseMedicalTerm):
+    class Meta(BaseMedicalTerm.Meta):
+        verbose_name = "Ալերգիա"
+        verbose_name_plural = "Ալերգիաներ"
+
+
+class CustomUser(AbstractUser):
+    date_of_birth = models.DateField(
+        null=True, blank=True, verbose_name="Ծննդյան ամսաթիվ"
+    )
+    gender = models.ForeignKey(
+        Gender, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Սեռ"
+    )
+    phone_number = models.CharField(
+        max_length=25, blank=True, verbose_name="Հեռախոսահամար"
+    )
+    address = models.TextField(blank=True, verbose_name="Բնակության հասցե")
+    emergency_contact_phone = models.CharField(
+        max_length=25, blank=True, verbose_name="Վստահված հեռախոսահամար"
+    )
+    profile_picture = models.ImageField(
+        upload_to=get_face_image_path,
+        null=True,
+        blank=True,
+        verbose_name="Պրոֆիլի նկար",
+    )
+    profile_thumbnail = models.ImageField(
+        upload_to=get_face_image_path,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Պրոֆիլի նկարի մանրապատկեր",
+    )
+    # Պրոֆիլի նկարի embedding-ը, որպեսզի rebuild_index-ը չկորցնի միայն դրանով գրանցված օգտատերերին։
+    profile_embedding = models.BinaryField(null=True, editable=False)
+    profile_quality = models.FloatField(null=True, editable=False)
+    public_profile_id = models.UUIDField(
+        default=uuid.uuid4, editable=False, unique=True, verbose_name="Հանրային ID (QR)"
+    )
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Էլ. հասցեն եզակի է առանց մեծատառ/փոքրատառ տարբերության (register_view)։
+            models.UniqueConstraint(
+                Lower("email"),
+                condition=~models.Q(email=""),
+                name="unique_user_email_ci",
+            )
+        ]
+        indexes = [
+            # train_face_model-ի պրոֆիլի նկար ունեցող օգտատերերի ընտրության համար։
+            models.Index(
+                fields=["id"],
+                condition=models.Q(profile_picture__gt=""),
+                name="user_with_picture_idx",
+            )
+        ]
+
+    def __str__(self):
+        return self.get_full_name() or self.username
+
+
+class UserFaceImage(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="face_images",
+        verbose_name="Օգտատեր",
+    )
+    image = models.ImageField(
+        upload_to=get_face_image_path, verbose_name="Ճանաչման նկար"
+    )
+    thumbnail = models.ImageField(
+        upload_to=get_face_image_path,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Մանրապատկեր",
+    )
+    face_crop = models.ImageField(
+        upload_to=get_face_image_path,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Հավասարեցված դեմք (160×160)",
+    )
+    face_detected = models.BooleanField(
+        null=True, editable=False, verbose_name="Դեմքը հայտնաբերված է"
+    )
+    embedding = models.BinaryField(null=True, editable=False)
+    quality = models.FloatField(
+        null=True, editable=False, verbose_name="Որակի գնահատական"
+    )
+    # Կրկնօրինակների ստուգման համար (main/face_dedup.py)։
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    perceptual_hash = models.CharField(max_length=16, blank=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="duplicates",
+        verbose_name="Կրկնօրինակ է",
+    )
+    uploaded_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Վերբեռնման ամսաթիվ"
+    )
+
+    class Meta:
+        verbose_name = "Դեմքի ճանաչման նկար"
+        verbose_name_plural = "Դեմքի ճանաչման նկարներ"
+        ordering = ["-uploaded_at"]
+        indexes = [
+            # Օգտատիրոջ պատկերասրահը՝ նորից հին (add_photo_view)։
+            models.Index(fields=["user", "-uploaded_at"], name="face_image_user_recent_idx"),
+            # Ինդեքսի վերակառուցումը կարդում է միայն embedding ունեցող նկարները։
+            models.Index(
+                fields=["user"],
+                condition=models.Q(embedding__isnull=False),
+                name="face_image_embedded_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Նկար {self.user.username}-ի համար"
+
+    @property
+    def preview_url(self):
+        """Մանրապատկերի URL-ը, իսկ դրա բացակայության դեպքում՝ բնօրինակինը։"""
+        return (self.thumbnail or self.image).url
+
+    def delete_files(self):
+        for field_file in (self.image, self.thumbnail, self.face_crop):
+            if field_file:
+                field_file.delete(save=False)
+
+
+class DoctorProfile(models.Model):
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="doctor_profile",
+        verbose_name="Օգտատեր",
+    )
+    specialty = models.CharField(max_length=100, verbose_name="Մասնագիտություն")
+    license_number = models.CharField(
+        max_length=50, unique=True, verbose_name="Լիցենզիայի համար"
+    )
+    workplace = models.CharField(
+        max_length=255, blank=True, null=True, verbose_name="Աշխատավայր"
+    )
+    biography = models.TextField(blank=True, null=True, verbose_name="Իմ մասին")
+
+    def __str__(self):
+        return f"Բժիշկ՝ {self.user}"
+
+
+class PatientProfile(models.Model):
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="patient_profile",
+        verbose_name="Օգտատեր",
+    )
+    blood_group = models.ForeignKey(
+        BloodGroup,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Արյան խումբ",
+    )
+    weight_kg = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Քաշ (կգ)"
+    )
+    height_cm = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="Հասակ (սմ)"
+    )
+    other_notes = models.TextField(blank=True, verbose_name="Այլ նշումներ")
+    conditions = models.ManyToManyField(
+        Condition, through="PatientCondition", verbose_name="Հիվանդություններ"
+    )
+    medications = models.ManyToManyField(
+        Medication, through="PatientMedication", verbose_name="Դեղամիջոցներ"
+    )
+    surgeries = models.ManyToManyField(
+        Surgery, through="PatientSurgery", verbose_name="Վիրահատություններ"
+    )
+    allergies = models.ManyToManyField(Allergy, blank=True, verbose_name="Ալերգիաներ")
+
+    def __str__(self):
+        return f"Պացիենտ՝ {self.user}"
+
+
+class PatientCondition(models.Model):
+    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
+    condition = models.ForeignKey(
+        Condition, on_delete=models.CASCADE, verbose_name="Հիվանդություն"
+    )
+    diagnosis_date = models.DateField(
+        null=True, blank=True, verbose_name="Ախտորոշման ամսաթիվ"
+    )
+
+    class Meta:
+        unique_together = ("patient", "condition")
+        verbose_name = "Պացիենտի հիվանդություն"
+        verbose_name_plural = "Պացիենտների հիվանդություններ"
+
+    def __str__(self):
+        return f"{self.patient} - {self.condition}"
+
+
+class PatientMedication(models.Model):
+    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, verbose_name="Դեղամիջոց"
+    )
+    dosage = models.CharField(max_length=100, blank=True, verbose_name="Դեղաչափ")
+    start_date = models.DateField(null=True, blank=True, verbose_name="Ընդունման սկիզբ")
+    notes = models.TextField(blank=True, verbose_name="Նշումներ")
+
+    class Meta:
+        unique_together = ("patient", "medication")
+        verbose_name = "Պացիենտի դեղամիջոց"
+        verbose_name_plural = "Պացիենտների դեղամիջոցներ"
+
+    def __str__(self):
+        return f"{self.patient} - {self.medication.name}"
+
+
+class PatientSurgery(models.Model):
+    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
+    surgery = models.ForeignKey(
+        Surgery, on_delete=models.CASCADE, verbose_name="Վիրահատություն"
+    )
+    surgery_date = models.DateField(
+        null=True, blank=True, verbose_name="Վիրահատության ամսաթիվ"
+    )
+    notes = models.TextField(blank=True, verbose_name="Նշումներ")
+
+    class Meta:
+        unique_together = ("patient", "surgery")
+        verbose_name = "Պացիենտի վիրահատություն"
+        verbose_name_plural = "Պացիենտների վիրահատություններ"
+
+    def __str__(self):
+        return f"{self.patient} - {self.surgery.name}"
+
+
+class Job(models.Model):
+    """Ֆոնային առաջադրանք (embedding, ինդեքսի վերակառուցում), որը կատարում է run_jobs worker-ը։"""
+
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Սպասում է"),
+        (RUNNING, "Կատարվում է"),
+        (DONE, "Ավարտված"),
+        (FAILED, "Ձախողված"),
+    ]
+
+    kind = models.CharField(max_length=50, verbose_name="Տեսակ")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Տվյալներ")
+    dedup_key = models.CharField(max_length=255, blank=True, default="")
+    priority = models.SmallIntegerField(default=100, verbose_name="Առաջնահերթություն")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Կարգավիճակ"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Փորձեր")
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True, verbose_name="Վերջին սխալը")
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Ֆոնային առաջադրանք"
+        verbose_name_plural = "Ֆոնային առաջադրանքներ"
+        ordering = ["priority", "run_after", "id"]
+        indexes = [
+            models.Index(
+                fields=["status", "priority", "run_after"], name="job_queue_idx"
+            )
+        ]
+        constraints = [
+            # Նույն բանալիով միայն մեկ սպասող առաջադրանք կարող է լինել։
+            models.UniqueConstraint(
+                fields=["dedup_key"],
+                condition=models.Q(status="pending") & ~models.Q(dedup_key=""),
+                name="unique_pending_job_dedup_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class Hospital(models.Model):
+    """Հիվանդանոց՝ կոորդինատներով։ Տվյալները բեռնվում են import_hospitals հրամանով։"""
+
+    name = models.CharField(max_length=255, verbose_name="Անվանում")
+    address = models.CharField(max_length=255, blank=True, verbose_name="Հասցե")
+    city = models.CharField(max_length=100, blank=True, verbose_name="Քաղաք")
+    phone = models.CharField(max_length=50, blank=True, verbose_name="Հեռախոս")
+    latitude = models.FloatField(verbose_name="Լայնություն")
+    longitude = models.FloatField(verbose_name="Երկայնություն")
+    specialties = models.JSONField(
+        default=list, blank=True, verbose_name="Մասնագիտություններ"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Հիվանդանոց"
+        verbose_name_plural = "Հիվանդանոցներ"
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "latitude", "longitude"], name="unique_hospital_location"
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class AccessEvent(models.Model):
+    """
+    Պացիենտի տվյալների դիտման գրառում։ Միայն ավելացվում է (append-only)՝
+    main/audit.py-ի բուֆերից խմբաքանակներով։ Կապերը առանց FK constraint-ի են,
+    որպեսզի պատմությունը պահպանվի նաև հաշիվների ջնջումից հետո։
+    """
+
+    DETAILS, PUBLIC_PROFILE, PUBLIC_CARD = "details", "public_profile", "public_card"
+    ACTION_CHOICES = [
+        (DETAILS, "Բժշկի դիտում"),
+        (PUBLIC_PROFILE, "Հանրային պրոֆիլ (QR)"),
+        (PUBLIC_CARD, "Շտապ օգնության քարտ (JSON)"),
+    ]
+
+    patient = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+        verbose_name="Պացիենտ",
+    )
+    actor = models.ForeignKey(
+        CustomUser,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Դիտողը",
+    )
+    action = models.CharField(
+        max_length=20, choices=ACTION_CHOICES, verbose_name="Գործողություն"
+    )
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    accessed_at = models.DateTimeField(verbose_name="Ժամանակ")
+
+    class Meta:
+        verbose_name = "Մուտքի գրառում"
+        verbose_name_plural = "Մուտքերի մատյան"
+        ordering = ["-accessed_at"]
+        indexes = [
+            # Պացիենտի պատմությունը՝ նորից հին (audit.access_history)։
+            models.Index(
+                fields=["patient", "-accessed_at"], name="access_patient_recent_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} — {self.patient_id} ({self.accessed_at:%Y-%m-%d %H:%M})"
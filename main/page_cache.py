@@ -0,0 +1,101 @@
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 10)
+# Տարբերակը փոխվում է յուրաքանչյուր deploy-ի ժամանակ, ուստի հին էջերը ինքնաբերաբար անվավեր են դառնում։
+PAGE_CACHE_VERSION = getattr(settings, "PAGE_CACHE_VERSION", "")
+
+# Ստատիկ տեղեկատվական էջերի URL անունները (main/urls.py)։
+STATIC_PAGES = [
+    "arvion",
+    "about_project",
+    "how_it_works",
+    "terms_privacy",
+    "security",
+    "status",
+]
+
+
+def is_anonymous_request(request):
+    """Անանուն GET՝ առանց session-ի և չցուցադրված հաղորդագրությունների։"""
+    return (
+        request.method in ("GET", "HEAD")
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def uses_per_visitor_state(request, response):
+    """Cookie դնող պատասխանները (օր.՝ CSRF token-ով ձևերը) չեն կարող կիսվել այցելուների միջև։"""
+    return bool(response.cookies) or bool(request.META.get("CSRF_COOKIE_NEEDS_UPDATE"))
+
+
+def page_cache_key(view_name):
+    return f"page:{PAGE_CACHE_VERSION}:{view_name}"
+
+
+def cache_static_page(view):
+    """
+    Անանուն այցելուների համար պահում է էջի պատրաստի HTML-ը cache-ում։
+    Մուտք գործած օգտատերերը միշտ ստանում են նոր render արված էջ։
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_anonymous_request(request):
+            return view(request, *args, **kwargs)
+        key = page_cache_key(view.__name__)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not uses_per_visitor_state(
+                request, response
+            ):
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    PAGE_CACHE_TIMEOUT,
+                )
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return wrapper
+
+
+class PrerenderedPageMiddleware:
+    """
+    prerender_pages-ի ստեղծած HTML-ը (.gz/.br-ով) սպասարկում է WhiteNoise-ով, բայց միայն
+    անանուն այցելուներին։ Session-ով օգտատերերի հարցումները անցնում են view-ներին,
+    որպեսզի նրանք չստանան անանուն էջը։
+    """
+
+    def __init__(self, get_response):
+        root = getattr(settings, "PRERENDERED_PAGES_ROOT", None)
+        if not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        from whitenoise.base import WhiteNoise
+
+        self.get_response = get_response
+        # max_age=0՝ զննարկիչը ստուգում է էջը ամեն անգամ (304), և login-ից հետո չի ցույց տալիս հինը։
+        self.pages = WhiteNoise(None, root=root, index_file=True, max_age=0)
+
+    def __call__(self, request):
+        if is_anonymous_request(request):
+            page = self.pages.files.get(request.path_info)
+            if page is not None:
+                from whitenoise.middleware import WhiteNoiseMiddleware
+
+                response = WhiteNoiseMiddleware.serve(page, request)
+                patch_vary_headers(response, ("Cookie",))
+                return response
+        return self.get_response(request)
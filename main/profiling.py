@@ -0,0 +1,345 @@
+"""
+Ընտրովի (PROFILING_ENABLED) պրոֆայլինգ։ Յուրաքանչյուր հարցման համար հաշվվում են
+ընդհանուր ժամանակը, SQL հարցումների քանակն ու ժամանակը (connection.execute_wrapper)
+և face_recognition_service-ում անցկացրած ժամանակը։ PROFILING_SAMPLE_RATE մասով
+հարցումներն աշխատում են cProfile-ով, և եթե դրանք PROFILING_SLOW_MS-ից դանդաղ են,
+.prof ֆայլը պահվում է PROFILING_DIR-ում։ Ագրեգատները պահվում են worker-ի
+հիշողության մեջ և պարբերաբար գրվում cache՝ admin-ի էջի համար։
+"""
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import ExitStack
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PROFILING_ENABLED = getattr(settings, "PROFILING_ENABLED", False)
+SAMPLE_RATE = getattr(settings, "PROFILING_SAMPLE_RATE", 0.01)
+SLOW_MS = getattr(settings, "PROFILING_SLOW_MS", 1000)
+PROFILE_DIR = getattr(
+    settings, "PROFILING_DIR", os.path.join(settings.BASE_DIR, "profiles")
+)
+MAX_DUMPS = getattr(settings, "PROFILING_MAX_DUMPS", 200)
+FLUSH_INTERVAL = getattr(settings, "PROFILING_FLUSH_INTERVAL", 30)
+# Յուրաքանչյուր endpoint-ի վերջին ժամանակները (p95-ի համար) և պահվող query shape-երը։
+RESERVOIR_SIZE, MAX_SHAPES = 200, 20
+STATS_TIMEOUT = 7 * 24 * 60 * 60
+# Worker-ները գրանցվում են ֆիքսված slot-երում cache.add-ով (ատոմար), այլ ոչ թե ընդհանուր
+# ցուցակի read-modify-write-ով, որի դեպքում միաժամանակ գրանցվողները կարող էին կորչել։
+WORKER_SLOT_KEY, MAX_WORKERS = "profiling:worker:{slot}", 64
+EPOCH_KEY = "profiling:epoch"
+# Ագրեգատները միավորվում են cache-ով, ուստի բոլոր worker-ները երևում են միայն REDIS_URL-ով։
+SHARED_CACHE = getattr(settings, "SHARED_CACHE", False)
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.query_count, self.query_ms = 0, 0.0
+        self.queries = {}
+        self.sections, self._depth = {}, {}
+
+
+def section(name):
+    """
+    Decorator՝ ֆունկցիայում անցկացրած ժամանակը հաշվելու ընթացիկ հարցման մեջ։
+    Ներդրված կանչերը (օր.՝ recognize_face -> extract_face) հաշվվում են մեկ անգամ։
+    Հարցումից դուրս (jobs, հրամաններ) ոչինչ չի անում։
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = getattr(_local, "metrics", None)
+            if metrics is None or metrics._depth.get(name):
+                return func(*args, **kwargs)
+            metrics._depth[name] = 1
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics._depth[name] = 0
+                elapsed = (time.perf_counter() - started) * 1000
+                metrics.sections[name] = metrics.sections.get(name, 0.0) + elapsed
+
+        return wrapper
+
+    return decorator
+
+
+def _query_wrapper(metrics):
+    def wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            metrics.query_count += 1
+            metrics.query_ms += elapsed
+            count, total = metrics.queries.get(sql, (0, 0.0))
+            metrics.queries[sql] = (count + 1, total + elapsed)
+
+    return wrapper
+
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_VALUES_ROWS = re.compile(r"(\(\.\.\.\)|\(%s\))(?:, (?:\(\.\.\.\)|\(%s\)))+")
+
+
+@lru_cache(maxsize=1024)
+def query_shape(sql):
+    """SQL-ը առանց IN (...)/VALUES ցուցակների երկարության՝ նույն հարցումները խմբավորելու համար։"""
+    shape = _VALUES_ROWS.sub(r"\1, ...", _IN_LIST.sub("(...)", sql))
+    return shape if len(shape) <= 500 else shape[:497] + "..."
+
+
+def endpoint_name(request):
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "<unresolved>"
+    return f"{request.method} /{route}"
+
+
+class ProfileStore:
+    """Worker-ի ագրեգատներ՝ {endpoint: {...}}։ flush()-ը գրում է դրանք cache։"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats, self._epoch, self._synced = {}, None, False
+        self._slot = None
+        self._flushed_at = time.monotonic()
+
+    @property
+    def worker_id(self):
+        import socket
+
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def add(self, endpoint, wall_ms, metrics, slow):
+        with self._lock:
+            row = self._stats.get(endpoint)
+            if row is None:
+                row = self._stats[endpoint] = {
+                    "count": 0,
+                    "slow": 0,
+                    "wall_ms": 0.0,
+                    "max_ms": 0.0,
+                    "query_count": 0,
+                    "query_ms": 0.0,
+                    "sections": {},
+                    "recent": deque(maxlen=RESERVOIR_SIZE),
+                    "shapes": {},
+                }
+            row["count"] += 1
+            row["slow"] += slow
+            row["wall_ms"] += wall_ms
+            row["max_ms"] = max(row["max_ms"], wall_ms)
+            row["query_count"] += metrics.query_count
+            row["query_ms"] += metrics.query_ms
+            row["recent"].append(wall_ms)
+            for name, ms in metrics.sections.items():
+                row["sections"][name] = row["sections"].get(name, 0.0) + ms
+            shapes = row["shapes"]
+            for sql, (count, ms) in metrics.queries.items():
+                shape = query_shape(sql)
+                total_count, total_ms = shapes.get(shape, (0, 0.0))
+                shapes[shape] = (total_count + count, total_ms + ms)
+            if len(shapes) > MAX_SHAPES * 2:
+                keep = sorted(shapes.items(), key=lambda item: item[1][1], reverse=True)
+                row["shapes"] = dict(keep[:MAX_SHAPES])
+        if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Գրում է worker-ի ագրեգատները cache։ Admin-ի «մաքրում»-ից հետո զրոյացնում է դրանք։"""
+        self._flushed_at = time.monotonic()
+        epoch = cache.get(EPOCH_KEY)
+        with self._lock:
+            if self._synced and epoch != self._epoch:
+                self._stats = {}
+            self._epoch, self._synced = epoch, True
+            snapshot = {
+                endpoint: {**row, "recent": list(row["recent"]), "shapes": dict(row["shapes"])}
+                for endpoint, row in self._stats.items()
+            }
+        cache.set(self._stats_key(self.worker_id), snapshot, STATS_TIMEOUT)
+        self._register()
+
+    def _register(self):
+        """Պահում է worker-ի slot-ը. զբաղեցնում է առաջին ազատը, եթե իրենը չկա։"""
+        worker_id = self.worker_id
+        if self._slot is not None:
+            key = WORKER_SLOT_KEY.format(slot=self._slot)
+            if cache.get(key) == worker_id:
+                cache.touch(key, STATS_TIMEOUT)
+                return
+        for slot in range(MAX_WORKERS):
+            key = WORKER_SLOT_KEY.format(slot=slot)
+            if cache.add(key, worker_id, STATS_TIMEOUT) or cache.get(key) == worker_id:
+                self._slot = slot
+                return
+
+    @staticmethod
+    def _stats_key(worker_id):
+        return f"profiling:stats:{worker_id}"
+
+
+def _worker_ids():
+    slots = [WORKER_SLOT_KEY.format(slot=slot) for slot in range(MAX_WORKERS)]
+    return set(cache.get_many(slots).values())
+
+
+_store = ProfileStore()
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else 0.0
+
+
+def slowest_endpoints(order="p95", limit=50, shapes=5):
+    """Բոլոր worker-ների ագրեգատները՝ միավորված և դասավորված ըստ order-ի (p95, max, avg, total)։"""
+    _store.flush()
+    workers = _worker_ids()
+    merged = {}
+    for snapshot in cache.get_many([_store._stats_key(w) for w in workers]).values():
+        for endpoint, row in snapshot.items():
+            total = merged.setdefault(
+                endpoint,
+                {
+                    "count": 0,
+                    "slow": 0,
+                    "wall_ms": 0.0,
+                    "max_ms": 0.0,
+                    "query_count": 0,
+                    "query_ms": 0.0,
+                    "sections": {},
+                    "recent": [],
+                    "shapes": {},
+                },
+            )
+            for field in ("count", "slow", "wall_ms", "query_count", "query_ms"):
+                total[field] += row[field]
+            total["max_ms"] = max(total["max_ms"], row["max_ms"])
+            total["recent"].extend(row["recent"])
+            for name, ms in row["sections"].items():
+                total["sections"][name] = total["sections"].get(name, 0.0) + ms
+            for shape, (count, ms) in row["shapes"].items():
+                shape_count, shape_ms = total["shapes"].get(shape, (0, 0.0))
+                total["shapes"][shape] = (shape_count + count, shape_ms + ms)
+
+    rows = []
+    for endpoint, row in merged.items():
+        count = row["count"] or 1
+        top_shapes = sorted(row["shapes"].items(), key=lambda item: item[1][1], reverse=True)
+        rows.append(
+            {
+                "endpoint": endpoint,
+                "count": row["count"],
+                "slow": row["slow"],
+                "avg_ms": row["wall_ms"] / count,
+                "p95_ms": _percentile(row["recent"], 0.95),
+                "max_ms": row["max_ms"],
+                "total_ms": row["wall_ms"],
+                "queries_avg": row["query_count"] / count,
+                "query_ms_avg": row["query_ms"] / count,
+                "sections_avg": {
+                    name: ms / count for name, ms in sorted(row["sections"].items())
+                },
+                "shapes": [
+                    {"sql": shape, "per_request": n / count, "ms_avg": ms / count}
+                    for shape, (n, ms) in top_shapes[:shapes]
+                ],
+            }
+        )
+    key = {"p95": "p95_ms", "max": "max_ms", "avg": "avg_ms", "total": "total_ms"}.get(
+        order, "p95_ms"
+    )
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    """Մաքրում է բոլոր worker-ների ագրեգատները (ամեն worker իրենը՝ հաջորդ flush-ին)։"""
+    cache.delete_many([_store._stats_key(w) for w in _worker_ids()])
+    cache.set(EPOCH_KEY, uuid.uuid4().hex, None)
+
+
+def recent_dumps(limit=50):
+    """Այս սերվերի PROFILE_DIR-ի վերջին .prof ֆայլերը՝ [(անուն, չափ, mtime)]։"""
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".prof")]
+    except OSError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [(e.name, e.stat().st_size, e.stat().st_mtime) for e in entries[:limit]]
+
+
+def _dump(profiler, endpoint, wall_ms):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", endpoint).strip("-")[:60] or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}-{wall_ms:.0f}ms-{os.getpid()}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    dumps = recent_dumps(limit=10**6)
+    for old_name, _, _ in dumps[MAX_DUMPS:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old_name))
+        except OSError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Պետք է լինի MIDDLEWARE-ի առաջին տարրը, որպեսզի չափի ամբողջ stack-ը։
+    Առանց PROFILING_ENABLED-ի Django-ն այն բաց է թողնում (MiddlewareNotUsed)։
+    """
+
+    _profiler_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        profiler = None
+        # cProfile-ը մեկ պրոցեսում միաժամանակ մեկ հարցում է չափում։
+        if random.random() < SAMPLE_RATE and self._profiler_lock.acquire(blocking=False):
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                self._profiler_lock.release()
+                profiler = None
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_wrapper(metrics)))
+                response = self.get_response(request)
+        finally:
+            wall_ms = (time.perf_counter() - started) * 1000
+            if profiler is not None:
+                profiler.disable()
+                self._profiler_lock.release()
+            _local.metrics = None
+        slow = wall_ms >= SLOW_MS
+        endpoint = endpoint_name(request)
+        if profiler is not None and slow:
+            try:
+                _dump(profiler, endpoint, wall_ms)
+            except OSError as e:
+                print(f"ERROR: Could not write profile for {endpoint}: {e}")
+        _store.add(endpoint, wall_ms, metrics, slow)
+        return response
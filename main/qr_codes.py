@@ -0,0 +1,41 @@
+import hashlib
+from io import BytesIO
+
+from django.core.cache import cache
+from django.urls import reverse
+
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+QR_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def public_profile_url(profile_id, base_url):
+    """Հանրային պրոֆիլի բացարձակ URL-ը, որը կոդավորվում է QR-ի մեջ։"""
+    return base_url.rstrip("/") + reverse("public_profile", args=[profile_id])
+
+
+def qr_etag(profile_url, fmt="png"):
+    """QR-ը դետերմինիստիկ է URL-ի և ձևաչափի համար, ուստի ETag-ը դրանց hash-ն է։"""
+    return hashlib.sha1(f"{fmt}:{profile_url}".encode("utf-8")).hexdigest()
+
+
+def render_qr(profile_url, fmt="png"):
+    import qrcode
+
+    buffer = BytesIO()
+    if fmt == "svg":
+        from qrcode.image.svg import SvgPathImage
+
+        qrcode.make(profile_url, image_factory=SvgPathImage).save(buffer)
+    else:
+        qrcode.make(profile_url).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def get_qr(profile_url, fmt="png"):
+    """Վերադարձնում է QR-ի bytes-երը՝ server-side cache-ից կամ նոր գեներացնելով։"""
+    key = f"qr:{qr_etag(profile_url, fmt)}"
+    data = cache.get(key)
+    if data is None:
+        data = render_qr(profile_url, fmt)
+        cache.set(key, data, QR_CACHE_TIMEOUT)
+    return data
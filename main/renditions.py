@@ -0,0 +1,92 @@
+import math
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+THUMBNAIL_MAX_SIDE = getattr(settings, "FACE_THUMBNAIL_MAX_SIDE", 160)
+FACE_CROP_SIZE = 160
+FACE_CROP_MARGIN = 0.2
+RENDITION_JPEG_QUALITY = 85
+
+
+def _encode_jpeg(image, name):
+    import cv2
+
+    ok, encoded = cv2.imencode(
+        ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, RENDITION_JPEG_QUALITY]
+    )
+    if not ok:
+        return None
+    return ContentFile(encoded.tobytes(), name=name)
+
+
+def _rendition_name(filename, suffix):
+    stem = os.path.splitext(os.path.basename(filename))[0] or "photo"
+    return f"{stem}_{suffix}.jpg"
+
+
+def make_thumbnail(image, filename, max_side=THUMBNAIL_MAX_SIDE):
+    """Փոքրացված պատճեն ցուցակների և պատկերասրահի համար։"""
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale < 1.0:
+        image = cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    return _encode_jpeg(image, _rendition_name(filename, "thumb"))
+
+
+def align_face(image, detection, size=FACE_CROP_SIZE, margin=FACE_CROP_MARGIN):
+    """
+    Պտտում է նկարը այնպես, որ աչքերը լինեն հորիզոնական գծի վրա, և կտրում
+    size×size քառակուսի դեմքի շուրջ (FaceNet-ի մուտքային չափը)։
+    """
+    import cv2
+
+    x, y, w, h = detection["box"]
+    keypoints = detection.get("keypoints") or {}
+    left_eye, right_eye = keypoints.get("left_eye"), keypoints.get("right_eye")
+    center = (x + w / 2.0, y + h / 2.0)
+    if left_eye and right_eye:
+        angle = math.degrees(
+            math.atan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0])
+        )
+        rotation = cv2.getRotationMatrix2D(center, angle, 1.0)
+        image = cv2.warpAffine(
+            image,
+            rotation,
+            (image.shape[1], image.shape[0]),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_REPLICATE,
+        )
+    half = max(w, h) * (1 + margin) / 2.0
+    left, top = int(max(0, center[0] - half)), int(max(0, center[1] - half))
+    right = int(min(image.shape[1], center[0] + half))
+    bottom = int(min(image.shape[0], center[1] + half))
+    crop = image[top:bottom, left:right]
+    if crop.size == 0:
+        return None
+    return cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def make_face_crop(image, detection, filename):
+    if not detection or "box" not in detection:
+        return None
+    aligned = align_face(image, detection)
+    if aligned is None:
+        return None
+    return _encode_jpeg(aligned, _rendition_name(filename, "face"))
+
+
+def face_image_renditions(image, detection, filename):
+    """Վերադարձնում է UserFaceImage-ի լրացուցիչ դաշտերի արժեքները։"""
+    renditions = {"thumbnail": make_thumbnail(image, filename)}
+    face_crop = make_face_crop(image, detection, filename)
+    if face_crop is not None:
+        renditions["face_crop"] = face_crop
+    return renditions
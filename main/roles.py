@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+
+ROLES_CACHE_KEY = "user_roles:{user_id}"
+ROLES_CACHE_TIMEOUT = 60 * 60 if getattr(settings, "SHARED_CACHE", False) else 60
+
+
+def get_roles(user):
+    """
+    Վերադարձնում է {"patient": bool, "doctor": bool, "facility": str}՝ առանց hasattr-ով
+    երկու առանձին հարցումների (facility-ն բժշկի աշխատավայրն է)։ Արդյունքը պահվում է
+    օգտատիրոջ օբյեկտի վրա (մեկ հարցման ընթացքում) և cache-ում (հարցումների միջև)։
+    """
+    if not user.is_authenticated:
+        return {"patient": False, "doctor": False, "facility": ""}
+    roles = getattr(user, "_arvion_roles", None)
+    if roles is None:
+        key = ROLES_CACHE_KEY.format(user_id=user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            from .models import DoctorProfile, PatientProfile
+
+            workplaces = list(
+                DoctorProfile.objects.filter(user_id=user.pk).values_list(
+                    "workplace", flat=True
+                )
+            )
+            roles = {
+                "patient": PatientProfile.objects.filter(user_id=user.pk).exists(),
+                "doctor": bool(workplaces),
+                "facility": (workplaces[0] or "") if workplaces else "",
+            }
+            cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+        user._arvion_roles = roles
+    return roles
+
+
+def is_patient(user):
+    return get_roles(user)["patient"]
+
+
+def is_doctor(user):
+    return get_roles(user)["doctor"]
+
+
+def facility(user):
+    """Բժշկի աշխատավայրը (դեմքի ինդեքսի partition-ի համար) կամ դատարկ տող։"""
+    return get_roles(user)["facility"]
+
+
+def invalidate_roles(user_id):
+    cache.delete(ROLES_CACHE_KEY.format(user_id=user_id))
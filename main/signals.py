@@ -0,0 +1,128 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import auth_backends, emergency_card, hospital_index, roles
+from .models import (
+    Allergy,
+    BloodGroup,
+    Condition,
+    CustomUser,
+    DoctorProfile,
+    Gender,
+    Hospital,
+    Medication,
+    PatientCondition,
+    PatientMedication,
+    PatientProfile,
+    PatientSurgery,
+    Surgery,
+)
+
+
+def _refresh_emergency_card(user_id):
+    """Ջնջում է հին քարտը անմիջապես և վերակառուցում այն commit-ից հետո։"""
+    emergency_card.invalidate_card(user_id)
+    transaction.on_commit(partial(emergency_card.warm_card, user_id))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=PatientProfile)
+def user_or_patient_changed(sender, instance, **kwargs):
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    _refresh_emergency_card(user_id)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_cache_changed(sender, instance, **kwargs):
+    auth_backends.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted(sender, instance, **kwargs):
+    # Ջնջված օգտատիրոջ QR-ն ու պրոֆիլը պետք է դառնան 404։
+    emergency_card.forget_profile(instance.public_profile_id)
+
+
+@receiver([post_save, post_delete], sender=PatientProfile)
+@receiver([post_save, post_delete], sender=DoctorProfile)
+def role_changed(sender, instance, **kwargs):
+    roles.invalidate_roles(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Hospital)
+@receiver([post_save, post_delete], sender=DoctorProfile)
+def hospital_index_changed(sender, instance, **kwargs):
+    # Բժշկի աշխատավայրը/մասնագիտությունը մասնակցում է մասնագիտությամբ ֆիլտրմանը։
+    transaction.on_commit(hospital_index.invalidate)
+
+
+@receiver([post_save, post_delete], sender=PatientCondition)
+@receiver([post_save, post_delete], sender=PatientMedication)
+@receiver([post_save, post_delete], sender=PatientSurgery)
+def patient_term_changed(sender, instance, **kwargs):
+    _refresh_emergency_card(instance.patient_id)
+
+
+@receiver(m2m_changed, sender=PatientProfile.allergies.through)
+def patient_allergies_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    user_ids = (pk_set or ()) if reverse else [instance.pk]
+    for user_id in user_ids:
+        _refresh_emergency_card(user_id)
+
+
+# Տերմինի անվան փոփոխությունը/ջնջումը ազդում է բոլոր այն քարտերի վրա, որոնք այն պարունակում են։
+# Քարտերը ջնջվում են անմիջապես և կրկին commit-ից հետո (միջանկյալ ընթերցումը կարող էր
+# պահել հին անունը)՝ առանց warm_card-ի, քանի որ դրանք կարող են շատ լինել։
+_TERM_PATIENTS = {
+    Allergy: lambda term: PatientProfile.objects.filter(allergies=term).values_list(
+        "pk", flat=True
+    ),
+    BloodGroup: lambda term: PatientProfile.objects.filter(
+        blood_group=term
+    ).values_list("pk", flat=True),
+    Condition: lambda term: PatientCondition.objects.filter(
+        condition=term
+    ).values_list("patient_id", flat=True),
+    Medication: lambda term: PatientMedication.objects.filter(
+        medication=term
+    ).values_list("patient_id", flat=True),
+    Surgery: lambda term: PatientSurgery.objects.filter(surgery=term).values_list(
+        "patient_id", flat=True
+    ),
+    Gender: lambda term: CustomUser.objects.filter(gender=term).values_list(
+        "pk", flat=True
+    ),
+}
+
+
+def _invalidate_term_cards(sender, term):
+    user_ids = set(_TERM_PATIENTS[sender](term))
+    emergency_card.invalidate_cards(user_ids)
+    transaction.on_commit(partial(emergency_card.invalidate_cards, user_ids))
+
+
+@receiver(post_save, sender=Allergy)
+@receiver(post_save, sender=BloodGroup)
+@receiver(post_save, sender=Condition)
+@receiver(post_save, sender=Medication)
+@receiver(post_save, sender=Surgery)
+@receiver(post_save, sender=Gender)
+def medical_term_saved(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate_term_cards(sender, instance)
+
+
+@receiver(pre_delete, sender=Allergy)
+@receiver(pre_delete, sender=BloodGroup)
+@receiver(pre_delete, sender=Condition)
+@receiver(pre_delete, sender=Medication)
+@receiver(pre_delete, sender=Surgery)
+@receiver(pre_delete, sender=Gender)
+def medical_term_deleted(sender, instance, **kwargs):
+    # pre_delete՝ որովհետև ջնջումից հետո կապերն (M2M, SET_NULL) արդեն չկան։
+    _invalidate_term_cards(sender, instance)
@@ -1,3 +1,1116 @@
-from django.test import TestCase
-
-# Create your tests here.
+import math
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    audit,
+    emergency_card,
+    face_dedup,
+    face_index,
+    face_quality,
+    face_recognition_service,
+    hospital_index,
+    image_intake,
+    inference_gate,
+    jobs,
+    live_recognition,
+    login_throttle,
+    profiling,
+    roles,
+)
+from .cached_storage import CachedMediaStorage
+from .face_index import embedding_to_bytes
+from .management.commands import generate_renditions
+from .models import (
+    AccessEvent,
+    Allergy,
+    Condition,
+    CustomUser,
+    DoctorProfile,
+    Hospital,
+    Job,
+    PatientCondition,
+    PatientProfile,
+    PatientSurgery,
+    Surgery,
+    UserFaceImage,
+)
+
+
+class ImageIntakeTests(SimpleTestCase):
+    def png(self, width, height):
+        return cv2.imencode(".png", np.zeros((height, width, 3), np.uint8))[1].tobytes()
+
+    def test_read_chunks_enforces_limit(self):
+        chunks = [b"a" * 10, b"b" * 10]
+        buffer = image_intake.read_chunks(iter(chunks), max_bytes=20)
+        self.assertEqual(buffer, b"a" * 10 + b"b" * 10)
+        with self.assertRaises(image_intake.ImageIntakeError):
+            image_intake.read_chunks(iter(chunks), max_bytes=15)
+        with self.assertRaises(image_intake.ImageIntakeError):
+            image_intake.read_chunks(iter(chunks), max_bytes=15, size_hint=20)
+
+    def test_read_stored_skips_upload_limit(self):
+        size = image_intake.MAX_UPLOAD_BYTES + 1
+        with self.assertRaises(image_intake.ImageIntakeError):
+            image_intake.read_upload(ContentFile(b"a" * size))
+        self.assertEqual(len(image_intake.read_stored(ContentFile(b"a" * size))), size)
+
+    def test_check_dimensions(self):
+        self.assertEqual(image_intake.check_dimensions(self.png(40, 30)), (40, 30))
+        with self.assertRaises(image_intake.ImageIntakeError):
+            image_intake.check_dimensions(self.png(40, 30), max_dimension=35)
+        with self.assertRaises(image_intake.ImageIntakeError):
+            image_intake.check_dimensions(b"not an image")
+
+    def test_decompression_bomb_is_rejected(self):
+        from PIL import Image
+
+        # Pillow-ը զգուշացնում է MAX_IMAGE_PIXELS-ից մեծ նկարների համար և սխալ է տալիս
+        # կրկնակի մեծերի համար․ երկու դեպքն էլ պետք է մերժվեն։
+        for limit in (1000, 500):
+            with mock.patch.object(Image, "MAX_IMAGE_PIXELS", limit):
+                with self.assertRaises(image_intake.ImageIntakeError):
+                    image_intake.check_dimensions(self.png(40, 30))
+
+
+
+class GenerateRenditionsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = CustomUser.objects.create_user("p@example.com", "p@example.com")
+
+    def face_image(self, name, **fields):
+        thumbnail = default_storage.save(f"{name}_thumb.jpg", ContentFile(b"old"))
+        return UserFaceImage.objects.create(
+            user=self.user, image=f"{name}.jpg", thumbnail=thumbnail, **fields
+        )
+
+    def run_command(self, *args):
+        image = np.zeros((40, 40, 3), np.uint8)
+        with mock.patch.object(
+            generate_renditions.Command, "load", return_value=image
+        ), mock.patch.object(
+            generate_renditions, "extract_face", return_value=None
+        ) as extract:
+            call_command("generate_renditions", *args, stdout=StringIO())
+        return extract.call_count
+
+    def test_records_missing_face_and_skips_it_later(self):
+        no_face = self.face_image("a", face_detected=False)
+        pending = self.face_image("b")
+        self.assertEqual(self.run_command(), 1)
+        pending.refresh_from_db()
+        self.assertIs(pending.face_detected, False)
+        self.assertTrue(default_storage.exists(pending.thumbnail.name))
+        self.assertFalse(default_storage.exists("b_thumb.jpg"))
+        self.assertEqual(self.run_command(), 0)
+        # --force-ը վերամշակում է բոլորը և ջնջում հին մանրապատկերները։
+        self.assertEqual(self.run_command("--force"), 2)
+        no_face.refresh_from_db()
+        self.assertNotEqual(no_face.thumbnail.name, "a_thumb.jpg")
+        self.assertFalse(default_storage.exists("a_thumb.jpg"))
+
+
+class RenderQrCodesTests(TestCase):
+    def test_workplace_selects_patients_seen_by_its_doctors(self):
+        doctor = CustomUser.objects.create_user("doctor", password="x")
+        DoctorProfile.objects.create(user=doctor, workplace="Erebuni")
+        seen, other = (
+            CustomUser.objects.create_user(name, password="x")
+            for name in ("seen", "other")
+        )
+        for patient in (seen, other):
+            PatientProfile.objects.create(user=patient)
+        AccessEvent.objects.create(
+            patient=seen,
+            actor=doctor,
+            action=AccessEvent.DETAILS,
+            accessed_at=timezone.now(),
+        )
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output, True)
+        call_command(
+            "render_qr_codes",
+            "--base-url=https://arvion.example.org",
+            f"--output={output}",
+            "--workplace= erebuni",
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            os.listdir(output), [f"{seen.pk}_{seen.public_profile_id}.png"]
+        )
+
+
+class EmergencyCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("patient", password="x")
+        self.patient = PatientProfile.objects.create(user=self.user)
+        self.condition = Condition.objects.create(name="Ասթմա")
+        PatientCondition.objects.create(patient=self.patient, condition=self.condition)
+        self.profile_id = self.user.public_profile_id
+
+    def card(self):
+        return emergency_card.get_card(self.profile_id)["card"]
+
+    def test_cache_hit_does_not_query(self):
+        entry = emergency_card.get_card(self.profile_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(emergency_card.get_card(self.profile_id), entry)
+
+    def test_patient_terms_invalidate_card(self):
+        self.assertEqual(self.card()["conditions"], ["Ասթմա"])
+        allergy = Allergy.objects.create(name="Պենիցիլին")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.allergies.add(allergy)
+        self.assertEqual(self.card()["allergies"], ["Պենիցիլին"])
+        with self.captureOnCommitCallbacks(execute=True):
+            PatientCondition.objects.filter(patient=self.patient).delete()
+        self.assertEqual(self.card()["conditions"], [])
+
+    def test_term_rename_and_delete_invalidate_card(self):
+        allergy = Allergy.objects.create(name="Պենիցիլին")
+        self.patient.allergies.add(allergy)
+        self.card()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.condition.name = "Բրոնխիալ ասթմա"
+            self.condition.save()
+        self.assertEqual(self.card()["conditions"], ["Բրոնխիալ ասթմա"])
+        with self.captureOnCommitCallbacks(execute=True):
+            allergy.delete()
+        self.assertEqual(self.card()["allergies"], [])
+
+    def test_page_follows_card_version(self):
+        entry = emergency_card.get_card(self.profile_id)
+        emergency_card.set_page(entry, "<html>")
+        self.assertEqual(emergency_card.get_page(entry), "<html>")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.emergency_contact_phone = "+37491000000"
+            self.user.save()
+        current = emergency_card.get_card(self.profile_id)
+        self.assertIsNone(emergency_card.get_page(current))
+        # Հին etag-ով էջը չի տրվում նույնիսկ եթե ջնջումը բաց է թողնվել։
+        emergency_card.set_page(entry, "<old>")
+        self.assertIsNone(emergency_card.get_page(current))
+
+    def test_page_etag_covers_fields_outside_the_card(self):
+        entry = emergency_card.get_card(self.profile_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.weight_kg = 70
+            self.patient.save()
+        current = emergency_card.get_card(self.profile_id)
+        self.assertEqual(current["etag"], entry["etag"])
+        self.assertNotEqual(current["page_etag"], entry["page_etag"])
+        surgery = Surgery.objects.create(name="Ապենդէկտոմիա")
+        with self.captureOnCommitCallbacks(execute=True):
+            PatientSurgery.objects.create(patient=self.patient, surgery=surgery)
+        with_surgery = emergency_card.get_card(self.profile_id)
+        self.assertNotEqual(with_surgery["page_etag"], current["page_etag"])
+        with self.captureOnCommitCallbacks(execute=True):
+            surgery.name = "Լապարոսկոպիկ ապենդէկտոմիա"
+            surgery.save()
+        after_rename = emergency_card.get_card(self.profile_id)
+        self.assertNotEqual(after_rename["page_etag"], with_surgery["page_etag"])
+
+    def test_deleted_user_profile_returns_404(self):
+        self.card()
+        self.user.delete()
+        self.assertIsNone(emergency_card.get_card(self.profile_id))
+        for url in (
+            reverse("qr_code_image", args=[self.profile_id, "svg"]),
+            reverse("public_profile_card", args=[self.profile_id]),
+        ):
+            self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+
+
+calls = []
+
+
+@jobs.job_handler("test_record")
+def record_job(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_deduplicates_pending_jobs(self):
+        first = jobs.enqueue("test_record", {"value": 1}, priority=100, dedup_key="k")
+        again = jobs.enqueue("test_record", {"value": 2}, priority=200, dedup_key="k")
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).priority, 100)
+        # Ավելի բարձր առաջնահերթությամբ կրկնությունը բարձրացնում է եղածինը։
+        jobs.enqueue("test_record", {"value": 3}, priority=10, dedup_key="k")
+        self.assertEqual(Job.objects.get(pk=first.pk).priority, 10)
+        self.assertEqual(Job.objects.count(), 1)
+        # Երբ առաջադրանքն արդեն կատարվում է, նույն բանալիով նորը կարելի է ավելացնել։
+        self.assertEqual(jobs.claim_next().pk, first.pk)
+        second = jobs.enqueue("test_record", {"value": 4}, dedup_key="k")
+        self.assertNotEqual(second.pk, first.pk)
+
+    def test_claims_by_priority_and_skips_future_jobs(self):
+        low = jobs.enqueue("test_record", {"value": 2}, priority=jobs.PRIORITY_LOW)
+        high = jobs.enqueue("test_record", {"value": 1}, priority=jobs.PRIORITY_HIGH)
+        jobs.enqueue("test_record", {"value": 3}, delay=timedelta(hours=1))
+        first, second = jobs.claim_next(), jobs.claim_next()
+        self.assertEqual((first.pk, second.pk), (high.pk, low.pk))
+        self.assertEqual((first.status, first.attempts), (Job.RUNNING, 1))
+        self.assertIsNone(jobs.claim_next())
+
+    def test_execute_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue("test_record", {"value": 1, "fail": True})
+        for attempt in range(1, job.max_attempts + 1):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = jobs.execute(jobs.claim_next())
+            self.assertEqual(job.attempts, attempt)
+            if attempt < job.max_attempts:
+                self.assertEqual(job.status, Job.PENDING)
+                self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("boom", job.last_error)
+        self.assertEqual(calls, [1] * job.max_attempts)
+
+    def test_execute_success_and_unknown_kind(self):
+        jobs.enqueue("test_record", {"value": 5})
+        job = jobs.execute(jobs.claim_next())
+        self.assertEqual((job.status, calls), (Job.DONE, [5]))
+        self.assertIsNotNone(job.finished_at)
+        jobs.enqueue("no_such_kind")
+        job = jobs.execute(jobs.claim_next())
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn("Unknown job kind", job.last_error)
+
+    def test_stale_running_job_is_requeued(self):
+        job = jobs.enqueue("test_record", {"value": 1}, dedup_key="stale")
+        jobs.claim_next()
+        Job.objects.filter(pk=job.pk).update(
+            started_at=timezone.now() - jobs.STALE_JOB_TIMEOUT - timedelta(minutes=1)
+        )
+        reclaimed = jobs.claim_next()
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+
+    def test_queue_stats(self):
+        for value in range(3):
+            jobs.enqueue("test_record", {"value": value})
+        jobs.enqueue("no_such_kind", priority=jobs.PRIORITY_LOW)
+        jobs.execute(jobs.claim_next())
+        stats = jobs.queue_stats()
+        self.assertEqual(stats["pending"], {"test_record": 2, "no_such_kind": 1})
+        self.assertEqual(stats["latency"]["test_record"]["count"], 1)
+        self.assertEqual(stats["running"], 0)
+
+
+class AddPhotoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = CustomUser.objects.create_user("p@example.com", "p@example.com")
+        PatientProfile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def upload(self, detections):
+        photo = ContentFile(
+            cv2.imencode(".png", np.zeros((40, 40, 3), np.uint8))[1].tobytes(),
+            name="face.png",
+        )
+        with mock.patch.object(
+            face_recognition_service, "detect_faces", return_value=(detections, [])
+        ):
+            response = self.client.post(
+                reverse("add_photo"), {"face_photo": photo}, secure=True
+            )
+        self.assertRedirects(
+            response, reverse("add_photo"), fetch_redirect_response=False
+        )
+
+    def test_photo_without_face_is_not_stored(self):
+        self.upload([])
+        self.assertFalse(UserFaceImage.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_photo_with_face_is_queued_for_embedding(self):
+        self.upload([{"box": [5, 5, 20, 20]}])
+        face_image = UserFaceImage.objects.get(user=self.user)
+        job = Job.objects.get(kind="embed_image")
+        self.assertEqual(job.payload, {"image_id": face_image.pk})
+
+
+class InferenceGateTests(SimpleTestCase):
+    def wait_for(self, gate, waiting):
+        deadline = time.monotonic() + 5
+        while gate.stats()["waiting"] != waiting:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.005)
+
+    def test_search_callers_run_before_waiting_enrollment(self):
+        gate = inference_gate.InferenceGate(slots=1)
+        gate.acquire(inference_gate.PRIORITY_ENROLL, timeout=1)
+        order = []
+
+        def caller(name, priority):
+            with gate.slot(priority, timeout=5):
+                order.append(name)
+
+        threads = []
+        for waiting, (name, priority) in enumerate(
+            [
+                ("enroll", inference_gate.PRIORITY_ENROLL),
+                ("search", inference_gate.PRIORITY_SEARCH),
+            ],
+            start=1,
+        ):
+            threads.append(threading.Thread(target=caller, args=(name, priority)))
+            threads[-1].start()
+            self.wait_for(gate, waiting)
+        gate.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ["search", "enroll"])
+        self.assertEqual(gate.stats(), {"active": 0, "waiting": 0})
+
+    def test_waiting_past_timeout_raises_busy(self):
+        gate = inference_gate.InferenceGate(slots=1)
+        gate.acquire(inference_gate.PRIORITY_SEARCH, timeout=1)
+        with self.assertRaises(inference_gate.InferenceBusy):
+            gate.acquire(inference_gate.PRIORITY_SEARCH, timeout=0.05)
+        self.assertEqual(gate.stats(), {"active": 1, "waiting": 0})
+
+    def test_full_wait_queue_raises_busy_at_once(self):
+        gate = inference_gate.InferenceGate(slots=1, max_waiting=1)
+        gate.acquire(inference_gate.PRIORITY_SEARCH, timeout=1)
+        waiter = threading.Thread(
+            target=gate.acquire, args=(inference_gate.PRIORITY_ENROLL, 0.5)
+        )
+        waiter.start()
+        self.wait_for(gate, 1)
+        started = time.monotonic()
+        with self.assertRaises(inference_gate.InferenceBusy):
+            gate.acquire(inference_gate.PRIORITY_SEARCH, timeout=5)
+        self.assertLess(time.monotonic() - started, 0.5)
+        gate.release()
+        waiter.join(5)
+
+    def test_threads_per_worker_reads_worker_counts_when_called(self):
+        env = {"WEB_CONCURRENCY": "2", "JOB_WORKER_PROCESSES": "2"}
+        with mock.patch.dict(os.environ, env), mock.patch.object(
+            os, "cpu_count", return_value=8
+        ):
+            self.assertEqual(inference_gate.threads_per_worker(), 2)
+            os.environ["JOB_WORKER_PROCESSES"] = "6"
+            self.assertEqual(inference_gate.threads_per_worker(), 1)
+            self.assertEqual(inference_gate.threads_per_worker("3"), 3)
+
+
+class CachedMediaStorageTests(SimpleTestCase):
+    """Read-through քեշ՝ տեղական FileSystemStorage-ը որպես «հեռավոր» backend։"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.remote = FileSystemStorage(location=os.path.join(self.tmp, "remote"))
+        self.storage = CachedMediaStorage(
+            backend=self.remote,
+            cache_dir=os.path.join(self.tmp, "cache"),
+            max_bytes=1000,
+        )
+
+    def read(self, name):
+        with self.storage.open(name) as f:
+            return f.read()
+
+    def test_reads_through_and_serves_from_cache(self):
+        self.remote.save("a.jpg", ContentFile(b"remote bytes"))
+        self.assertIsNone(self.storage.cached_path("a.jpg"))
+        self.assertEqual(self.read("a.jpg"), b"remote bytes")
+        self.assertIsNotNone(self.storage.cached_path("a.jpg"))
+        with mock.patch.object(self.remote, "open", side_effect=AssertionError):
+            self.assertEqual(self.read("a.jpg"), b"remote bytes")
+
+    def test_save_writes_backend_and_cache(self):
+        name = self.storage.save("b.jpg", ContentFile(b"uploaded"))
+        self.assertTrue(self.remote.exists(name))
+        with open(self.storage.cached_path(name), "rb") as f:
+            self.assertEqual(f.read(), b"uploaded")
+
+    def test_corrupt_copy_is_fetched_again(self):
+        name = self.storage.save("c.jpg", ContentFile(b"original"))
+        with open(self.storage.cached_path(name), "wb") as f:
+            f.write(b"corrupt")
+        self.assertIsNone(self.storage.cached_path(name))
+        self.assertEqual(self.read(name), b"original")
+
+    def test_delete_invalidates_cache(self):
+        name = self.storage.save("d.jpg", ContentFile(b"to delete"))
+        self.storage.delete(name)
+        self.assertFalse(self.remote.exists(name))
+        self.assertIsNone(self.storage.cached_path(name))
+
+    def test_evicts_least_recently_used_over_budget(self):
+        names = [
+            self.storage.save(f"e{i}.jpg", ContentFile(bytes([i]) * 300))
+            for i in range(3)
+        ]
+        # Առաջին ֆայլը վերջերս կարդացվել է, ուստի հեռացվում է երկրորդը։
+        for offset, name in enumerate(names):
+            path = self.storage.cached_path(name)
+            os.utime(path, (offset, offset))
+        os.utime(self.storage.cached_path(names[0]))
+        self.storage.save("e3.jpg", ContentFile(b"x" * 300))
+        self.assertIsNotNone(self.storage.cached_path(names[0]))
+        self.assertIsNone(self.storage.cached_path(names[1]))
+        self.assertLessEqual(self.storage._size, 1000)
+        # Մաքրումից հետո անջատված ֆայլը կրկին բերվում է backend-ից։
+        self.assertEqual(self.read(names[1]), bytes([1]) * 300)
+
+    def test_scans_only_when_over_budget(self):
+        self.storage.save("f0.jpg", ContentFile(b"a" * 100))
+        with mock.patch.object(self.storage, "_evict") as evict:
+            self.storage.save("f1.jpg", ContentFile(b"b" * 100))
+            evict.assert_not_called()
+            self.storage.save("f2.jpg", ContentFile(b"c" * 900))
+            evict.assert_called_once()
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            "patient@example.com", "patient@example.com", "correct-password"
+        )
+
+    def login(self, password, ip="10.0.0.1"):
+        return self.client.post(
+            "/api/login/",
+            {"email": "patient@example.com", "password": password},
+            content_type="application/json",
+            secure=True,
+            REMOTE_ADDR=ip,
+        )
+
+    def test_client_ip_uses_trusted_hop(self):
+        request = RequestFactory().get(
+            "/", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4", REMOTE_ADDR="10.0.0.9"
+        )
+        # Ձախ արժեքը հաճախորդինն է և կեղծելի, վստահելի proxy-ն ավելացրել է աջինը։
+        expected = {0: "10.0.0.9", 1: "1.2.3.4", 2: "6.6.6.6", 3: "10.0.0.9"}
+        for trusted, ip in expected.items():
+            self.assertEqual(login_throttle.client_ip(request, trusted), ip)
+
+    def test_blocks_account_after_failures_without_hashing(self):
+        for _ in range(login_throttle.MAX_FAILURES_PER_ACCOUNT):
+            self.assertEqual(self.login("wrong").status_code, 400)
+        with mock.patch("main.views.authenticate") as authenticate:
+            response = self.login("correct-password", ip="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        authenticate.assert_not_called()
+
+    def test_blocks_ip_across_accounts(self):
+        for index in range(login_throttle.MAX_FAILURES_PER_IP):
+            login_throttle.register_failure(f"user{index}@example.com", "10.0.0.3")
+        self.assertTrue(login_throttle.is_blocked("patient@example.com", "10.0.0.3"))
+        self.assertFalse(login_throttle.is_blocked("patient@example.com", "10.0.0.4"))
+
+    def test_success_resets_account_counter(self):
+        for _ in range(login_throttle.MAX_FAILURES_PER_ACCOUNT - 1):
+            self.login("wrong")
+        self.assertEqual(self.login("correct-password").status_code, 200)
+        self.assertEqual(self.login("wrong").status_code, 400)
+
+    def test_rejects_malformed_body(self):
+        for body in ("[]", '{"email": 1, "password": "x"}', "not json"):
+            response = self.client.post(
+                "/api/login/", body, content_type="application/json", secure=True
+            )
+            self.assertEqual(response.status_code, 400)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("p@example.com", "p@example.com")
+        self.patient = PatientProfile.objects.create(user=self.user)
+        self.patient.allergies.add(Allergy.objects.create(name="Պենիցիլին"))
+        PatientCondition.objects.create(
+            patient=self.patient, condition=Condition.objects.create(name="Ասթմա")
+        )
+        self.client.force_login(self.user)
+
+    def test_roles_are_cached_and_dropped_on_profile_change(self):
+        self.assertTrue(roles.is_patient(CustomUser.objects.get(pk=self.user.pk)))
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_patient(user))
+            self.assertFalse(roles.is_doctor(user))
+        DoctorProfile.objects.create(user=self.user, workplace="Erebuni")
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(roles.facility(user), "Erebuni")
+
+    def test_profile_pages_do_not_load_the_patient_profile(self):
+        roles.get_roles(self.user)
+        for name in ("profile", "settings"):
+            with mock.patch(
+                "main.views.render", return_value=HttpResponse()
+            ) as render, CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(name), secure=True)
+            self.assertFalse(
+                [q for q in queries if 'FROM "main_patientprofile" ' in q["sql"]]
+            )
+        context = render.call_args.args[2]
+        self.assertEqual(context["p_allergies_str"], "Պենիցիլին")
+        self.assertEqual(context["p_conditions_str"], "Ասթմա")
+
+
+class HospitalIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        hospital_index.invalidate()
+
+    def hospitals(self, count, seed=0):
+        rng = random.Random(seed)
+        return [
+            {
+                "id": index,
+                "name": f"Hospital {index}",
+                "latitude": rng.uniform(-89, 89),
+                "longitude": rng.uniform(-180, 180),
+                "specialties": ["cardiology"] if index % 3 == 0 else [],
+            }
+            for index in range(count)
+        ]
+
+    def brute_force(self, hospitals, lat, lon, k, specialty=""):
+        def distance(hospital):
+            return hospital_index.haversine_km(
+                lat, lon, hospital["latitude"], hospital["longitude"]
+            )
+
+        matching = [
+            h for h in hospitals if not specialty or specialty in h["specialties"]
+        ]
+        return sorted(matching, key=distance)[:k]
+
+    def test_nearest_matches_brute_force(self):
+        hospitals = self.hospitals(300)
+        index = hospital_index.HospitalIndex(hospitals, cell_degrees=5)
+        rng = random.Random(1)
+        # Ներառում է բևեռների մոտ և ամսաթվի գծի երկու կողմերում գտնվող կետեր։
+        queries = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(50)]
+        queries += [(89.9, 0.0), (-89.9, 0.0), (0.0, 179.99), (0.0, -179.99)]
+        for lat, lon in queries:
+            for specialty in ("", "cardiology"):
+                result = index.nearest(lat, lon, 5, specialty)
+                expected = self.brute_force(hospitals, lat, lon, 5, specialty)
+                self.assertEqual(
+                    [h["id"] for _, h in result], [h["id"] for h in expected]
+                )
+                distances = [distance for distance, _ in result]
+                self.assertEqual(distances, sorted(distances))
+
+    def test_returns_all_when_fewer_than_k(self):
+        index = hospital_index.HospitalIndex(self.hospitals(3), cell_degrees=0.1)
+        self.assertEqual(len(index.nearest(40.0, 44.5, 10)), 3)
+        self.assertEqual(hospital_index.HospitalIndex([]).nearest(40.0, 44.5, 5), [])
+
+    def test_haversine(self):
+        self.assertAlmostEqual(
+            hospital_index.haversine_km(0, 0, 0, 1), hospital_index.KM_PER_DEGREE, 3
+        )
+        self.assertAlmostEqual(hospital_index.haversine_km(10, 20, 10, 20), 0.0)
+
+    def test_index_includes_doctor_specialties_and_rebuilds_on_change(self):
+        Hospital.objects.create(name="Erebuni", latitude=40.12, longitude=44.53)
+        Hospital.objects.create(name="Astghik", latitude=40.20, longitude=44.49)
+        nearest = hospital_index.nearest_hospitals
+        self.assertEqual(nearest(40.12, 44.53, 5, "Neurology"), [])
+        doctor = CustomUser.objects.create_user("doc@example.com", "doc@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            DoctorProfile.objects.create(
+                user=doctor, workplace=" erebuni ", specialty="Neurology"
+            )
+        result = nearest(40.2, 44.49, 5, "neurology")
+        self.assertEqual([h["name"] for h in result], ["Erebuni"])
+        self.assertEqual(result[0]["specialties"], ["neurology"])
+
+
+class LiveRecognitionTests(SimpleTestCase):
+    """process_frame՝ stub detector-ով և embedder-ով (առանց TensorFlow-ի)։"""
+
+    def setUp(self):
+        self.state = {"frame": 0, "next_track": 0, "embeddings": 0, "tracks": []}
+        self.embedded = []
+        patches = [
+            mock.patch.object(
+                face_recognition_service, "detect_faces", side_effect=self.detect
+            ),
+            mock.patch.object(
+                face_recognition_service, "embed_crops", side_effect=self.embed
+            ),
+            mock.patch.object(
+                face_recognition_service,
+                "classify_embedding",
+                side_effect=lambda embedding, facility: (embedding, "ok"),
+            ),
+            mock.patch.object(face_quality, "assess", return_value={"score": 0.9}),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def detect(self, image, priority):
+        # «Կադրը» box-երի ցուցակ է, իսկ crop-ը՝ պացիենտի id-ն, որը stub embedder-ը վերադարձնում է։
+        return [{"box": box} for box, _ in image], [user_id for _, user_id in image]
+
+    def embed(self, crops, priority):
+        self.embedded.append(len(crops))
+        return list(crops)
+
+    def run_frames(self, frames):
+        for frame in frames:
+            live_recognition.process_frame(self.state, frame)
+        return live_recognition.summarize(self.state, self.embedded[-1])
+
+    def test_iou(self):
+        self.assertEqual(live_recognition._iou([0, 0, 10, 10], [0, 0, 10, 10]), 1.0)
+        self.assertEqual(live_recognition._iou([0, 0, 10, 10], [20, 20, 5, 5]), 0.0)
+        self.assertAlmostEqual(
+            live_recognition._iou([0, 0, 10, 10], [5, 0, 10, 10]), 50 / 150
+        )
+
+    def test_face_that_stays_is_not_embedded_every_frame(self):
+        frames = [[([100 + i, 100, 80, 80], 7)] for i in range(8)]
+        summary = self.run_frames(frames)
+        self.assertEqual(summary["status"], "identified")
+        self.assertEqual(summary["user_id"], 7)
+        self.assertEqual(len(self.state["tracks"]), 1)
+        # Նոր track, ապա REEMBED_EVERY կադր անց երկրորդ համընկնումը, որից հետո՝ ոչինչ։
+        self.assertEqual(self.embedded, [1, 0, 0, 1, 0, 0, 0, 0])
+
+    def test_detections_are_matched_to_tracks_by_iou(self):
+        self.run_frames([[([0, 0, 50, 50], 1), ([200, 0, 50, 50], 2)]])
+        ids = {tuple(t["box"]): t["id"] for t in self.state["tracks"]}
+        summary = self.run_frames([[([205, 2, 50, 50], 2), ([3, 1, 50, 50], 1)]])
+        self.assertEqual(
+            {tuple(t["box"]): t["id"] for t in summary["tracks"]},
+            {
+                (205, 2, 50, 50): ids[(200, 0, 50, 50)],
+                (3, 1, 50, 50): ids[(0, 0, 50, 50)],
+            },
+        )
+        self.assertEqual(self.state["next_track"], 2)
+
+    def test_missing_track_expires(self):
+        self.run_frames([[([0, 0, 50, 50], 1)]])
+        self.run_frames([[]] * live_recognition.TRACK_MAX_MISSED)
+        self.assertEqual(len(self.state["tracks"]), 1)
+        summary = self.run_frames([[]])
+        self.assertEqual((summary["status"], self.state["tracks"]), ("no_face", []))
+        # Վերադարձած դեմքը նոր track է և նորից embedding է ստանում։
+        self.run_frames([[([0, 0, 50, 50], 1)]])
+        self.assertEqual(self.state["tracks"][0]["id"], 2)
+        self.assertEqual(self.embedded[-1], 1)
+
+
+class FaceQualityTests(SimpleTestCase):
+    BOX = [20, 20, 120, 120]
+    FRONTAL = {
+        "left_eye": (60, 65),
+        "right_eye": (100, 65),
+        "nose": (80, 87),
+        "mouth_left": (65, 105),
+        "mouth_right": (95, 105),
+    }
+
+    def sharp_image(self):
+        # Շախմատային նախշ՝ միջին պայծառությամբ և առանց «այրված» պիքսելների։
+        tiles = (np.indices((160, 160)) // 8).sum(axis=0) % 2
+        gray = np.where(tiles, 156, 100).astype(np.uint8)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    def blurred_image(self):
+        return cv2.GaussianBlur(self.sharp_image(), (31, 31), 12)
+
+    def gray_face(self, image):
+        x, y, w, h = self.BOX
+        return cv2.cvtColor(image[y : y + h, x : x + w], cv2.COLOR_BGR2GRAY)
+
+    def test_sharpness_score(self):
+        sharp, blurred = self.sharp_image(), self.blurred_image()
+        self.assertEqual(face_quality.sharpness_score(self.gray_face(sharp)), 1.0)
+        self.assertEqual(face_quality.sharpness_score(self.gray_face(blurred)), 0.0)
+
+    def test_pose_score(self):
+        self.assertAlmostEqual(face_quality.pose_score(self.FRONTAL), 1.0)
+        turned = {**self.FRONTAL, "nose": (100, 87)}
+        self.assertEqual(face_quality.pose_score(turned), 0.0)
+        tilted = {**self.FRONTAL, "nose": (80, 80)}
+        self.assertGreater(face_quality.pose_score(tilted), 0.0)
+        self.assertLess(face_quality.pose_score(tilted), 1.0)
+        # Առանց կետերի pose-ը չի գնահատվում։
+        self.assertEqual(face_quality.pose_score(None), 1.0)
+
+    def test_score_is_geometric_mean_and_zeroed_by_any_part(self):
+        detection = {"box": self.BOX, "keypoints": self.FRONTAL}
+        sharp = face_quality.assess(self.sharp_image(), detection)
+        parts = [sharp[name] for name in ("size", "sharpness", "pose", "exposure")]
+        self.assertAlmostEqual(sharp["score"], math.prod(parts) ** 0.25)
+        self.assertGreater(sharp["score"], face_quality.MIN_ENROLL_QUALITY)
+        blurred = face_quality.assess(self.blurred_image(), detection)
+        self.assertEqual(blurred["score"], 0.0)
+        small = {"box": [20, 20, 30, 30], "keypoints": self.FRONTAL}
+        self.assertEqual(face_quality.assess(self.sharp_image(), small)["score"], 0.0)
+
+    def test_face_below_threshold_is_not_embedded(self):
+        detection = {"box": self.BOX, "keypoints": self.FRONTAL}
+        embedder = mock.Mock()
+        embedder.crop.return_value = ([detection], ["crop"])
+        embedder.embeddings.return_value = [np.ones(4)]
+        with mock.patch.object(
+            face_recognition_service, "_get_embedder", return_value=embedder
+        ):
+            blurred = face_recognition_service.extract_face(
+                self.blurred_image(), min_quality=face_quality.MIN_ENROLL_QUALITY
+            )
+            embedder.embeddings.assert_not_called()
+            sharp = face_recognition_service.extract_face(
+                self.sharp_image(), min_quality=face_quality.MIN_ENROLL_QUALITY
+            )
+        self.assertIsNone(blurred["embedding"])
+        self.assertEqual(blurred["quality"]["score"], 0.0)
+        self.assertEqual(list(sharp["embedding"]), [1.0] * 4)
+
+
+def access_event(patient, **fields):
+    return AccessEvent(
+        patient=patient,
+        action=AccessEvent.DETAILS,
+        accessed_at=timezone.now(),
+        **fields,
+    )
+
+
+class AuditBufferTests(TransactionTestCase):
+    """Ֆոնային thread-ը գրում է իր կապով, ուստի տվյալները պետք է commit արված լինեն։"""
+
+    def setUp(self):
+        self.patient = CustomUser.objects.create_user("patient")
+
+    def wait_for_rows(self, count):
+        deadline = time.monotonic() + 5
+        while AccessEvent.objects.count() < count:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_flushes_when_batch_is_full(self):
+        buffer = audit.AuditBuffer(batch_size=3, interval=60)
+        for _ in range(3):
+            buffer.add(access_event(self.patient))
+        self.wait_for_rows(3)
+        self.assertEqual(buffer.pending(), 0)
+
+    def test_flushes_after_interval(self):
+        buffer = audit.AuditBuffer(batch_size=100, interval=0.05)
+        buffer.add(access_event(self.patient))
+        self.wait_for_rows(1)
+        self.assertEqual(buffer.pending(), 0)
+
+
+class AccessLogTests(TestCase):
+    def setUp(self):
+        self.patient = CustomUser.objects.create_user("patient")
+        PatientProfile.objects.create(user=self.patient)
+        self.doctor = CustomUser.objects.create_user("doctor")
+        DoctorProfile.objects.create(user=self.doctor, workplace="Erebuni")
+        self.staff = CustomUser.objects.create_user("staff", is_staff=True)
+
+    def test_flush_writes_in_batches_and_keeps_events_on_error(self):
+        buffer = audit.AuditBuffer(batch_size=2, interval=60)
+        buffer._events.extend(access_event(self.patient) for _ in range(5))
+        with mock.patch.object(
+            AccessEvent.objects, "bulk_create", side_effect=DatabaseError("down")
+        ), mock.patch("builtins.print"):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending(), 5)
+        with self.assertNumQueries(3):
+            self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(AccessEvent.objects.count(), 5)
+
+    def get_log(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("access_log"), params, secure=True)
+
+    def test_who_may_read_the_access_log(self):
+        other = CustomUser.objects.create_user("other")
+        PatientProfile.objects.create(user=other)
+        AccessEvent.objects.create(
+            patient=self.patient,
+            actor=self.doctor,
+            action=AccessEvent.DETAILS,
+            ip_address="10.0.0.7",
+            accessed_at=timezone.now(),
+        )
+        events = self.get_log(self.patient).json()["events"]
+        self.assertEqual([e["actor_id"] for e in events], [self.doctor.pk])
+        self.assertNotIn("ip_address", events[0])
+        # Պացիենտը չի կարող կարդալ ուրիշի պատմությունը, իսկ բժիշկը՝ որևէ մեկինը։
+        response = self.get_log(other, patient=self.patient.pk)
+        self.assertEqual(response.json()["events"], [])
+        self.assertEqual(self.get_log(self.doctor).status_code, 403)
+        events = self.get_log(self.staff, patient=self.patient.pk).json()["events"]
+        self.assertEqual(events[0]["ip_address"], "10.0.0.7")
+
+
+class FacePartitionTests(TestCase):
+    """Հաստատությունների partition-ները՝ փոքր սինթետիկ embedding-ներով։"""
+
+    PARTITION_MATCH = "Ճանաչումը հաջողվեց (հաստատության ինդեքս)։"
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        self.partition_dir = os.path.join(self.dir, "partitions")
+        users = {}
+        for name, workplace in (
+            ("erebuni", "Erebuni"),
+            ("astghik", "Astghik"),
+            ("p1", None),
+            ("p2", None),
+            ("p3", None),
+        ):
+            users[name] = CustomUser.objects.create_user(name)
+            if workplace:
+                DoctorProfile.objects.create(
+                    user=users[name], license_number=name, workplace=workplace
+                )
+        self.users = users
+        self.visit("erebuni", "p1")
+        self.visit("astghik", "p2")
+        # Յուրաքանչյուր պացիենտ՝ իր առանցքի միավոր վեկտորը (միմյանցից √2 հեռու)։
+        axes = np.eye(8, dtype=np.float32)
+        self.vectors = {name: axes[i] for i, name in enumerate(("p1", "p2", "p3"))}
+
+    def visit(self, doctor, patient):
+        AccessEvent.objects.create(
+            patient=self.users[patient],
+            actor=self.users[doctor],
+            action=AccessEvent.DETAILS,
+            accessed_at=timezone.now(),
+        )
+
+    def stored(self):
+        names = sorted(self.vectors)
+        return (
+            [self.vectors[name] for name in names],
+            [self.users[name].pk for name in names],
+            [1.0] * len(names),
+        )
+
+    def rebuild(self):
+        return face_index.rebuild_partitions(self.stored(), self.partition_dir)
+
+    def partition_users(self, facility):
+        with open(face_index.partition_path(facility, self.partition_dir), "rb") as f:
+            return face_index.model_user_ids(pickle.load(f))
+
+    def test_builds_one_partition_per_facility(self):
+        self.assertEqual(self.rebuild(), {"built": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.partition_users("Erebuni"), {self.users["p1"].pk})
+        self.assertEqual(self.partition_users("astghik "), {self.users["p2"].pk})
+
+    def test_rebuilds_only_partitions_whose_members_changed(self):
+        self.rebuild()
+        self.assertEqual(self.rebuild(), {"built": 0, "unchanged": 2, "removed": 0})
+        self.vectors["p1"] = self.vectors["p1"] * 0.5
+        self.assertEqual(self.rebuild(), {"built": 1, "unchanged": 1, "removed": 0})
+        AccessEvent.objects.filter(actor=self.users["astghik"]).delete()
+        self.assertEqual(self.rebuild(), {"built": 0, "unchanged": 1, "removed": 1})
+
+    def test_classify_uses_partition_then_falls_back_to_global_model(self):
+        model_path = os.path.join(self.dir, "model.pkl")
+        embeddings, user_ids, _ = self.stored()
+        face_index.save_model(face_index.train_knn(embeddings, user_ids), model_path)
+        self.rebuild()
+        service = face_recognition_service
+        with mock.patch.multiple(
+            service,
+            _model_path=model_path,
+            _model_data=None,
+            _model_mtime=None,
+            _partition_dir=self.partition_dir,
+            _partitions={},
+        ):
+            result = service.classify_embedding(self.vectors["p1"], "Erebuni")
+            self.assertEqual(result, (self.users["p1"].pk, self.PARTITION_MATCH))
+            # p2-ը Erebuni-ի partition-ում չէ, ուստի գտնվում է ընդհանուր մոդելում։
+            user_id, message = service.classify_embedding(self.vectors["p2"], "Erebuni")
+            self.assertEqual(user_id, self.users["p2"].pk)
+            self.assertNotEqual(message, self.PARTITION_MATCH)
+            # Առանց partition-ի հաստատություն և անհայտ դեմք։
+            user_id, _ = service.classify_embedding(self.vectors["p3"], "Nairi")
+            self.assertEqual(user_id, self.users["p3"].pk)
+            stranger = np.full(8, 0.5, dtype=np.float32)
+            self.assertIsNone(service.classify_embedding(stranger, "Erebuni")[0])
+
+            # Վերամարզված partition-ը փոխարինվում է առանց պրոցեսի վերագործարկման։
+            self.visit("erebuni", "p3")
+            self.rebuild()
+            path = face_index.partition_path("Erebuni", self.partition_dir)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            result = service.classify_embedding(self.vectors["p3"], "Erebuni")
+            self.assertEqual(result, (self.users["p3"].pk, self.PARTITION_MATCH))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.patient = CustomUser.objects.create_user("p@example.com")
+        access_event(self.patient, actor=self.patient).save()
+        self.staff = CustomUser.objects.create_user("admin@example.com", is_staff=True)
+        self.store = profiling.ProfileStore()
+        patcher = mock.patch.object(profiling, "_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def staff_client(self):
+        # Նոր client, որպեսզի middleware-ների շղթան կառուցվի ընթացիկ settings-ով։
+        client = self.client_class()
+        client.force_login(self.staff)
+        return client
+
+    def get_access_log(self, client):
+        url = reverse("access_log") + f"?patient={self.patient.pk}"
+        return client.get(url, secure=True)
+
+    def test_disabled_by_default(self):
+        self.assertFalse(profiling.PROFILING_ENABLED)
+        self.assertNotIn("main.profiling.ProfilingMiddleware", settings.MIDDLEWARE)
+        with self.assertRaises(MiddlewareNotUsed):
+            profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        self.get_access_log(self.staff_client())
+        self.assertEqual(self.store._stats, {})
+
+    def test_records_queries_without_changing_the_response(self):
+        expected = self.get_access_log(self.staff_client())
+        with mock.patch.multiple(
+            profiling, PROFILING_ENABLED=True, SAMPLE_RATE=0
+        ), override_settings(
+            MIDDLEWARE=["main.profiling.ProfilingMiddleware", *settings.MIDDLEWARE]
+        ):
+            client = self.staff_client()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get_access_log(client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        [(endpoint, row)] = self.store._stats.items()
+        self.assertEqual(endpoint, "GET /profile/access-log/")
+        self.assertEqual(row["count"], 1)
+        self.assertEqual(row["query_count"], len(queries))
+        self.assertGreater(row["query_ms"], 0)
+        self.assertLessEqual(row["query_ms"], row["wall_ms"])
+
+
+class FaceDedupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("p@example.com", "p@example.com")
+
+    def image(self, seed):
+        rng = np.random.default_rng(seed)
+        small = rng.integers(0, 256, size=(12, 12, 3), dtype=np.uint8)
+        return cv2.resize(small, (240, 240), interpolation=cv2.INTER_CUBIC)
+
+    def resaved_hash(self, image):
+        """Նույն նկարը՝ փոքրացված և JPEG-ով վերակոդավորված։"""
+        resized = cv2.resize(image, (180, 180))
+        _, data = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, 70])
+        return face_dedup.perceptual_hash(cv2.imdecode(data, cv2.IMREAD_COLOR))
+
+    def face_image(self, **fields):
+        return UserFaceImage.objects.create(user=self.user, image="x.jpg", **fields)
+
+    def test_hashes(self):
+        digest = face_dedup.content_hash(b"abc")
+        self.assertEqual(digest, face_dedup.content_hash(b"abc"))
+        self.assertNotEqual(digest, face_dedup.content_hash(b"abd"))
+        self.assertEqual(face_dedup.hamming("ff00", "0f01"), 5)
+        image = self.image(1)
+        phash = face_dedup.perceptual_hash(image)
+        self.assertEqual(len(phash), 16)
+        limit = face_dedup.PERCEPTUAL_MAX_DISTANCE
+        self.assertLessEqual(face_dedup.hamming(phash, self.resaved_hash(image)), limit)
+        other = face_dedup.perceptual_hash(self.image(2))
+        self.assertGreater(face_dedup.hamming(phash, other), limit)
+
+    def test_find_duplicate(self):
+        image = self.image(1)
+        phash = face_dedup.perceptual_hash(image)
+        existing = self.face_image(content_hash="a" * 64, perceptual_hash=phash)
+        self.assertEqual(
+            face_dedup.find_duplicate(self.user.pk, "a" * 64, "0" * 16),
+            (existing.pk, face_dedup.DUPLICATE_MESSAGE),
+        )
+        self.assertEqual(
+            face_dedup.find_duplicate(self.user.pk, "b" * 64, self.resaved_hash(image)),
+            (existing.pk, face_dedup.NEAR_DUPLICATE_MESSAGE),
+        )
+        other = face_dedup.perceptual_hash(self.image(2))
+        self.assertIsNone(face_dedup.find_duplicate(self.user.pk, "b" * 64, other))
+        # Այլ օգտատիրոջ նկարները չեն համեմատվում։
+        other_user = CustomUser.objects.create_user("q@example.com", "q@example.com")
+        self.assertIsNone(face_dedup.find_duplicate(other_user.pk, "a" * 64, phash))
+
+    def test_find_embedding_duplicate(self):
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=512).astype(np.float32)
+        original = self.face_image(embedding=embedding_to_bytes(base))
+        collapsed = self.face_image(
+            embedding=embedding_to_bytes(base), duplicate_of=original
+        )
+        new = self.face_image()
+        near = base + rng.normal(scale=0.01, size=512).astype(np.float32)
+        find = face_dedup.find_embedding_duplicate
+        self.assertEqual(find(new, near * 3), original.pk)
+        far = rng.normal(size=512).astype(np.float32)
+        self.assertIsNone(find(new, far))
+        # Նկարը չի համեմատվում ինքն իր հետ, իսկ կրկնօրինակները հիմնական նկար չեն։
+        self.assertIsNone(find(original, base))
+        self.assertNotEqual(find(new, base), collapsed.pk)
@@ -1,30 +1,48 @@
-from django.contrib.auth.views import LogoutView
-from django.urls import path
-
-from . import views
-
-urlpatterns = [
-    path("", views.arvion, name="arvion"),
-    path("about/", views.about_project, name="about_project"),
-    path("how-it-works/", views.how_it_works, name="how_it_works"),
-    path("terms-privacy/", views.terms_privacy, name="terms_privacy"),
-    path("settings/", views.settings_view, name="settings"),
-    path("security/", views.security, name="security"),
-    path("status/", views.status, name="status"),
-    path("register/", views.register_view, name="register"),
-    path("login/", views.login_page_view, name="login"),
-    path("profile/", views.profile_view, name="profile"),
-    path("find-hospital/", views.find_hospital, name="find_hospital"),
-    path(
-        "profile/<uuid:profile_id>/", views.public_profile_view, name="public_profile"
-    ),
-    path("qr-code/", views.qr_code_view, name="qr_code"),
-    path("logout/", views.arvion, name="logout"),
-    path("api/login/", views.login_api_view, name="login_api_view"),
-    path(
-        "search/photo/", views.search_patient_by_photo, name="search_patient_by_photo"
-    ),
-    path("patient/<int:user_id>/", views.patient_details_view, name="patient_details"),
-    path("add-photo/", views.add_photo_view, name="add_photo"),
-    path("delete-photo/<int:image_id>/", views.delete_photo_view, name="delete_photo"),
-]
+from django.contrib.auth.views import LogoutView
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("", views.arvion, name="arvion"),
+    path("about/", views.about_project, name="about_project"),
+    path("how-it-works/", views.how_it_works, name="how_it_works"),
+    path("terms-privacy/", views.terms_privacy, name="terms_privacy"),
+    path("settings/", views.settings_view, name="settings"),
+    path("security/", views.security, name="security"),
+    path("status/", views.status, name="status"),
+    path("register/", views.register_view, name="register"),
+    path("login/", views.login_page_view, name="login"),
+    path("profile/", views.profile_view, name="profile"),
+    path("find-hospital/", views.find_hospital, name="find_hospital"),
+    path(
+        "find-hospital/nearest/",
+        views.nearest_hospitals_view,
+        name="nearest_hospitals",
+    ),
+    path(
+        "profile/<uuid:profile_id>/", views.public_profile_view, name="public_profile"
+    ),
+    path(
+        "profile/<uuid:profile_id>/card.json",
+        views.public_profile_card_view,
+        name="public_profile_card",
+    ),
+    path("profile/access-log/", views.access_log_view, name="access_log"),
+    path("qr-code/", views.qr_code_view, name="qr_code"),
+    path(
+        "profile/<uuid:profile_id>/qr.<str:fmt>",
+        views.qr_code_image_view,
+        name="qr_code_image",
+    ),
+    path("logout/", views.arvion, name="logout"),
+    path("api/login/", views.login_api_view, name="login_api_view"),
+    path(
+        "search/photo/", views.search_patient_by_photo, name="search_patient_by_photo"
+    ),
+    path("search/live/", views.live_search_frame_view, name="live_search_frame"),
+    path("patient/<int:user_id>/", views.patient_details_view, name="patient_details"),
+    path("add-photo/", views.add_photo_view, name="add_photo"),
+    path("delete-photo/<int:image_id>/", views.delete_photo_view, name="delete_photo"),
+    path("jobs/status/", views.job_queue_status_view, name="job_queue_status"),
+]
@@ -1,439 +1,768 @@
-import base64
-import json
-from io import BytesIO
-import qrcode
-from django.conf import settings
-from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
-from django.core.exceptions import ValidationError
-from django.db import IntegrityError, transaction
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse
-from . import face_recognition_service
-from .models import (
-    Allergy,
-    BloodGroup,
-    Condition,
-    CustomUser,
-    DoctorProfile,
-    Gender,
-    Medication,
-    PatientCondition,
-    PatientMedication,
-    PatientProfile,
-    PatientSurgery,
-    Surgery,
-    UserFaceImage,
-)
-
-
-def register_view(request):
-    if request.method == "GET":
-        return render(request, "register.html")
-    context = {"form_data": request.POST}
-    try:
-        role = request.POST.get("role")
-        first_name = request.POST.get("first_name", "").strip()
-        last_name = request.POST.get("last_name", "").strip()
-        email = request.POST.get("email", "").strip().lower()
-        password = request.POST.get("password")
-        password2 = request.POST.get("password2")
-        gender_name = request.POST.get("gender")
-        date_of_birth_str = request.POST.get("date_of_birth")
-        specialty = request.POST.get("specialty", "")
-        if not all(
-            [
-                role,
-                first_name,
-                last_name,
-                email,
-                password,
-                gender_name,
-                date_of_birth_str,
-            ]
-        ):
-            messages.error(request, "Խնդրում ենք լրացնել բոլոր պարտադիր դաշտերը։")
-            return render(request, "register.html", context)
-        if password != password2:
-            messages.error(request, "Գաղտնաբառերը չեն համընկնում։")
-            return render(request, "register.html", context)
-        if CustomUser.objects.filter(email=email).exists():
-            messages.error(
-                request, f"'{email}' էլ․ հասցեով օգտատեր արդեն գոյություն ունի։"
-            )
-            return render(request, "register.html", context)
-        with transaction.atomic():
-            gender_obj, _ = Gender.objects.get_or_create(name=gender_name)
-            user = CustomUser.objects.create_user(
-                username=email, email=email, password=password
-            )
-            user.first_name, user.last_name, user.date_of_birth, user.gender = (
-                first_name,
-                last_name,
-                date_of_birth_str,
-                gender_obj,
-            )
-            user.save()
-            if role == "doctor":
-                DoctorProfile.objects.create(
-                    user=user, specialty=specialty, license_number=f"TEMP-{user.id}"
-                )
-            else:
-                PatientProfile.objects.create(user=user)
-        messages.success(request, "Դուք հաջողությամբ գրանցվել եք։")
-        return redirect("login")
-    except Exception as e:
-        messages.error(request, f"Գրանցման ընթացքում առաջացավ սխալ: {e}")
-        return render(request, "register.html", context)
-
-
-def login_page_view(request):
-    return render(request, "login.html")
-
-
-def login_api_view(request):
-    if request.method == "POST":
-        data = json.loads(request.body)
-        user = authenticate(
-            request, username=data.get("email"), password=data.get("password")
-        )
-        if user:
-            login(request, user)
-            return JsonResponse(
-                {"status": "success", "redirect_url": reverse("profile")}
-            )
-        return JsonResponse(
-            {"status": "error", "message": "Սխալ էլ. հասցե կամ գաղտնաբառ։"}, status=400
-        )
-    return JsonResponse(
-        {"status": "error", "message": "Invalid request method."}, status=405
-    )
-
-
-@login_required
-def logout_view(request):
-    logout(request)
-    messages.info(request, "Դուք հաջողությամբ դուրս եկաք համակարգից։")
-    return redirect("login")
-
-
-def arvion(request):
-    return render(request, "arvion.html")
-
-
-def about_project(request):
-    return render(request, "about_project.html")
-
-
-def how_it_works(request):
-    return render(request, "how_it_works.html")
-
-
-def terms_privacy(request):
-    return render(request, "terms_privacy.html")
-
-
-def security(request):
-    return render(request, "security.html")
-
-
-def status(request):
-    return render(request, "status.html")
-
-
-@login_required
-def profile_view(request):
-    context = {"user": request.user}
-    if hasattr(request.user, "patient_profile"):
-        patient_profile = request.user.patient_profile
-        context.update(
-            {
-                "patient_conditions": PatientCondition.objects.filter(
-                    patient=patient_profile
-                ).select_related("condition"),
-                "patient_medications": PatientMedication.objects.filter(
-                    patient=patient_profile
-                ).select_related("medication"),
-                "patient_surgeries": PatientSurgery.objects.filter(
-                    patient=patient_profile
-                ).select_related("surgery"),
-            }
-        )
-    return render(request, "profile.html", context)
-
-
-def settings_view(request):
-    user_to_update = request.user
-    patient_profile = getattr(user_to_update, "patient_profile", None)
-    doctor_profile = getattr(user_to_update, "doctor_profile", None)
-
-    if request.method == "POST":
-        try:
-            with transaction.atomic():
-                user_to_update.first_name = request.POST.get(
-                    "first_name", user_to_update.first_name
-                )
-                user_to_update.last_name = request.POST.get(
-                    "last_name", user_to_update.last_name
-                )
-                user_to_update.date_of_birth = request.POST.get("date_of_birth") or None
-                user_to_update.gender_id = request.POST.get("gender") or None
-                user_to_update.phone_number = request.POST.get(
-                    "phone_number", user_to_update.phone_number
-                )
-                user_to_update.emergency_contact_phone = request.POST.get(
-                    "emergency_contact_phone", user_to_update.emergency_contact_phone
-                )
-                user_to_update.address = request.POST.get(
-                    "address", user_to_update.address
-                )
-
-                if "profile_picture" in request.FILES:
-                    user_to_update.profile_picture = request.FILES["profile_picture"]
-                user_to_update.save()
-
-                if doctor_profile:
-                    doctor_profile.specialty = request.POST.get(
-                        "specialty", doctor_profile.specialty
-                    )
-                    doctor_profile.license_number = request.POST.get(
-                        "license_number", doctor_profile.license_number
-                    )
-                    doctor_profile.workplace = request.POST.get(
-                        "workplace", doctor_profile.workplace
-                    )
-                    doctor_profile.biography = request.POST.get(
-                        "biography", doctor_profile.biography
-                    )
-                    doctor_profile.save()
-
-                if patient_profile:
-                    patient_profile.blood_group_id = (
-                        request.POST.get("blood_group") or None
-                    )
-                    patient_profile.weight_kg = request.POST.get("weight_kg") or None
-                    patient_profile.height_cm = request.POST.get("height_cm") or None
-                    patient_profile.other_notes = request.POST.get(
-                        "other_notes", patient_profile.other_notes
-                    )
-                    patient_profile.save()
-                    allergies_text = request.POST.get("allergies_text", "")
-                    allergy_names = [
-                        name.strip()
-                        for name in allergies_text.split(",")
-                        if name.strip()
-                    ]
-                    allergy_objs = []
-                    for name in allergy_names:
-                        obj, _ = Allergy.objects.get_or_create(name=name.capitalize())
-                        allergy_objs.append(obj)
-                    patient_profile.allergies.set(allergy_objs)
-
-                    PatientCondition.objects.filter(patient=patient_profile).delete()
-                    conditions_text = request.POST.get("conditions_text", "")
-                    condition_names = [
-                        name.strip()
-                        for name in conditions_text.split(",")
-                        if name.strip()
-                    ]
-                    for name in condition_names:
-                        condition_obj, _ = Condition.objects.get_or_create(
-                            name=name.capitalize()
-                        )
-                        PatientCondition.objects.create(
-                            patient=patient_profile, condition=condition_obj
-                        )
-
-                    PatientMedication.objects.filter(patient=patient_profile).delete()
-                    medications_text = request.POST.get("medications_text", "")
-                    medication_names = [
-                        name.strip()
-                        for name in medications_text.split(",")
-                        if name.strip()
-                    ]
-                    for name in medication_names:
-                        med_obj, _ = Medication.objects.get_or_create(
-                            name=name.capitalize()
-                        )
-                        PatientMedication.objects.create(
-                            patient=patient_profile, medication=med_obj
-                        )
-
-                    PatientSurgery.objects.filter(patient=patient_profile).delete()
-                    surgeries_text = request.POST.get("surgeries_text", "")
-                    surgery_names = [
-                        name.strip()
-                        for name in surgeries_text.split(",")
-                        if name.strip()
-                    ]
-                    for name in surgery_names:
-                        surg_obj, _ = Surgery.objects.get_or_create(
-                            name=name.capitalize()
-                        )
-                        PatientSurgery.objects.create(
-                            patient=patient_profile, surgery=surg_obj
-                        )
-
-            messages.success(request, "Ձեր տվյալները հաջողությամբ թարմացվել են։")
-            return redirect("settings")
-
-        except Exception as e:
-            messages.error(request, f"Տվյալները պահպանելիս տեղի ունեցավ սխալ: {e}")
-
-    context = {
-        "all_genders": Gender.objects.all(),
-        "all_blood_groups": BloodGroup.objects.all(),
-    }
-    if patient_profile:
-        context.update(
-            {
-                "p_allergies_str": ", ".join(
-                    [a.name for a in patient_profile.allergies.all()]
-                ),
-                "p_conditions_str": ", ".join(
-                    [
-                        pc.condition.name
-                        for pc in PatientCondition.objects.filter(
-                            patient=patient_profile
-                        )
-                    ]
-                ),
-                "p_medications_str": ", ".join(
-                    [
-                        pm.medication.name
-                        for pm in PatientMedication.objects.filter(
-                            patient=patient_profile
-                        )
-                    ]
-                ),
-                "p_surgeries_str": ", ".join(
-                    [
-                        ps.surgery.name
-                        for ps in PatientSurgery.objects.filter(patient=patient_profile)
-                    ]
-                ),
-            }
-        )
-
-    return render(request, "settings.html", context)
-
-
-@login_required
-def add_photo_view(request):
-    if not hasattr(request.user, "patient_profile"):
-        messages.error(request, "Միայն պացիենտները կարող են իրենց նկարներն ավելացնել։")
-        return redirect("profile")
-    if request.method == "POST":
-        if "face_photo" in request.FILES:
-            image_file = request.FILES["face_photo"]
-            was_face_detected = face_recognition_service.detect_face_in_image_data(
-                image_file.read()
-            )
-            if was_face_detected:
-                image_file.seek(0)
-                UserFaceImage.objects.create(user=request.user, image=image_file)
-                messages.success(request, "Նկարը հաջողությամբ վերբեռնվեց։")
-            else:
-                messages.error(
-                    request,
-                    "Նկարում դեմք չի հայտնաբերվել։ Խնդրում ենք փորձել ավելի պարզ և դիմային նկար։",
-                )
-        else:
-            messages.error(request, "Խնդրում ենք ընտրել ֆայլ։")
-        return redirect("add_photo")
-    user_images = UserFaceImage.objects.filter(user=request.user)
-    context = {"user_images": user_images}
-    return render(request, "add_photo.html", context)
-
-
-@login_required
-def delete_photo_view(request, image_id):
-    if request.method == "POST":
-        try:
-            image_to_delete = UserFaceImage.objects.get(id=image_id, user=request.user)
-            image_to_delete.image.delete(save=False)
-            image_to_delete.delete()
-
-            messages.success(request, "Նկարը հաջողությամբ ջնջվեց։")
-        except UserFaceImage.DoesNotExist:
-            messages.error(
-                request, "Նկարը չի գտնվել կամ դուք իրավունք չունեք ջնջելու այն։"
-            )
-        except Exception as e:
-            messages.error(request, f"Նկարը ջնջելիս առաջացավ սխալ: {e}")
-    return redirect("add_photo")
-
-
-@login_required
-def search_patient_by_photo(request):
-    if not hasattr(request.user, "doctor_profile"):
-        messages.error(request, "Այս էջը հասանելի է միայն բժիշկներին։")
-        return redirect("profile")
-
-    if request.method == "POST" and "patient_photo" in request.FILES:
-        user_id, message_text = face_recognition_service.recognize_face(
-            request.FILES["patient_photo"]
-        )
-        if user_id:
-            messages.success(request, message_text)
-            return redirect("patient_details", user_id=user_id)
-        else:
-            messages.error(request, message_text)
-        return redirect("search_patient_by_photo")
-
-    return render(request, "search_patient_by_photo.html")
-
-
-@login_required
-def qr_code_view(request):
-    profile_url = request.build_absolute_uri(
-        reverse("public_profile", args=[request.user.public_profile_id])
-    )
-    qr_image = qrcode.make(profile_url)
-    buffer = BytesIO()
-    qr_image.save(buffer, format="PNG")
-    data_uri = (
-        f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
-    )
-    return render(request, "qr_code.html", {"qr_image_data_uri": data_uri})
-
-
-def public_profile_view(request, profile_id):
-    profile_user = get_object_or_404(CustomUser, public_profile_id=profile_id)
-    if not hasattr(profile_user, "patient_profile"):
-        messages.error(request, "Հիվանդի պրոֆիլը գոյություն չունի։")
-        return redirect("arvion")
-    context = {
-        "patient": profile_user,
-        "patient_conditions": PatientCondition.objects.filter(
-            patient=profile_user.patient_profile
-        ),
-    }
-    return render(request, "patient_details.html", context)
-
-
-def find_hospital(request):
-    return render(
-        request,
-        "find_hospital.html",
-        {"google_maps_api_key": settings.GOOGLE_MAPS_API_KEY},
-    )
-
-
-@login_required
-def patient_details_view(request, user_id):
-    if not hasattr(request.user, "doctor_profile"):
-        messages.error(request, "Մուտքը սահմանափակված է։")
-        return redirect("profile")
-    patient_user = get_object_or_404(
-        CustomUser, id=user_id, patient_profile__isnull=False
-    )
-    context = {
-        "patient": patient_user,
-        "patient_conditions": PatientCondition.objects.filter(
-            patient=patient_user.patient_profile
-        ),
-    }
-    return render(request, "patient_details.html", context)
+import base64
+import hashlib
+import json
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
+from . import (
+    audit,
+    emergency_card,
+    face_dedup,
+    face_recognition_service,
+    hospital_index,
+    image_intake,
+    jobs,
+    live_recognition,
+    login_throttle,
+    qr_codes,
+    renditions,
+    roles,
+)
+from .models import (
+    AccessEvent,
+    Allergy,
+    BloodGroup,
+    Condition,
+    CustomUser,
+    DoctorProfile,
+    Gender,
+    Medication,
+    PatientCondition,
+    PatientMedication,
+    PatientProfile,
+    PatientSurgery,
+    Surgery,
+    UserFaceImage,
+)
+from .page_cache import cache_static_page, is_anonymous_request, uses_per_visitor_state
+
+
+def register_view(request):
+    if request.method == "GET":
+        return render(request, "register.html")
+    context = {"form_data": request.POST}
+    try:
+        role = request.POST.get("role")
+        first_name = request.POST.get("first_name", "").strip()
+        last_name = request.POST.get("last_name", "").strip()
+        email = request.POST.get("email", "").strip().lower()
+        password = request.POST.get("password")
+        password2 = request.POST.get("password2")
+        gender_name = request.POST.get("gender")
+        date_of_birth_str = request.POST.get("date_of_birth")
+        specialty = request.POST.get("specialty", "")
+        if not all(
+            [
+                role,
+                first_name,
+                last_name,
+                email,
+                password,
+                gender_name,
+                date_of_birth_str,
+            ]
+        ):
+            messages.error(request, "Խնդրում ենք լրացնել բոլոր պարտադիր դաշտերը։")
+            return render(request, "register.html", context)
+        if password != password2:
+            messages.error(request, "Գաղտնաբառերը չեն համընկնում։")
+            return render(request, "register.html", context)
+        if CustomUser.objects.filter(email__lower=email).exclude(email="").exists():
+            messages.error(
+                request, f"'{email}' էլ․ հասցեով օգտատեր արդեն գոյություն ունի։"
+            )
+            return render(request, "register.html", context)
+        with transaction.atomic():
+            gender_obj, _ = Gender.objects.get_or_create(name=gender_name)
+            user = CustomUser.objects.create_user(
+                username=email, email=email, password=password
+            )
+            user.first_name, user.last_name, user.date_of_birth, user.gender = (
+                first_name,
+                last_name,
+                date_of_birth_str,
+                gender_obj,
+            )
+            user.save()
+            if role == "doctor":
+                DoctorProfile.objects.create(
+                    user=user, specialty=specialty, license_number=f"TEMP-{user.id}"
+                )
+            else:
+                PatientProfile.objects.create(user=user)
+        messages.success(request, "Դուք հաջողությամբ գրանցվել եք։")
+        return redirect("login")
+    except Exception as e:
+        messages.error(request, f"Գրանցման ընթացքում առաջացավ սխալ: {e}")
+        return render(request, "register.html", context)
+
+
+def login_page_view(request):
+    return render(request, "login.html")
+
+
+def login_api_view(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+        if not (
+            isinstance(data, dict)
+            and isinstance(data.get("email"), str)
+            and isinstance(data.get("password"), str)
+        ):
+            return JsonResponse(
+                {"status": "error", "message": "Invalid request body."}, status=400
+            )
+        email, ip = data["email"], login_throttle.client_ip(request)
+        if login_throttle.is_blocked(email, ip):
+            response = JsonResponse(
+                {
+                    "status": "error",
+                    "message": "Չափազանց շատ անհաջող փորձեր։ Խնդրում ենք փորձել ավելի ուշ։",
+                },
+                status=429,
+            )
+            response["Retry-After"] = str(login_throttle.LOGIN_WINDOW_SECONDS)
+            return response
+        user = authenticate(request, username=email, password=data["password"])
+        if user:
+            login_throttle.register_success(email, ip)
+            login(request, user)
+            return JsonResponse(
+                {"status": "success", "redirect_url": reverse("profile")}
+            )
+        login_throttle.register_failure(email, ip)
+        return JsonResponse(
+            {"status": "error", "message": "Սխալ էլ. հասցե կամ գաղտնաբառ։"}, status=400
+        )
+    return JsonResponse(
+        {"status": "error", "message": "Invalid request method."}, status=405
+    )
+
+
+@login_required
+def logout_view(request):
+    logout(request)
+    messages.info(request, "Դուք հաջողությամբ դուրս եկաք համակարգից։")
+    return redirect("login")
+
+
+@cache_static_page
+def arvion(request):
+    return render(request, "arvion.html")
+
+
+@cache_static_page
+def about_project(request):
+    return render(request, "about_project.html")
+
+
+@cache_static_page
+def how_it_works(request):
+    return render(request, "how_it_works.html")
+
+
+@cache_static_page
+def terms_privacy(request):
+    return render(request, "terms_privacy.html")
+
+
+@cache_static_page
+def security(request):
+    return render(request, "security.html")
+
+
+@cache_static_page
+def status(request):
+    return render(request, "status.html")
+
+
+@login_required
+def profile_view(request):
+    context = {"user": request.user}
+    if roles.is_patient(request.user):
+        # PatientProfile-ի բանալին user_id-ն է, ուստի պրոֆիլը բեռնելու կարիք չկա։
+        patient_id = request.user.pk
+        context.update(
+            {
+                "patient_conditions": PatientCondition.objects.filter(
+                    patient_id=patient_id
+                ).select_related("condition"),
+                "patient_medications": PatientMedication.objects.filter(
+                    patient_id=patient_id
+                ).select_related("medication"),
+                "patient_surgeries": PatientSurgery.objects.filter(
+                    patient_id=patient_id
+                ).select_related("surgery"),
+            }
+        )
+    return render(request, "profile.html", context)
+
+
+def settings_view(request):
+    user_to_update = request.user
+    user_roles = roles.get_roles(user_to_update)
+    patient_id = user_to_update.pk if user_roles["patient"] else None
+
+    if request.method == "POST":
+        # Պրոֆիլները բեռնվում են միայն պահպանելու համար. GET-ը բավարարվում է cache-ված դերերով։
+        patient_profile = (
+            user_to_update.patient_profile if user_roles["patient"] else None
+        )
+        doctor_profile = (
+            user_to_update.doctor_profile if user_roles["doctor"] else None
+        )
+        try:
+            with transaction.atomic():
+                user_to_update.first_name = request.POST.get(
+                    "first_name", user_to_update.first_name
+                )
+                user_to_update.last_name = request.POST.get(
+                    "last_name", user_to_update.last_name
+                )
+                user_to_update.date_of_birth = request.POST.get("date_of_birth") or None
+                user_to_update.gender_id = request.POST.get("gender") or None
+                user_to_update.phone_number = request.POST.get(
+                    "phone_number", user_to_update.phone_number
+                )
+                user_to_update.emergency_contact_phone = request.POST.get(
+                    "emergency_contact_phone", user_to_update.emergency_contact_phone
+                )
+                user_to_update.address = request.POST.get(
+                    "address", user_to_update.address
+                )
+
+                if "profile_picture" in request.FILES:
+                    picture_file = request.FILES["profile_picture"]
+                    buffer, image = image_intake.load_image(picture_file)
+                    content, image = image_intake.normalize_for_storage(
+                        buffer, image, picture_file.name
+                    )
+                    old_thumbnail = user_to_update.profile_thumbnail
+                    if old_thumbnail:
+                        # Հին մանրապատկերը ջնջվում է commit-ից հետո, որպեսզի rollback-ի դեպքում չկորի։
+                        transaction.on_commit(
+                            lambda: old_thumbnail.storage.delete(old_thumbnail.name)
+                        )
+                    user_to_update.profile_picture = content
+                    user_to_update.profile_thumbnail = renditions.make_thumbnail(
+                        image, content.name
+                    )
+                    user_to_update.profile_embedding = None
+                    user_to_update.profile_quality = None
+                user_to_update.save()
+                if "profile_picture" in request.FILES:
+                    jobs.enqueue(
+                        "embed_profile_picture",
+                        {"user_id": user_to_update.pk},
+                        priority=jobs.PRIORITY_NORMAL,
+                        dedup_key=f"embed_profile_picture:{user_to_update.pk}",
+                    )
+
+                if doctor_profile:
+                    doctor_profile.specialty = request.POST.get(
+                        "specialty", doctor_profile.specialty
+                    )
+                    doctor_profile.license_number = request.POST.get(
+                        "license_number", doctor_profile.license_number
+                    )
+                    doctor_profile.workplace = request.POST.get(
+                        "workplace", doctor_profile.workplace
+                    )
+                    doctor_profile.biography = request.POST.get(
+                        "biography", doctor_profile.biography
+                    )
+                    doctor_profile.save()
+
+                if patient_profile:
+                    patient_profile.blood_group_id = (
+                        request.POST.get("blood_group") or None
+                    )
+                    patient_profile.weight_kg = request.POST.get("weight_kg") or None
+                    patient_profile.height_cm = request.POST.get("height_cm") or None
+                    patient_profile.other_notes = request.POST.get(
+                        "other_notes", patient_profile.other_notes
+                    )
+                    patient_profile.save()
+                    allergies_text = request.POST.get("allergies_text", "")
+                    allergy_names = [
+                        name.strip()
+                        for name in allergies_text.split(",")
+                        if name.strip()
+                    ]
+                    allergy_objs = []
+                    for name in allergy_names:
+                        obj, _ = Allergy.objects.get_or_create(name=name.capitalize())
+                        allergy_objs.append(obj)
+                    patient_profile.allergies.set(allergy_objs)
+
+                    PatientCondition.objects.filter(patient=patient_profile).delete()
+                    conditions_text = request.POST.get("conditions_text", "")
+                    condition_names = [
+                        name.strip()
+                        for name in conditions_text.split(",")
+                        if name.strip()
+                    ]
+                    for name in condition_names:
+                        condition_obj, _ = Condition.objects.get_or_create(
+                            name=name.capitalize()
+                        )
+                        PatientCondition.objects.create(
+                            patient=patient_profile, condition=condition_obj
+                        )
+
+                    PatientMedication.objects.filter(patient=patient_profile).delete()
+                    medications_text = request.POST.get("medications_text", "")
+                    medication_names = [
+                        name.strip()
+                        for name in medications_text.split(",")
+                        if name.strip()
+                    ]
+                    for name in medication_names:
+                        med_obj, _ = Medication.objects.get_or_create(
+                            name=name.capitalize()
+                        )
+                        PatientMedication.objects.create(
+                            patient=patient_profile, medication=med_obj
+                        )
+
+                    PatientSurgery.objects.filter(patient=patient_profile).delete()
+                    surgeries_text = request.POST.get("surgeries_text", "")
+                    surgery_names = [
+                        name.strip()
+                        for name in surgeries_text.split(",")
+                        if name.strip()
+                    ]
+                    for name in surgery_names:
+                        surg_obj, _ = Surgery.objects.get_or_create(
+                            name=name.capitalize()
+                        )
+                        PatientSurgery.objects.create(
+                            patient=patient_profile, surgery=surg_obj
+                        )
+
+            messages.success(request, "Ձեր տվյալները հաջողությամբ թարմացվել են։")
+            return redirect("settings")
+
+        except Exception as e:
+            messages.error(request, f"Տվյալները պահպանելիս տեղի ունեցավ սխալ: {e}")
+
+    context = {
+        "all_genders": Gender.objects.all(),
+        "all_blood_groups": BloodGroup.objects.all(),
+    }
+    if patient_id:
+        context.update(
+            {
+                "p_allergies_str": ", ".join(
+                    Allergy.objects.filter(patientprofile=patient_id).values_list(
+                        "name", flat=True
+                    )
+                ),
+                "p_conditions_str": ", ".join(
+                    PatientCondition.objects.filter(patient_id=patient_id).values_list(
+                        "condition__name", flat=True
+                    )
+                ),
+                "p_medications_str": ", ".join(
+                    PatientMedication.objects.filter(patient_id=patient_id).values_list(
+                        "medication__name", flat=True
+                    )
+                ),
+                "p_surgeries_str": ", ".join(
+                    PatientSurgery.objects.filter(patient_id=patient_id).values_list(
+                        "surgery__name", flat=True
+                    )
+                ),
+            }
+        )
+
+    return render(request, "settings.html", context)
+
+
+@login_required
+def add_photo_view(request):
+    if not roles.is_patient(request.user):
+        messages.error(request, "Միայն պացիենտները կարող են իրենց նկարներն ավելացնել։")
+        return redirect("profile")
+    if request.method == "POST":
+        if "face_photo" in request.FILES:
+            image_file = request.FILES["face_photo"]
+            try:
+                buffer, image = image_intake.load_image(image_file)
+            except image_intake.ImageIntakeError as e:
+                messages.error(request, str(e))
+                return redirect("add_photo")
+            # Նույն կամ գրեթե նույն նկարը չի պահվում և չի մասնակցում մարզմանը։
+            digest = face_dedup.content_hash(buffer)
+            phash = face_dedup.perceptual_hash(image)
+            duplicate = face_dedup.find_duplicate(request.user.pk, digest, phash)
+            if duplicate is not None:
+                messages.warning(request, duplicate[1])
+                return redirect("add_photo")
+            content, image = image_intake.normalize_for_storage(
+                buffer, image, image_file.name
+            )
+            # Միայն MTCNN detection (առանց FaceNet-ի), որպեսզի առանց դեմքի նկարները չպահվեն։
+            # Եթե gate-ը զբաղված է, ստուգումը թողնվում է worker-ին։
+            try:
+                has_face = bool(face_recognition_service.detect_faces(image)[0])
+            except face_recognition_service.InferenceBusy:
+                has_face = True
+            if not has_face:
+                messages.error(
+                    request,
+                    "Նկարում դեմք չի հայտնաբերվել։ Խնդրում ենք փորձել ավելի պարզ և դիմային նկար։",
+                )
+                return redirect("add_photo")
+            # Embedding-ը և որակի գնահատումը կատարվում են ֆոնային worker-ում։
+            face_image = UserFaceImage.objects.create(
+                user=request.user,
+                image=content,
+                thumbnail=renditions.make_thumbnail(image, content.name),
+                content_hash=digest,
+                perceptual_hash=phash,
+            )
+            jobs.enqueue(
+                "embed_image",
+                {"image_id": face_image.id},
+                priority=jobs.PRIORITY_HIGH,
+                dedup_key=f"embed_image:{face_image.id}",
+            )
+            messages.success(
+                request,
+                "Նկարը վերբեռնվեց և մշակվում է։ Այն կօգտագործվի ճանաչման համար մշակումից հետո։",
+            )
+        else:
+            messages.error(request, "Խնդրում ենք ընտրել ֆայլ։")
+        return redirect("add_photo")
+    user_images = UserFaceImage.objects.filter(user=request.user)
+    context = {"user_images": user_images}
+    return render(request, "add_photo.html", context)
+
+
+@login_required
+def delete_photo_view(request, image_id):
+    if request.method == "POST":
+        try:
+            image_to_delete = UserFaceImage.objects.get(id=image_id, user=request.user)
+            first_duplicate = image_to_delete.duplicates.order_by("id").first()
+            with transaction.atomic():
+                # Առաջին կրկնօրինակը նորից է մշակվում և դառնում հիմնական նկար, իսկ մնացածը
+                # կցվում են դրան՝ առանց նորից մշակվելու։
+                if first_duplicate is not None:
+                    image_to_delete.duplicates.exclude(pk=first_duplicate.pk).update(
+                        duplicate_of=first_duplicate
+                    )
+                image_to_delete.delete()
+            image_to_delete.delete_files()
+            if first_duplicate is not None:
+                jobs.enqueue(
+                    "embed_image",
+                    {"image_id": first_duplicate.pk},
+                    priority=jobs.PRIORITY_NORMAL,
+                    dedup_key=f"embed_image:{first_duplicate.pk}",
+                )
+            jobs.enqueue(
+                "rebuild_index", priority=jobs.PRIORITY_LOW, dedup_key="rebuild_index"
+            )
+
+            messages.success(request, "Նկարը հաջողությամբ ջնջվեց։")
+        except UserFaceImage.DoesNotExist:
+            messages.error(
+                request, "Նկարը չի գտնվել կամ դուք իրավունք չունեք ջնջելու այն։"
+            )
+        except Exception as e:
+            messages.error(request, f"Նկարը ջնջելիս առաջացավ սխալ: {e}")
+    return redirect("add_photo")
+
+
+@login_required
+def search_patient_by_photo(request):
+    if not roles.is_doctor(request.user):
+        messages.error(request, "Այս էջը հասանելի է միայն բժիշկներին։")
+        return redirect("profile")
+
+    if request.method == "POST" and "patient_photo" in request.FILES:
+        try:
+            user_id, message_text = face_recognition_service.recognize_face(
+                request.FILES["patient_photo"], roles.facility(request.user)
+            )
+        except face_recognition_service.InferenceBusy:
+            messages.warning(request, face_recognition_service.BUSY_MESSAGE)
+            response = render(request, "search_patient_by_photo.html", status=503)
+            response["Retry-After"] = "5"
+            return response
+        if user_id:
+            messages.success(request, message_text)
+            return redirect("patient_details", user_id=user_id)
+        else:
+            messages.error(request, message_text)
+        return redirect("search_patient_by_photo")
+
+    return render(request, "search_patient_by_photo.html")
+
+
+@login_required
+def live_search_frame_view(request):
+    """
+    Տեսախցիկի մեկ կադր կենդանի որոնման համար։ Կադրը գալիս է multipart "frame" դաշտով
+    կամ ուղղակի request body-ով (image/jpeg, նաև chunked)։ Հաճախորդը բոլոր կադրերի
+    հետ ուղարկում է նույն stream id-ն, իսկ վիճակը (track-երը) պահվում է cache-ում։
+    """
+    if not roles.is_doctor(request.user):
+        return JsonResponse(
+            {"status": "error", "message": "Այս էջը հասանելի է միայն բժիշկներին։"},
+            status=403,
+        )
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Միայն POST։"}, status=405)
+    if not live_recognition.AVAILABLE:
+        return JsonResponse(
+            {"status": "error", "message": live_recognition.UNAVAILABLE_MESSAGE},
+            status=503,
+        )
+    stream_id = request.GET.get("stream") or request.POST.get("stream")
+    if stream_id is None:
+        stream_id = live_recognition.new_stream_id()
+    elif not (0 < len(stream_id) <= 32 and stream_id.isalnum()):
+        return JsonResponse(
+            {"status": "error", "message": "Սխալ stream id։"}, status=400
+        )
+    if request.GET.get("end"):
+        live_recognition.end_stream(request.user.pk, stream_id)
+        return JsonResponse({"status": "ended", "stream": stream_id})
+    try:
+        if "frame" in request.FILES:
+            buffer = image_intake.read_upload(request.FILES["frame"])
+        elif request.content_type.startswith("multipart/"):
+            # Body-ն արդեն կարդացվել է form-ի համար, request.read()-ը հասանելի չէ։
+            raise image_intake.ImageIntakeError("Կադրը (frame) բացակայում է։")
+        else:
+            buffer = image_intake.read_chunks(iter(lambda: request.read(64 * 1024), b""))
+        image_intake.check_dimensions(buffer)
+        image = image_intake.decode_image(buffer)
+    except image_intake.ImageIntakeError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    try:
+        result = live_recognition.handle_frame(
+            request.user.pk, stream_id, image, roles.facility(request.user)
+        )
+    except face_recognition_service.InferenceBusy:
+        response = JsonResponse(
+            {"status": "busy", "message": face_recognition_service.BUSY_MESSAGE},
+            status=503,
+        )
+        response["Retry-After"] = "1"
+        return response
+    result["stream"] = stream_id
+    if result["user_id"] is not None:
+        result["patient_url"] = reverse("patient_details", args=[result["user_id"]])
+    return JsonResponse(result)
+
+
+@login_required
+def qr_code_view(request):
+    profile_url = request.build_absolute_uri(
+        reverse("public_profile", args=[request.user.public_profile_id])
+    )
+    qr_png = qr_codes.get_qr(profile_url)
+    data_uri = f"data:image/png;base64,{base64.b64encode(qr_png).decode('utf-8')}"
+    context = {
+        "qr_image_data_uri": data_uri,
+        "qr_image_url": reverse(
+            "qr_code_image", args=[request.user.public_profile_id, "png"]
+        ),
+    }
+    return render(request, "qr_code.html", context)
+
+
+def _qr_profile_url(request, profile_id):
+    return request.build_absolute_uri(reverse("public_profile", args=[profile_id]))
+
+
+def _qr_etag(request, profile_id, fmt):
+    if (
+        fmt not in qr_codes.QR_FORMATS
+        or emergency_card.profile_user_id(profile_id) is None
+    ):
+        return None
+    return qr_codes.qr_etag(_qr_profile_url(request, profile_id), fmt)
+
+
+@cache_control(public=True, max_age=qr_codes.QR_CACHE_TIMEOUT, immutable=True)
+@etag(_qr_etag)
+def qr_code_image_view(request, profile_id, fmt):
+    # Անհայտ պրոֆիլների համար QR չի ստեղծվում և cache-ում չի պահվում։
+    if (
+        fmt not in qr_codes.QR_FORMATS
+        or emergency_card.profile_user_id(profile_id) is None
+    ):
+        raise Http404
+    data = qr_codes.get_qr(_qr_profile_url(request, profile_id), fmt)
+    return HttpResponse(data, content_type=qr_codes.QR_FORMATS[fmt])
+
+
+def _emergency_card(request, profile_id):
+    if not hasattr(request, "_emergency_card"):
+        request._emergency_card = emergency_card.get_card(profile_id)
+    return request._emergency_card
+
+
+def _public_profile_etag(request, profile_id):
+    entry = _emergency_card(request, profile_id)
+    if entry is None:
+        return None
+    # HTML-ը կախված է նաև մուտք գործած օգտատիրոջից (navbar), ուստի session-ը մտնում է ETag-ի մեջ։
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME, "")
+    return f"{entry['page_etag']}-{hashlib.sha1(session_key.encode()).hexdigest()[:8]}"
+
+
+def _public_patient_id(request, profile_id):
+    entry = _emergency_card(request, profile_id)
+    return entry["user_id"] if entry else None
+
+
+@audit.audited(AccessEvent.PUBLIC_PROFILE, _public_patient_id)
+@cache_control(private=True, no_cache=True)
+@etag(_public_profile_etag)
+def public_profile_view(request, profile_id):
+    entry = _emergency_card(request, profile_id)
+    if entry is None:
+        if emergency_card.profile_user_id(profile_id) is None:
+            raise Http404
+        messages.error(request, "Հիվանդի պրոֆիլը գոյություն չունի։")
+        return redirect("arvion")
+    anonymous = is_anonymous_request(request)
+    html = emergency_card.get_page(entry) if anonymous else None
+    if html is not None:
+        return HttpResponse(html)
+    profile_user = CustomUser.objects.get(pk=entry["user_id"])
+    context = {
+        "patient": profile_user,
+        "patient_conditions": PatientCondition.objects.filter(
+            patient_id=profile_user.id
+        ),
+        "emergency_card": entry["card"],
+    }
+    response = render(request, "patient_details.html", context)
+    if anonymous and not uses_per_visitor_state(request, response):
+        emergency_card.set_page(entry, response.content)
+    return response
+
+
+def _public_card_etag(request, profile_id):
+    entry = _emergency_card(request, profile_id)
+    return entry["etag"] if entry else None
+
+
+@audit.audited(AccessEvent.PUBLIC_CARD, _public_patient_id)
+@cache_control(private=True, no_cache=True)
+@etag(_public_card_etag)
+def public_profile_card_view(request, profile_id):
+    entry = _emergency_card(request, profile_id)
+    if entry is None:
+        return JsonResponse(
+            {"status": "error", "message": "Հիվանդի պրոֆիլը գոյություն չունի։"},
+            status=404,
+        )
+    return HttpResponse(entry["json"], content_type="application/json")
+
+
+@staff_member_required
+def job_queue_status_view(request):
+    return JsonResponse(jobs.queue_stats())
+
+
+def find_hospital(request):
+    return render(
+        request,
+        "find_hospital.html",
+        {
+            "google_maps_api_key": settings.GOOGLE_MAPS_API_KEY,
+            "nearest_hospitals_url": reverse("nearest_hospitals"),
+        },
+    )
+
+
+def nearest_hospitals_view(request):
+    try:
+        lat = float(request.GET["lat"])
+        lon = float(request.GET["lon"])
+        k = int(request.GET.get("k", 5))
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {"status": "error", "message": "Անհրաժեշտ են lat և lon թվային արժեքները։"},
+            status=400,
+        )
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return JsonResponse(
+            {"status": "error", "message": "Կոորդինատները սահմաններից դուրս են։"},
+            status=400,
+        )
+    hospitals = hospital_index.nearest_hospitals(
+        lat, lon, k, request.GET.get("specialty", "")
+    )
+    return JsonResponse({"status": "success", "hospitals": hospitals})
+
+
+@login_required
+@audit.audited(AccessEvent.DETAILS, lambda request, user_id: user_id)
+def patient_details_view(request, user_id):
+    if not roles.is_doctor(request.user):
+        messages.error(request, "Մուտքը սահմանափակված է։")
+        return redirect("profile")
+    patient_user = get_object_or_404(
+        CustomUser, id=user_id, patient_profile__isnull=False
+    )
+    context = {
+        "patient": patient_user,
+        "patient_conditions": PatientCondition.objects.filter(
+            patient=patient_user.patient_profile
+        ),
+    }
+    return render(request, "patient_details.html", context)
+
+
+@login_required
+def access_log_view(request):
+    """
+    Պացիենտի տվյալների դիտումների պատմությունը (JSON)։ Պացիենտը տեսնում է իր
+    պատմությունը՝ առանց դիտողների IP-ների, իսկ staff-ը կարող է նշել ?patient=<user_id>։
+    Էջավորում՝ ?before=<ISO ժամանակ>։
+    """
+    patient_id = request.user.pk
+    if request.GET.get("patient") and request.user.is_staff:
+        try:
+            patient_id = int(request.GET["patient"])
+        except ValueError:
+            return JsonResponse(
+                {"status": "error", "message": "Սխալ պացիենտի id։"}, status=400
+            )
+    elif not roles.is_patient(request.user):
+        return JsonResponse(
+            {"status": "error", "message": "Մուտքը սահմանափակված է։"}, status=403
+        )
+    before = None
+    if request.GET.get("before"):
+        before = parse_datetime(request.GET["before"])
+        if before is None:
+            return JsonResponse(
+                {"status": "error", "message": "Սխալ ժամանակի ձևաչափ։"}, status=400
+            )
+    events = audit.access_history(
+        patient_id, before=before, include_ip=request.user.is_staff
+    )
+    return JsonResponse({"status": "success", "events": events})